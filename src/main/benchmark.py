@@ -0,0 +1,352 @@
+import csv
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, redirect_stdout
+from pathlib import Path
+from typing import Dict, List, Union
+
+from src.main.fake_splitwise import FakeSplitwiseServer, patch_splitwise_urls
+from src.main.records import Decision, Transaction
+from src.main.split_expenses import allocate_cents, format_cents, to_cents
+from src.main.upload_expenses import UPLOAD_MODES, UploadExpense, UploadJob
+
+# Checks a csv file in a new interpreter, like
+# `run_upload_expenses.py --check`.
+STARTUP_COMMAND = (
+    "import sys; from src.main.upload_expenses import UploadExpense; "
+    "UploadExpense(sys.argv[1]).run_check(); "
+    "print('splitwise' in sys.modules)"
+)
+
+
+class UploadBenchmark:
+    def __init__(
+        self,
+        total_expenses: int = 10000,
+        modes: List[str] = UPLOAD_MODES,
+        workers: int = 16,
+        metadata_runs: int = 20,
+        base_url: str = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: int = None,
+        startup_runs: int = 5,
+        client_rate_limit: float = None,
+    ) -> None:
+        """
+        Measure metadata fetch latency and upload throughput of
+        UploadExpense against a fake Splitwise server.
+
+        Args:
+            total_expenses (int): expenses uploaded in every mode
+            modes (List[str]): upload modes to measure
+            workers (int): concurrent uploads of the threaded and async modes
+            metadata_runs (int): number of times the metadata is fetched
+            base_url (str): url of an already running fake server, a server
+            is started in this process if None
+            latency (float): seconds added to every response
+            error_rate (float): share (0-1) of requests answered with a 500
+            rate_limit (int): requests per second before answering with a 429
+            startup_runs (int): number of times the csv file is checked
+            offline in a new process
+            client_rate_limit (float): requests per second UploadExpense
+            limits itself to, no limit if None
+        """
+        self.total_expenses = total_expenses
+        self.modes = modes
+        self.workers = workers
+        self.metadata_runs = metadata_runs
+        self.base_url = base_url
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.startup_runs = startup_runs
+        self.client_rate_limit = client_rate_limit
+
+    def run(self) -> List[Dict[str, Union[str, int, float]]]:
+        """
+        Run the benchmark against the fake server.
+
+        Returns:
+            List[Dict[str, Union[str, int, float]]]: one result per
+            measurement
+        """
+        results = [self.measure_startup()]
+
+        # The fake server accepts any credentials.
+        for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+            os.environ.setdefault(key, "benchmark")
+
+        with ExitStack() as stack:
+            if self.base_url is None:
+                stack.enter_context(
+                    FakeSplitwiseServer(
+                        latency=self.latency,
+                        error_rate=self.error_rate,
+                        rate_limit=self.rate_limit,
+                    )
+                )
+            else:
+                stack.enter_context(patch_splitwise_urls(self.base_url))
+
+            rate_limit_path: str = None
+            if self.client_rate_limit is not None:
+                rate_limit_path = os.path.join(
+                    stack.enter_context(tempfile.TemporaryDirectory()),
+                    "rate_limit.json",
+                )
+            upload_expense = UploadExpense(
+                None,
+                rate_limit_path=rate_limit_path,
+                rate_limit=self.client_rate_limit,
+            )
+            results.append(self.measure_metadata(upload_expense))
+            jobs = self.make_jobs(upload_expense)
+            for mode in self.modes:
+                results.append(
+                    self.measure_uploads(upload_expense, jobs, mode)
+                )
+        return results
+
+    def measure_startup(self) -> Dict[str, Union[str, int, float, bool]]:
+        """
+        Time checking a csv file of the benchmark expenses offline, without
+        credentials, in a new process, as done by
+        `run_upload_expenses.py --check`.
+
+        Returns:
+            Dict[str, Union[str, int, float, bool]]: median and maximum
+            in milliseconds and whether the Splitwise client was
+            imported
+        """
+        environment = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]
+        }
+        timings: List[float] = list()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, "benchmark_clean.csv")
+            with open(csv_path, "w", newline="") as csv_file:
+                csv_writer = csv.writer(csv_file, delimiter=";")
+                csv_writer.writerow(
+                    ["date", "amount", "description", "currency"]
+                )
+                for count in range(self.total_expenses):
+                    csv_writer.writerow(
+                        [
+                            "01/12/2022",
+                            "12.34",
+                            f"Benchmark expense {count + 1}",
+                            "EUR",
+                        ]
+                    )
+
+            for _ in range(self.startup_runs):
+                start = time.perf_counter()
+                process = subprocess.run(
+                    [sys.executable, "-c", STARTUP_COMMAND, csv_path],
+                    cwd=Path(__file__).parents[2],
+                    env=environment,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+
+        return {
+            "measurement": "startup",
+            "runs": self.startup_runs,
+            "median_ms": round(statistics.median(timings), 2),
+            "max_ms": round(max(timings), 2),
+            "client_imported": process.stdout.split()[-1] == "True",
+        }
+
+    def measure_metadata(
+        self, upload_expense: UploadExpense
+    ) -> Dict[str, Union[str, int, float]]:
+        """
+        Time fetching the user info, groups and categories, as done before
+        every upload.
+
+        Args:
+            upload_expense (UploadExpense): UploadExpense to measure
+
+        Returns:
+            Dict[str, Union[str, int, float]]: median and 95th percentile in
+            milliseconds
+        """
+        timings: List[float] = list()
+        for _ in range(self.metadata_runs):
+            start = time.perf_counter()
+            (
+                upload_expense.user_id,
+                upload_expense.user_friends,
+                upload_expense.user_groups,
+                upload_expense.user_groups_members,
+            ) = upload_expense.get_user_info()
+            (
+                upload_expense.categories,
+                upload_expense.all_sub_categories,
+            ) = upload_expense.get_categories_and_sub_categories()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return {
+            "measurement": "metadata",
+            "runs": self.metadata_runs,
+            "median_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(
+                statistics.quantiles(timings, n=20, method="inclusive")[-1], 2
+            ),
+        }
+
+    def make_jobs(self, upload_expense: UploadExpense) -> List[UploadJob]:
+        """
+        Make the expenses to upload: every other expense is personal, the
+        others are split equally in the largest group.
+
+        Args:
+            upload_expense (UploadExpense): UploadExpense with the metadata
+            fetched
+
+        Returns:
+            List[UploadJob]: expense, expense info and total expense amount
+            of every expense
+        """
+        user_id = upload_expense.user_id
+        groups_members = upload_expense.user_groups_members
+        personal_group_id = next(
+            group_id
+            for group_id, members in groups_members.items()
+            if members == [user_id]
+        )
+        shared_group_id = max(
+            groups_members, key=lambda group_id: len(groups_members[group_id])
+        )
+        friend_ids = [
+            member
+            for member in groups_members[shared_group_id]
+            if member != user_id
+        ]
+        sub_category_name, sub_category_obj = next(
+            iter(upload_expense.all_sub_categories["Food and drink"].items())
+        )
+
+        totals = [12.34, 5.0, 100.01, 33.33, 7.99]
+        shares = format_cents(
+            allocate_cents(
+                to_cents(totals), [[1] * (len(friend_ids) + 1)] * len(totals)
+            )
+        )
+
+        jobs: List[UploadJob] = list()
+        for count in range(self.total_expenses):
+            total_expense = totals[count % len(totals)]
+            expense = Transaction(
+                date="2022-12-01",
+                amount=str(total_expense),
+                description=f"Benchmark expense {count + 1}",
+                currency="EUR",
+            )
+            if count % 2 == 0:
+                expense_info = Decision(
+                    sub_category_name=sub_category_name,
+                    sub_category_obj=sub_category_obj,
+                    group_name=upload_expense.user_groups[personal_group_id],
+                    group_id=personal_group_id,
+                )
+            else:
+                expense_info = Decision(
+                    sub_category_name=sub_category_name,
+                    sub_category_obj=sub_category_obj,
+                    group_name=upload_expense.user_groups[shared_group_id],
+                    group_id=shared_group_id,
+                    friend_names=tuple(
+                        upload_expense.user_friends[friend_id]
+                        for friend_id in friend_ids
+                    ),
+                    friend_ids=tuple(friend_ids),
+                    user_shares=tuple(shares[count % len(totals)]),
+                )
+            jobs.append((expense, expense_info, total_expense))
+        return jobs
+
+    def measure_uploads(
+        self, upload_expense: UploadExpense, jobs: List[UploadJob], mode: str
+    ) -> Dict[str, Union[str, int, float]]:
+        """
+        Time uploading every expense in one mode.
+
+        Args:
+            upload_expense (UploadExpense): UploadExpense to measure
+            jobs (List[UploadJob]): expenses to upload
+            mode (str): "sequential", "threaded" or "async"
+
+        Returns:
+            Dict[str, Union[str, int, float]]: duration, failed uploads and
+            uploads per second
+        """
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            failed_jobs = upload_expense.upload_batch(jobs, mode, self.workers)
+        seconds = time.perf_counter() - start
+
+        return {
+            "measurement": f"upload {mode}",
+            "expenses": len(jobs),
+            "failed": len(failed_jobs),
+            "seconds": round(seconds, 2),
+            "uploads_per_second": round(
+                (len(jobs) - len(failed_jobs)) / seconds, 1
+            ),
+        }
+
+    def print_report(
+        self, results: List[Dict[str, Union[str, int, float]]]
+    ) -> None:
+        """
+        Print the benchmark results.
+
+        Args:
+            results (List[Dict[str, Union[str, int, float]]]): benchmark
+            results
+        """
+        print(
+            (
+                f"\nBenchmark: {self.total_expenses} expenses, "
+                f"{self.workers} workers, latency {self.latency}s, "
+                f"error rate {self.error_rate}, "
+                f"rate limit {self.rate_limit}, "
+                f"client rate limit {self.client_rate_limit}"
+            )
+        )
+        for result in results:
+            if result["measurement"] == "startup":
+                print(
+                    (
+                        f"\noffline check: median {result['median_ms']} ms, "
+                        f"max {result['max_ms']} ms ({result['runs']} runs), "
+                        "Splitwise client imported: "
+                        f"{result['client_imported']}"
+                    )
+                )
+            elif result["measurement"] == "metadata":
+                print(
+                    (
+                        f"\nmetadata fetch: median {result['median_ms']} ms, "
+                        f"p95 {result['p95_ms']} ms ({result['runs']} runs)"
+                    )
+                )
+            else:
+                print(
+                    (
+                        f"{result['measurement']}: "
+                        f"{result['uploads_per_second']} uploads/s, "
+                        f"{result['seconds']} s, {result['failed']} failed"
+                    )
+                )
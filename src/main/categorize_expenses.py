@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import csv
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Pattern, Tuple
+
+if TYPE_CHECKING:
+    import splitwise
+
+
+class CategorizeExpense:
+    def __init__(self, rules_path: str) -> None:
+        self.rules_path: str = str(rules_path)
+        self.rules: List[Tuple[str, str, str]] = list()
+        self.matched_sub_categories: List[
+            Tuple[str, splitwise.category.Category]
+        ] = list()
+        self.pattern: Pattern = None
+
+    def load_rules(self) -> List[Tuple[str, str, str]]:
+        """
+        Read merchant rules from the rules csv file. Each row contains a
+        merchant, the category and the sub-category to assign to expenses
+        whose description contains that merchant.
+
+        Returns:
+            List[Tuple[str, str, str]]: list of merchant, category and
+            sub-category names.
+        """
+        with open(self.rules_path, "r") as rules_file:
+            csv_reader = csv.DictReader(rules_file, delimiter=";")
+            rules = [
+                (
+                    row["merchant"].strip(),
+                    row["category"].strip(),
+                    row["sub_category"].strip(),
+                )
+                for row in csv_reader
+                if row["merchant"] and row["merchant"].strip()
+            ]
+
+        return rules
+
+    def compile_rules(
+        self,
+        all_sub_categories: Dict[str, Dict[str, splitwise.category.Category]],
+    ) -> None:
+        """
+        Compile all merchant rules into a single case-insensitive regex.
+        Longer merchants are tried first so that "Colruyt Test" wins over
+        "Colruyt". Rules pointing to an unknown category or sub-category are
+        skipped.
+
+        Args:
+            all_sub_categories (Dict[str, Dict[str,
+            splitwise.category.Category]]): sub-categories for each category.
+        """
+        self.rules = list()
+        self.matched_sub_categories = list()
+
+        for merchant, category, sub_category in sorted(
+            self.load_rules(), key=lambda rule: len(rule[0]), reverse=True
+        ):
+            try:
+                sub_category_obj = all_sub_categories[category][sub_category]
+            except KeyError:
+                print(
+                    (
+                        f"\nSkipping merchant rule for {merchant}. "
+                        f"{category} - {sub_category} is not a valid "
+                        "sub-category."
+                    )
+                )
+                continue
+            self.rules.append((merchant, category, sub_category))
+            self.matched_sub_categories.append(
+                (sub_category, sub_category_obj)
+            )
+
+        if self.rules:
+            self.pattern = re.compile(
+                "|".join(
+                    rf"(?<!\w)({re.escape(merchant)})(?!\w)"
+                    for merchant, _, _ in self.rules
+                ),
+                re.IGNORECASE,
+            )
+        else:
+            self.pattern = None
+
+    def match(
+        self, description: str, merchant: str = None
+    ) -> Optional[Tuple[str, splitwise.category.Category]]:
+        """
+        Return the sub-category of the first merchant rule found in the
+        merchant key of the expense, which has no store numbers or card
+        numbers stuck to the merchant, or else in the description.
+
+        Args:
+            description (str): expense description
+            merchant (str): merchant key of the expense
+
+        Returns:
+            Optional[Tuple[str, splitwise.category.Category]]: sub-category
+            name and object, or None if no rule matches.
+        """
+        if self.pattern is None:
+            return None
+
+        for text in (merchant, description):
+            if not text:
+                continue
+            match = self.pattern.search(text)
+            if match is not None:
+                return self.matched_sub_categories[match.lastindex - 1]
+        return None
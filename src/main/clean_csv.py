@@ -1,4 +1,5 @@
 import csv
+import json
 import os
 import re
 from datetime import date
@@ -6,36 +7,127 @@ from typing import Dict, List
 
 import pandas as pd
 
+from src.main.compressed_files import (
+    csv_members,
+    detect_compression,
+    open_csv,
+    strip_compression,
+)
+from src.main.merchant_keys import (
+    DEFAULT_MERCHANT_PATTERNS,
+    compile_merchant_patterns,
+    merchant_keys,
+)
+from src.main.metrics import write_atomically
+from src.main.records import Transaction
+from src.main.transaction_store import TransactionStore, batch_key
+
 
 class CleanCsv:
-    def __init__(self, file_path: str) -> None:
+    def __init__(
+        self,
+        file_path: str,
+        answers: Dict = None,
+        output_dir: str = "src/data/clean",
+        state_path: str = None,
+        member: str = None,
+        compression: str = None,
+    ) -> None:
+        """
+        Args:
+            file_path (str): path to the raw csv file, which can be a gz,
+            bz2, xz or zip file
+            answers (Dict): answers given for a previous file with the same
+            columns. The file is then cleaned without prompts: questions
+            without a stored answer take their default (Enter).
+            output_dir (str): directory of the clean csv file
+            state_path (str): SQLite transaction store the clean rows are
+            added to
+            member (str): csv file to clean inside a zip file, the only csv
+            file of the zip file by default
+            compression (str): gz, bz2 or xz to compress the clean csv file
+        """
         self.file_path: str = str(file_path)
+        self.interactive: bool = answers is None
+        self.answers: Dict = dict() if answers is None else dict(answers)
+        self.output_dir: str = output_dir
+        self.state_path: str = state_path
+        self.member: str = member
+        self.compression: str = compression
+
+    def run_pipeline(self) -> str:
+        """
+        Returns:
+            str: path to the clean csv file
 
-    def run_pipeline(self) -> None:
+        Raises:
+            ValueError: without prompts, if the delimiter can't be detected
+            or the stored columns are missing
+        """
 
         print("Cleaning csv.\n")
-        try:
-            with open(self.file_path) as csv_file:
-                dialect = csv.Sniffer().sniff(csv_file.read(1024))
-
-            delimiter = dialect.delimiter
-            raw_df: pd.DataFrame = pd.read_csv(self.file_path, sep=delimiter)
-        except Exception:
-            delimiter = input(
-                (
-                    "The program was not able to detect the delimiter "
-                    "automatically. "
-                    "Please provide the delimiter (,|;|space|tab) - "
+        if "delimiter" in self.answers:
+            delimiter = self.answers["delimiter"]
+            raw_df: pd.DataFrame = self.read_raw_csv(delimiter)
+        else:
+            try:
+                # Compressed files are sniffed from their decompressed head.
+                with open_csv(self.file_path, member=self.member) as csv_file:
+                    dialect = csv.Sniffer().sniff(csv_file.read(1024))
+
+                delimiter = dialect.delimiter
+                raw_df: pd.DataFrame = self.read_raw_csv(delimiter)
+            except Exception:
+                if not self.interactive:
+                    raise ValueError(
+                        f"The delimiter of {self.file_path} can't be detected."
+                    )
+                delimiter = input(
+                    (
+                        "The program was not able to detect the delimiter "
+                        "automatically. "
+                        "Please provide the delimiter (,|;|space|tab) - "
+                    )
                 )
-            )
-            raw_df: pd.DataFrame = pd.read_csv(self.file_path, sep=delimiter)
+                raw_df: pd.DataFrame = self.read_raw_csv(delimiter)
+            self.answers["delimiter"] = delimiter
         raw_headers: List[str] = [col for col in raw_df]
 
         mapped_headers: Dict[str, str] = self.map_headers(raw_headers)
 
         clean_df: pd.DataFrame = self.clean_values(raw_df, mapped_headers)
 
-        self.write_output_file(clean_df)
+        return self.write_output_file(clean_df)
+
+    def read_raw_csv(self, delimiter: str) -> pd.DataFrame:
+        """
+        Read the raw csv file, decompressing it as it is read if it is
+        compressed, without a temporary copy.
+
+        Args:
+            delimiter (str): delimiter of the columns
+
+        Returns:
+            pd.DataFrame: raw dataframe
+        """
+        with open_csv(self.file_path, member=self.member) as csv_file:
+            return pd.read_csv(csv_file, sep=delimiter)
+
+    def ask(self, question: str, prompt: str) -> str:
+        """
+        Ask a question once per column layout: the answer is stored and
+        reused for the next files.
+
+        Args:
+            question (str): key of the stored answer
+            prompt (str): prompt shown to the user
+
+        Returns:
+            str: answer, empty without prompts if none is stored
+        """
+        if question not in self.answers:
+            self.answers[question] = input(prompt) if self.interactive else ""
+        return self.answers[question]
 
     def map_headers(self, raw_headers: List[str]) -> Dict[str, str]:
         """
@@ -49,7 +141,19 @@ class CleanCsv:
         Returns:
             Dict[str, str]: dictionary mapping csv headers to date, amount,
             description, currency fields.
+
+        Raises:
+            ValueError: without prompts, if the stored columns are missing
         """
+        stored_headers: Dict[str, str] = self.answers.get("headers")
+        if stored_headers is not None and all(
+            header in raw_headers for header in stored_headers.values()
+        ):
+            return dict(stored_headers)
+        if not self.interactive:
+            raise ValueError(
+                f"The stored columns are not all in {self.file_path}."
+            )
 
         mapped_headers: Dict[str, str] = {
             "date": "",
@@ -87,6 +191,7 @@ class CleanCsv:
                     print("\nPlease enter a value within the given list.")
                 finally:
                     print("\n")
+        self.answers["headers"] = mapped_headers
         return mapped_headers
 
     def clean_values(
@@ -149,8 +254,10 @@ class CleanCsv:
     def clean_amount_values(self, raw_df: pd.DataFrame) -> pd.DataFrame:
         """
         1. Remove missing amount values.
-        2. Remove negative, positive, and empty spaces from amount values.
-        3. Replace , with . in amount values
+        2. Keep the sign of amount values in the sign column: debit (-),
+        credit (+) or unsigned.
+        3. Remove negative, positive, and empty spaces from amount values.
+        4. Replace , with . in amount values
         Args:
             raw_df (pd.DataFrame): raw dataframe
 
@@ -175,6 +282,9 @@ class CleanCsv:
         if values_with_pos_values > 0:
             clean_df = self.clean_amount_with_pos_sign(clean_df)
 
+        clean_df["sign"] = "unsigned"
+        clean_df.loc[clean_df["amount"].str.startswith("-"), "sign"] = "debit"
+        clean_df.loc[clean_df["amount"].str.startswith("+"), "sign"] = "credit"
         clean_df["amount"] = clean_df["amount"].apply(
             lambda x: self.clean_value(x)
         )
@@ -226,12 +336,13 @@ class CleanCsv:
                 & (~df["amount"].str.startswith("+"))
             ]
         )
-        user_input = input(
+        user_input = self.ask(
+            "keep_unsigned",
             (
                 "\nThe above transactions do not have any sign (+|-) in "
                 "the amount column. Are these expenses that need to be kept "
                 "[y|N]? - "
-            )
+            ),
         )
         if user_input == "N":
             amount_wo_sign_df = df[
@@ -256,12 +367,13 @@ class CleanCsv:
         """
         print("\nCleaning amounts with positive sign.\n")
         print(df.loc[df["amount"].str.startswith("+")])
-        user_input = input(
+        user_input = self.ask(
+            "keep_positive",
             (
                 "\nThe above transactions have a positive sign in "
                 "the amount column. Press enter to discard them or any other "
                 "key to keep the values - "
-            )
+            ),
         )
         if user_input == "":
             amount_wo_pos_sign_df = df[~df["amount"].str.startswith("+")]
@@ -287,12 +399,13 @@ class CleanCsv:
     def clean_description_values(self, raw_df: pd.DataFrame) -> pd.DataFrame:
         """
             Replace missing values in description either with user input or
-            default value.
+            default value, and add the merchant key of every description.
         Args:
             raw_df (pd.DataFrame): raw dataframe
 
         Returns:
-            pd.DataFrame: dataframe with clean description values
+            pd.DataFrame: dataframe with clean description values and a
+            merchant column
         """
         total_empty_desc_vals = raw_df["description"].isna().sum()
         if total_empty_desc_vals > 0:
@@ -303,21 +416,49 @@ class CleanCsv:
             for index, desc in enumerate(raw_df["description"]):
                 if desc == "":
                     print(raw_df.loc[[index]])
-                    clean_desc = input(
-                        (
-                            "\nThe above transaction is missing a description."
-                            " Please provide one or "
-                            "press Enter to input default value (Expense) - "
+                    clean_desc = ""
+                    if self.interactive:
+                        clean_desc = input(
+                            (
+                                "\nThe above transaction is missing a "
+                                "description. Please provide one or press "
+                                "Enter to input default value (Expense) - "
+                            )
                         )
-                    )
                     if clean_desc != "":
                         raw_df.at[index, "description"] = clean_desc
                     else:
                         raw_df.at[index, "description"] = "Expense"
 
-            return raw_df
-        else:
-            return raw_df
+        raw_df["merchant"] = self.normalize_merchants(raw_df["description"])
+        return raw_df
+
+    def normalize_merchants(self, descriptions: pd.Series) -> pd.Series:
+        """
+        Key of the merchant of every description, without card numbers,
+        terminal ids, dates and the like, so the expenses of a merchant
+        match. The substitutions are those stored for the bank under
+        "merchant_patterns", the default ones otherwise. The defaults aren't
+        stored, so changes to them reach every bank without its own.
+
+        Args:
+            descriptions (pd.Series): clean descriptions
+
+        Returns:
+            pd.Series: merchant keys
+        """
+        compiled_patterns = compile_merchant_patterns(
+            self.answers.get("merchant_patterns", DEFAULT_MERCHANT_PATTERNS)
+        )
+        # Each distinct description is normalized once, and the keys are
+        # spread back to the rows by their codes.
+        codes, uniques = pd.factorize(descriptions.astype(str))
+        keys = pd.Series(
+            merchant_keys(uniques, compiled_patterns), dtype=object
+        )
+        return pd.Series(
+            keys.to_numpy()[codes], index=descriptions.index, dtype=object
+        )
 
     def clean_date_values(self, raw_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -339,14 +480,16 @@ class CleanCsv:
             for index, raw_date in enumerate(raw_df["date"]):
                 if raw_date == "":
                     print(raw_df.loc[[index]])
-                    clean_date = input(
-                        (
-                            "\nThe above transaction is missing a date. "
-                            "Please provide a date (DD/MM/YYYY) or "
-                            "press Enter to input default value (current date)"
-                            " - "
+                    clean_date = ""
+                    if self.interactive:
+                        clean_date = input(
+                            (
+                                "\nThe above transaction is missing a date. "
+                                "Please provide a date (DD/MM/YYYY) or press "
+                                "Enter to input default value (current date)"
+                                " - "
+                            )
                         )
-                    )
                     if clean_date != "":
                         raw_df.at[index, "date"] = clean_date
                     else:
@@ -358,26 +501,174 @@ class CleanCsv:
         else:
             return raw_df
 
-    def write_output_file(self, clean_df: pd.DataFrame) -> None:
+    def write_output_file(self, clean_df: pd.DataFrame) -> str:
         """
-        Write clean dataframe to csv file.
+        Write clean dataframe to csv file, compressed if a compression is
+        set, e.g. <file name>_clean.csv.gz for gz.
 
         Args:
             clean_df (pd.DataFrame): clean dataframe
+
+        Returns:
+            str: path to the clean csv file
         """
-        result_dir = "src/data/clean"
-        curr_dir = os.getcwd()
-        file_name = re.split(r"[\/\\]", self.file_path)[-1].rsplit(".csv", 1)[
-            0
-        ]
-        if os.path.exists(result_dir):
-            clean_df.to_csv(
-                f"./{result_dir}/{file_name}_clean.csv", index=False, sep=";"
-            )
-        else:
-            full_path = os.path.join(curr_dir, result_dir)
-            os.makedirs(full_path)
-            clean_df.to_csv(
-                f"{full_path}/{file_name}_clean.csv", index=False, sep=";"
-            )
+        result_dir = self.output_dir
+        # The csv file of a zip file is named after itself.
+        raw_name = self.member if self.member is not None else self.file_path
+        file_name = strip_compression(
+            re.split(r"[\/\\]", raw_name)[-1]
+        ).rsplit(".csv", 1)[0]
+        if not os.path.exists(result_dir):
+            os.makedirs(result_dir)
+        extension = ".csv"
+        if self.compression is not None:
+            extension += "." + self.compression
+        clean_path = os.path.join(result_dir, f"{file_name}_clean{extension}")
+        # pandas compresses the file from its extension.
+        clean_df.to_csv(clean_path, index=False, sep=";")
         print("CSV file has been successfully cleaned and saved.")
+        if self.state_path is not None:
+            self.add_to_state_store(clean_path)
+        return clean_path
+
+    def add_to_state_store(self, clean_path: str) -> None:
+        """
+        Add the rows of the clean csv file to the transaction store, as they
+        are read back for the upload.
+
+        Args:
+            clean_path (str): path to the clean csv file
+        """
+        with open_csv(clean_path, newline="") as clean_file:
+            transactions = [
+                Transaction(*(row[field] for field in Transaction._fields))
+                for row in csv.DictReader(clean_file, delimiter=";")
+            ]
+        state_store = TransactionStore(self.state_path)
+        state_store.open()
+        try:
+            state_store.add_transactions(batch_key(clean_path), transactions)
+        finally:
+            state_store.close()
+        print(f"{len(transactions)} rows have been added to the state store.")
+
+
+class CleaningProfiles:
+    def __init__(self, profiles_path: str = None) -> None:
+        """
+        Answers given while cleaning a file, stored by the header line of the
+        file, so that the next statements of the same bank are cleaned
+        without prompts.
+
+        Args:
+            profiles_path (str): path to the json file of the profiles
+        """
+        self.profiles_path: str = profiles_path
+        self.profiles: Dict[str, Dict] = dict()
+
+    def load(self) -> None:
+        """
+        Load the profiles from the profiles file, if it exists.
+        """
+        if self.profiles_path is not None and os.path.exists(
+            self.profiles_path
+        ):
+            with open(self.profiles_path, "r") as profiles_file:
+                self.profiles = json.load(profiles_file)
+
+    def save(self) -> None:
+        """
+        Save the profiles to the profiles file, which the watch folder may
+        be reading.
+        """
+        if self.profiles_path is not None:
+            write_atomically(
+                self.profiles_path, json.dumps(self.profiles, indent=2)
+            )
+
+    def find(self, file_path: str, member: str = None) -> Dict:
+        """
+        Args:
+            file_path (str): path to a raw csv file
+            member (str): csv file inside a zip file
+
+        Returns:
+            Dict: stored answers for the columns of the file, None if there
+            are none
+        """
+        return self.profiles.get(read_header_line(file_path, member))
+
+    def add(self, file_path: str, answers: Dict, member: str = None) -> None:
+        """
+        Store the answers given while cleaning a file.
+
+        Args:
+            file_path (str): path to the raw csv file
+            answers (Dict): answers of CleanCsv
+            member (str): csv file inside a zip file
+        """
+        self.profiles[read_header_line(file_path, member)] = answers
+
+    def clean(self, file_path: str, output_dir: str = "src/data/clean") -> str:
+        """
+        Clean a file without prompts using the answers stored for its
+        columns.
+
+        Args:
+            file_path (str): path to the raw csv file
+            output_dir (str): directory of the clean csv file
+
+        Returns:
+            str: path to the clean csv file, None if no answers are stored
+            for its columns
+        """
+        answers = self.find(file_path)
+        if answers is None:
+            return None
+        return CleanCsv(file_path, answers, output_dir).run_pipeline()
+
+
+def read_header_line(file_path: str, member: str = None) -> str:
+    """
+    Args:
+        file_path (str): path to a csv file, which can be compressed
+        member (str): csv file inside a zip file
+
+    Returns:
+        str: first line of the file without the byte order mark and the line
+        ending
+    """
+    with open_csv(file_path, member=member, encoding="utf-8-sig") as csv_file:
+        return csv_file.readline().rstrip("\r\n")
+
+
+def choose_member(file_path: str) -> str:
+    """
+    Request users to choose the csv file to clean in a zip file holding many
+    csv files.
+
+    Args:
+        file_path (str): path to a raw csv file
+
+    Returns:
+        str: name of the chosen csv file, None if the file isn't a zip file
+        or holds only one csv file
+    """
+    if detect_compression(file_path) != "zip":
+        return None
+    members = csv_members(file_path)
+    if len(members) < 2:
+        return None
+
+    print(f"\n{file_path} holds many csv files.\n")
+    for index, member in enumerate(members):
+        print(f"{index} - {member}")
+    while True:
+        try:
+            return members[
+                int(input("\nEnter the number of the csv file to clean - "))
+            ]
+        except ValueError:
+            print("\nPlease enter a valid number.")
+        except IndexError:
+            print("\nPlease enter a value within the given list.")
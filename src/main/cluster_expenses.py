@@ -0,0 +1,44 @@
+from typing import Dict, List, Tuple
+
+from src.main.records import Transaction
+
+
+class ExpenseClusters:
+    def __init__(self, max_examples: int = 5) -> None:
+        # Only the row numbers of the expenses are kept, and the first
+        # expenses of every cluster to show, so large files fit in memory.
+        self.clusters: Dict[str, List[int]] = dict()
+        self.examples: Dict[str, List[Tuple[int, Transaction]]] = dict()
+        self.max_examples = max_examples
+
+    def add(self, row_number: int, expense: Transaction) -> None:
+        """
+        Add an expense to the cluster of its merchant, e.g. "colruyt" for
+        "COLRUYT 1020" and "Colruyt".
+
+        Args:
+            row_number (int): row number of the expense (1-based)
+            expense (Transaction): expense
+        """
+        key = expense.merchant_key
+        if not key:
+            return
+        row_numbers = self.clusters.setdefault(key, list())
+        row_numbers.append(row_number)
+        if len(row_numbers) <= self.max_examples:
+            self.examples.setdefault(key, list()).append((row_number, expense))
+
+    def repeated(self, min_size: int = 2) -> List[Tuple[str, List[int]]]:
+        """
+        Returns:
+            List[Tuple[str, List[int]]]: key and row numbers of the clusters
+            with at least min_size expenses, largest first
+        """
+        return sorted(
+            (
+                (key, row_numbers)
+                for key, row_numbers in self.clusters.items()
+                if len(row_numbers) >= min_size
+            ),
+            key=lambda cluster: (-len(cluster[1]), cluster[1][0]),
+        )
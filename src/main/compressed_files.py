@@ -0,0 +1,133 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+from typing import IO, Dict, List
+
+# First bytes of the compressed files that can be read, by compression.
+MAGIC_NUMBERS: Dict[str, bytes] = {
+    "gz": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zip": b"PK\x03\x04",
+}
+
+# Compressions that files can be written with, by extension.
+COMPRESSED_EXTENSIONS: Dict[str, str] = {
+    ".gz": "gz",
+    ".bz2": "bz2",
+    ".xz": "xz",
+}
+
+OPENERS = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+def detect_compression(file_path: str) -> str:
+    """
+    Args:
+        file_path (str): path to a file
+
+    Returns:
+        str: gz, bz2, xz or zip, from the first bytes of the file, None if
+        it isn't compressed
+    """
+    with open(file_path, "rb") as raw_file:
+        head = raw_file.read(6)
+    for compression, magic_number in MAGIC_NUMBERS.items():
+        if head.startswith(magic_number):
+            return compression
+    return None
+
+
+def strip_compression(file_name: str) -> str:
+    """
+    Args:
+        file_name (str): e.g. statement.csv.gz
+
+    Returns:
+        str: file name without its compression extension, e.g. statement.csv
+    """
+    root, extension = os.path.splitext(file_name)
+    if extension.lower() in list(COMPRESSED_EXTENSIONS) + [".zip"]:
+        return root
+    return file_name
+
+
+def csv_members(file_path: str) -> List[str]:
+    """
+    Args:
+        file_path (str): path to a zip file
+
+    Returns:
+        List[str]: names of the csv files in the zip file, of all its files
+        if none ends with .csv
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        names = [
+            info.filename
+            for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        ]
+    csv_names = [name for name in names if name.lower().endswith(".csv")]
+    return csv_names or names
+
+
+def open_csv(
+    file_path: str,
+    mode: str = "r",
+    member: str = None,
+    encoding: str = None,
+    newline: str = None,
+) -> IO:
+    """
+    Open a csv file as a stream, decompressing it on the fly if it is a
+    gz, bz2, xz or zip file. Written files are compressed when their path
+    ends with .gz, .bz2 or .xz.
+
+    Args:
+        file_path (str): path to the file
+        mode (str): r, rb or w
+        member (str): file to read inside a zip file, the only csv file of
+        the zip file by default
+        encoding (str): encoding of the text, as in open
+        newline (str): newline handling of the text, as in open
+
+    Returns:
+        IO: text stream, binary for rb
+
+    Raises:
+        ValueError: if a zip file has many csv files and no member is given
+    """
+    if mode == "w":
+        compression = COMPRESSED_EXTENSIONS.get(
+            os.path.splitext(str(file_path))[1].lower()
+        )
+    else:
+        compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, mode, encoding=encoding, newline=newline)
+    if compression != "zip":
+        if mode == "rb":
+            return OPENERS[compression](file_path, "rb")
+        return OPENERS[compression](
+            file_path, f"{mode}t", encoding=encoding, newline=newline
+        )
+
+    if member is None:
+        members = csv_members(file_path)
+        if not members:
+            raise ValueError(f"{file_path} has no csv file.")
+        if len(members) > 1:
+            raise ValueError(
+                f"{file_path} has {len(members)} csv files, choose one of "
+                f"{', '.join(members)}."
+            )
+        member = members[0]
+    # The member stays readable once the zip file is closed.
+    with zipfile.ZipFile(file_path) as archive:
+        member_file = archive.open(member)
+    if mode == "rb":
+        return member_file
+    return io.TextIOWrapper(member_file, encoding=encoding, newline=newline)
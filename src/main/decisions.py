@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import csv
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Pattern, Tuple, Union
+
+from src.main.compressed_files import open_csv
+from src.main.records import Decision, Transaction
+from src.main.split_expenses import allocate_cents, format_cents, to_cents
+
+if TYPE_CHECKING:
+    import splitwise
+
+DECISION_COLUMNS: List[str] = [
+    "group",
+    "friend",
+    "category",
+    "sub_category",
+    "split",
+]
+
+
+class ExpenseDecisions:
+    def __init__(self, decisions_path: str, inline: bool = False) -> None:
+        self.decisions_path: str = str(decisions_path)
+        self.inline: bool = inline
+        self.row_decisions: Dict[int, Dict[str, str]] = dict()
+        self.pattern_decisions: List[Tuple[Pattern, Dict[str, str]]] = list()
+        self.errors: List[str] = list()
+
+    def load(self) -> None:
+        """
+        Read decisions from the decisions file. A decision applies either to
+        one expense, through the `row` column (1-based, as numbered during
+        upload), or to every expense whose description matches the regex in
+        the `pattern` column. When the decisions are inline, i.e. extra
+        columns of the cleaned csv, each row applies to itself. Rows with an
+        invalid row number or pattern are skipped and reported by resolve.
+        """
+        self.row_decisions = dict()
+        self.pattern_decisions = list()
+        self.errors = list()
+
+        with open_csv(self.decisions_path) as decisions_file:
+            csv_reader = csv.DictReader(decisions_file, delimiter=";")
+            for index, row in enumerate(csv_reader, start=1):
+                decision = {
+                    column: (row.get(column) or "").strip()
+                    for column in DECISION_COLUMNS
+                }
+                if self.inline:
+                    if decision["group"]:
+                        self.row_decisions[index] = decision
+                elif (row.get("row") or "").strip():
+                    try:
+                        row_number = int(row["row"])
+                        if row_number < 1:
+                            raise ValueError
+                    except ValueError:
+                        self.errors.append(
+                            f"Line {csv_reader.line_num} of the decisions "
+                            f"file: {row['row'].strip()} is not a row number."
+                        )
+                        continue
+                    self.row_decisions[row_number] = decision
+                elif (row.get("pattern") or "").strip():
+                    try:
+                        pattern = re.compile(
+                            row["pattern"].strip(), re.IGNORECASE
+                        )
+                    except re.error as error:
+                        self.errors.append(
+                            f"Line {csv_reader.line_num} of the decisions "
+                            f"file: {row['pattern'].strip()} is not a valid "
+                            f"pattern ({error})."
+                        )
+                        continue
+                    self.pattern_decisions.append((pattern, decision))
+
+    def find_decision(
+        self, row_number: int, description: str
+    ) -> Dict[str, str]:
+        """
+        Return the decision for an expense. Row decisions take precedence
+        over pattern decisions, and patterns are tried in file order.
+
+        Args:
+            row_number (int): 1-based expense number in the cleaned csv
+            description (str): expense description
+
+        Returns:
+            Dict[str, str]: group, friend, category, sub_category and split,
+            or None if no decision applies.
+        """
+        if row_number in self.row_decisions:
+            return self.row_decisions[row_number]
+
+        for pattern, decision in self.pattern_decisions:
+            if pattern.search(description):
+                return decision
+
+        return None
+
+    def resolve(
+        self,
+        expenses: Iterable[Transaction],
+        user_id: int,
+        user_friends: Dict[int, str],
+        user_groups: Dict[int, str],
+        user_groups_members: Dict[int, List[int]],
+        all_sub_categories: Dict[str, Dict[str, splitwise.category.Category]],
+    ) -> Tuple[List[Decision], List[str]]:
+        """
+        Validate the decision of every expense against the account's groups,
+        friends and categories and turn it into the data to create the
+        expense.
+
+        Args:
+            expenses (Iterable[Transaction]): expenses from the cleaned csv
+            user_id (int): current user id
+            user_friends (Dict[int, str]): friends' ids and first names
+            user_groups (Dict[int, str]): groups' ids and names
+            user_groups_members (Dict[int, List[int]]): members of each group
+            all_sub_categories (Dict[str, Dict[str,
+            splitwise.category.Category]]): sub-categories for each category.
+
+        Returns:
+            Tuple[List[Decision], List[str]]: data to create each expense
+            and a list of every problem found, those of the decisions file
+            first.
+        """
+        group_ids_by_name: Dict[str, int] = {
+            group_name: group_id
+            for group_id, group_name in user_groups.items()
+        }
+        all_expense_info: List[
+            Dict[str, Union[str, float, splitwise.category.Category, int]]
+        ] = list()
+        errors: List[str] = list(self.errors)
+        split_rows: List[int] = list()
+        split_costs_cents: List[int] = list()
+        split_weights: List[List[float]] = list()
+
+        for row_number, expense in enumerate(expenses, start=1):
+            decision = self.find_decision(row_number, expense.description)
+            if decision is None:
+                errors.append(
+                    f"Expense {row_number} ({expense.description}) has no "
+                    "decision."
+                )
+                all_expense_info.append(None)
+                continue
+
+            expense_errors: List[str] = list()
+            expense_info: Dict[
+                str, Union[str, float, splitwise.category.Category, int]
+            ] = dict()
+
+            total_expense: float = None
+            try:
+                total_expense = expense.total_expense
+            except ValueError:
+                expense_errors.append(
+                    f"{expense.amount} is not a valid amount"
+                )
+
+            try:
+                expense_info["sub_category_name"] = decision["sub_category"]
+                expense_info["sub_category_obj"] = all_sub_categories[
+                    decision["category"]
+                ][decision["sub_category"]]
+            except KeyError:
+                expense_errors.append(
+                    f"{decision['category']} - {decision['sub_category']} is "
+                    "not a valid sub-category"
+                )
+
+            group_id = group_ids_by_name.get(decision["group"])
+            if group_id is None:
+                expense_errors.append(
+                    f"{decision['group']} is not one of your groups"
+                )
+            else:
+                expense_info["group_name"] = decision["group"]
+                expense_info["group_id"] = group_id
+                group_members = user_groups_members[group_id]
+
+                if group_members == [user_id]:
+                    if decision["friend"] or decision["split"]:
+                        expense_errors.append(
+                            f"{decision['group']} is a personal group so it "
+                            "takes no friend or split"
+                        )
+                else:
+                    friend_names: List[str] = [
+                        friend_name.strip()
+                        for friend_name in decision["friend"].split(",")
+                    ]
+                    friend_ids: List[int] = list()
+                    for friend_name in friend_names:
+                        matching_ids = [
+                            member_id
+                            for member_id in group_members
+                            if member_id != user_id
+                            and user_friends.get(member_id) == friend_name
+                        ]
+                        if len(matching_ids) != 1:
+                            expense_errors.append(
+                                f"{friend_name or 'An empty friend'} is not "
+                                f"exactly one friend in {decision['group']}"
+                            )
+                        else:
+                            friend_ids.extend(matching_ids)
+                    if len(set(friend_ids)) != len(friend_ids):
+                        expense_errors.append(
+                            f"{decision['friend']} lists a friend twice"
+                        )
+                    expense_info["friend_names"] = tuple(friend_names)
+                    expense_info["friend_ids"] = tuple(friend_ids)
+
+                    if total_expense is not None:
+                        try:
+                            weights = self.split_weights(
+                                total_expense,
+                                decision["split"],
+                                len(friend_names),
+                            )
+                        except ValueError as error:
+                            expense_errors.append(str(error))
+                        else:
+                            split_rows.append(row_number - 1)
+                            split_costs_cents.append(
+                                int(to_cents([total_expense])[0])
+                            )
+                            split_weights.append(weights)
+
+            if expense_errors:
+                errors.append(
+                    f"Expense {row_number} ({expense.description}): "
+                    + "; ".join(expense_errors)
+                    + "."
+                )
+                all_expense_info.append(None)
+            else:
+                all_expense_info.append(expense_info)
+
+        if not errors and split_rows:
+            max_participants: int = max(len(w) for w in split_weights)
+            all_shares: List[List[str]] = format_cents(
+                allocate_cents(
+                    split_costs_cents,
+                    [
+                        weights + [0.0] * (max_participants - len(weights))
+                        for weights in split_weights
+                    ],
+                )
+            )
+            for index, shares in zip(split_rows, all_shares):
+                participants = len(all_expense_info[index]["friend_ids"]) + 1
+                all_expense_info[index]["user_shares"] = tuple(
+                    shares[:participants]
+                )
+
+        return [
+            None if expense_info is None else Decision(**expense_info)
+            for expense_info in all_expense_info
+        ], errors
+
+    def split_weights(
+        self, total_expense: float, split: str, friends: int
+    ) -> List[float]:
+        """
+        Turn a split into the weight of the user followed by the weight of
+        each friend: `=` to split equally, `+<amount>,...` for the exact
+        amount owed by each friend and `%<percentage>,...` for the percentage
+        owed by each friend.
+
+        Args:
+            total_expense (float): total expense amount
+            split (str): split
+            friends (int): number of friends sharing the expense
+
+        Raises:
+            ValueError: if the split is not valid for this expense.
+
+        Returns:
+            List[float]: weights of the user and each friend
+        """
+        try:
+            if split == "=":
+                return [1.0] * (friends + 1)
+
+            if split.startswith("+"):
+                limit: float = to_cents([total_expense])[0]
+                friend_weights = to_cents(
+                    [float(amount) for amount in split[1:].split(",")]
+                ).tolist()
+            elif split.startswith("%"):
+                limit = 100
+                friend_weights = [
+                    round(float(percent), 2)
+                    for percent in split[1:].split(",")
+                ]
+            else:
+                raise ValueError
+
+            if (
+                len(friend_weights) != friends
+                or min(friend_weights) <= 0
+                or sum(friend_weights) > limit
+            ):
+                raise ValueError
+        except ValueError:
+            raise ValueError(
+                f"{split or 'An empty split'} is not a valid split for "
+                f"{total_expense} between you and {friends} friend(s) (use =, "
+                "+<amount>,... or %<percentage>,...)"
+            )
+
+        return [round(float(limit - sum(friend_weights)), 2), *friend_weights]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    import splitwise
+    from splitwise import Splitwise
+
+# Calls recorded instead of being sent to Splitwise.
+RECORDED_CALLS = {"createExpense", "updateExpense", "deleteExpense"}
+
+
+def expense_payload(expense: splitwise.expense.Expense) -> Dict[str, Any]:
+    """
+    Form fields the Splitwise client sends to create or update an expense,
+    without changing the expense like the client does.
+
+    Args:
+        expense (splitwise.expense.Expense): expense to send
+
+    Returns:
+        Dict[str, Any]: fields of the expense, `users__<n>__<field>` for
+        every user
+    """
+    payload: Dict[str, Any] = {
+        key: value
+        for key, value in vars(expense).items()
+        if key not in ("users", "category", "receiptPath")
+    }
+    for count, user in enumerate(expense.getUsers() or []):
+        for key, value in vars(user).items():
+            if key == "picture":
+                continue
+            field = "user_id" if key == "id" else key
+            payload[f"users__{count}__{field}"] = value
+    if expense.getCategory() is not None:
+        payload["category_id"] = expense.getCategory().getId()
+    return payload
+
+
+class DryRunSplitwise:
+    def __init__(self, make_client: Callable[[], Splitwise]) -> None:
+        """
+        Stand-in for the Splitwise client that records the expenses it would
+        create, update or delete instead of sending them. Everything else,
+        e.g. groups and categories, is read from Splitwise by the client
+        returned by `make_client`, built on first use.
+
+        Args:
+            make_client (Callable[[], Splitwise]): returns the Splitwise
+            client to read from
+        """
+        self.make_client = make_client
+        self.client: Splitwise = None
+        self.lock = threading.Lock()
+        self.payloads: List[Dict[str, Any]] = list()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for the read calls, which aren't defined here.
+        if name.startswith("__"):
+            raise AttributeError(name)
+        with self.lock:
+            if self.client is None:
+                self.client = self.make_client()
+        return getattr(self.client, name)
+
+    def record(self, call: str, payload: Dict[str, Any]) -> None:
+        """
+        Args:
+            call (str): name of the Splitwise method, e.g. "createExpense"
+            payload (Dict[str, Any]): fields that would have been sent
+        """
+        with self.lock:
+            self.payloads.append({"call": call, "payload": payload})
+
+    def createExpense(
+        self, expense: splitwise.expense.Expense
+    ) -> Tuple[splitwise.expense.Expense, None]:
+        self.record("createExpense", expense_payload(expense))
+        return expense, None
+
+    def updateExpense(
+        self, expense: splitwise.expense.Expense
+    ) -> Tuple[splitwise.expense.Expense, None]:
+        self.record("updateExpense", expense_payload(expense))
+        return expense, None
+
+    def deleteExpense(self, expense_id: int) -> Tuple[bool, None]:
+        self.record("deleteExpense", {"id": expense_id})
+        return True, None
+
+    def save(self, dry_run_path: str) -> None:
+        """
+        Save the recorded calls to a json file.
+
+        Args:
+            dry_run_path (str): path to the json file
+        """
+        dry_run_dir = os.path.dirname(str(dry_run_path))
+        if dry_run_dir and not os.path.exists(dry_run_dir):
+            os.makedirs(dry_run_dir)
+        with self.lock, open(dry_run_path, "w") as dry_run_file:
+            json.dump(self.payloads, dry_run_file, indent=4, default=str)
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, List
+
+from src.main.split_expenses import to_cents
+
+if TYPE_CHECKING:
+    import splitwise
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    cost_cents INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category_id INTEGER,
+    updated_at TEXT,
+    users TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS expenses_date ON expenses (date);
+CREATE INDEX IF NOT EXISTS expenses_cost ON expenses (cost_cents);
+CREATE INDEX IF NOT EXISTS expenses_description
+    ON expenses (description COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def to_iso_date(raw_date: str) -> str:
+    """
+    Args:
+        raw_date (str): Splitwise date (2022-12-20T13:00:00Z) or csv date
+        (20/12/2022)
+
+    Returns:
+        str: date as YYYY-MM-DD
+    """
+    try:
+        return datetime.strptime(raw_date, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return raw_date[:10]
+
+
+class ExpenseStore:
+    def __init__(self, store_path: str) -> None:
+        """
+        Local SQLite copy of the user's expenses on Splitwise.
+
+        Args:
+            store_path (str): path to the SQLite database
+        """
+        self.store_path: str = str(store_path)
+        self.lock = threading.Lock()
+        self.connection: sqlite3.Connection = None
+
+    def open(self) -> None:
+        """
+        Open the database, creating it if it doesn't exist.
+        """
+        store_dir = os.path.dirname(self.store_path)
+        if store_dir and not os.path.exists(store_dir):
+            os.makedirs(store_dir)
+        # Uploads write through from worker threads, every access holds the
+        # lock.
+        self.connection = sqlite3.connect(
+            self.store_path, check_same_thread=False
+        )
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+            # Costs used to be written as numpy integers, which sqlite stores
+            # as the raw bytes of the number.
+            blob_costs = self.connection.execute(
+                "SELECT id, cost_cents FROM expenses "
+                "WHERE typeof(cost_cents) = 'blob'"
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE expenses SET cost_cents = ? WHERE id = ?",
+                [
+                    (
+                        int.from_bytes(
+                            row["cost_cents"], sys.byteorder, signed=True
+                        ),
+                        row["id"],
+                    )
+                    for row in blob_costs
+                ],
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @property
+    def updated_after(self) -> str:
+        """
+        Returns:
+            str: latest update time of the synced expenses, None before the
+            first sync
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM sync_state WHERE key = 'updated_after'"
+            ).fetchone()
+        return None if row is None else row["value"]
+
+    def write_expenses(
+        self, expenses: List[splitwise.expense.Expense], updated_after: str
+    ) -> None:
+        """
+        Insert or replace expenses, remove the deleted ones and move the sync
+        cursor, in one transaction.
+
+        Args:
+            expenses (List[splitwise.expense.Expense]): Splitwise expenses
+            updated_after (str): new sync cursor, unchanged if None
+        """
+        rows = list()
+        deleted_ids = list()
+        for expense in expenses:
+            if expense.getDeletedAt() is not None:
+                deleted_ids.append((expense.getId(),))
+                continue
+            rows.append(
+                (
+                    expense.getId(),
+                    expense.getGroupId() or 0,
+                    to_iso_date(expense.getDate()),
+                    int(to_cents([float(expense.getCost())])[0]),
+                    expense.getCurrencyCode(),
+                    expense.getDescription() or "",
+                    expense.getCategory().getId(),
+                    expense.getUpdatedAt(),
+                    json.dumps(
+                        [
+                            [
+                                user.getId(),
+                                user.getPaidShare(),
+                                user.getOwedShare(),
+                            ]
+                            for user in expense.getUsers()
+                        ]
+                    ),
+                )
+            )
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO expenses VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.connection.executemany(
+                "DELETE FROM expenses WHERE id = ?", deleted_ids
+            )
+            if updated_after is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES "
+                    "('updated_after', ?)",
+                    (updated_after,),
+                )
+
+    def add_expense(self, expense: splitwise.expense.Expense) -> None:
+        """
+        Write through an expense just created on Splitwise. The sync cursor
+        is left as is, so the next sync still fetches anything updated in
+        between.
+
+        Args:
+            expense (splitwise.expense.Expense): created expense
+        """
+        self.write_expenses([expense], None)
+
+    def sync(
+        self,
+        get_expenses: Callable[..., List[splitwise.expense.Expense]],
+        page_size: int = 200,
+    ) -> int:
+        """
+        Fetch expenses updated since the last sync, page by page. Each page
+        is written in one transaction.
+
+        Args:
+            get_expenses (Callable[..., List[splitwise.expense.Expense]]):
+            fetches a page of expenses, e.g. UploadExpense.get_expenses or
+            Splitwise.getExpenses
+            page_size (int): number of expenses fetched per request
+
+        Returns:
+            int: number of expenses fetched
+        """
+        fetched: int = 0
+        offset: int = 0
+        updated_after: str = self.updated_after
+        latest_update: str = updated_after
+
+        while True:
+            expenses = get_expenses(
+                offset=offset,
+                limit=page_size,
+                updated_after=updated_after,
+            )
+            for expense in expenses:
+                updated_at = expense.getUpdatedAt()
+                if updated_at and (
+                    latest_update is None or updated_at > latest_update
+                ):
+                    latest_update = updated_at
+            # The cursor moves only once every page has been written, so an
+            # interrupted sync starts over from the previous cursor.
+            last_page = len(expenses) < page_size
+            self.write_expenses(expenses, latest_update if last_page else None)
+
+            fetched += len(expenses)
+            offset += len(expenses)
+            if last_page:
+                break
+        return fetched
+
+    def count(self) -> int:
+        """
+        Returns:
+            int: number of stored expenses
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM expenses"
+            ).fetchone()[0]
+
+    def find(
+        self,
+        date: str = None,
+        cost: float = None,
+        description: str = None,
+    ) -> List[sqlite3.Row]:
+        """
+        Find stored expenses, e.g. to check if an expense was already
+        uploaded.
+
+        Args:
+            date (str): date of the expense (YYYY-MM-DD or DD/MM/YYYY)
+            cost (float): cost of the expense
+            description (str): description of the expense, case-insensitive
+
+        Returns:
+            List[sqlite3.Row]: matching expenses, the latest first
+        """
+        conditions: List[str] = list()
+        parameters: List = list()
+        if date is not None:
+            conditions.append("date = ?")
+            parameters.append(to_iso_date(date))
+        if cost is not None:
+            conditions.append("cost_cents = ?")
+            parameters.append(int(to_cents([cost])[0]))
+        if description is not None:
+            conditions.append("description = ? COLLATE NOCASE")
+            parameters.append(description)
+
+        query = "SELECT * FROM expenses"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date DESC, id DESC"
+        with self.lock:
+            return self.connection.execute(query, parameters).fetchall()
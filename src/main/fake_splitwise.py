@@ -0,0 +1,573 @@
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from splitwise import Splitwise
+
+API_PREFIX = "/api/" + Splitwise.SPLITWISE_VERSION + "/"
+
+
+def now_iso() -> str:
+    """
+    Returns:
+        str: current UTC time as Splitwise formats it
+    """
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+@contextmanager
+def patch_splitwise_urls(base_url: str) -> Iterator[None]:
+    """
+    Point every Splitwise client in this process to another server. The
+    Splitwise SDK reads its urls from class attributes, so they are replaced
+    on the class and restored on exit.
+
+    Args:
+        base_url (str): base url of the server, e.g. "http://127.0.0.1:8000/"
+    """
+    original_base_url = Splitwise.SPLITWISE_BASE_URL
+    original_urls: Dict[str, str] = {
+        name: value
+        for name, value in vars(Splitwise).items()
+        if name.endswith("_URL") and isinstance(value, str)
+    }
+    path_start = len(original_base_url)
+    for name, value in original_urls.items():
+        if value.startswith(original_base_url):
+            setattr(Splitwise, name, base_url + value[path_start:])
+    try:
+        yield
+    finally:
+        for name, value in original_urls.items():
+            setattr(Splitwise, name, value)
+
+
+class FakeSplitwiseHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        self.respond("GET")
+
+    def do_POST(self) -> None:
+        self.respond("POST")
+
+    def respond(self, method: str) -> None:
+        """
+        Pass the request to the fake server and send back its json response.
+
+        Args:
+            method (str): http method
+        """
+        url = urlsplit(self.path)
+        form: Dict[str, str] = dict()
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8")
+            form = {key: values[-1] for key, values in parse_qs(body).items()}
+        query = {
+            key: values[-1] for key, values in parse_qs(url.query).items()
+        }
+
+        status, content = self.server.fake.handle(
+            method, url.path, query, form
+        )
+
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class FakeSplitwiseHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeSplitwiseServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: int = None,
+        fault_endpoints: Tuple[str, ...] = ("create_expense",),
+        seed: int = 0,
+    ) -> None:
+        """
+        Local stand-in for the Splitwise API serving a small test account.
+
+        Args:
+            host (str): host to listen on
+            port (int): port to listen on, 0 picks a free port
+            latency (float): seconds added to every response
+            error_rate (float): share (0-1) of requests answered with a 500
+            rate_limit (int): requests per second answered before responding
+            with a 429, no limit if None
+            fault_endpoints (Tuple[str, ...]): endpoints the errors and the
+            rate limit apply to
+            seed (int): seed of the injected errors
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.fault_endpoints = fault_endpoints
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent_requests: deque = deque()
+        self.stats: Counter = Counter()
+
+        self.user_id: int = 23450949
+        self.users: Dict[int, str] = {
+            23450949: "Nemish",
+            82514972: "Tom",
+            25087341: "Linda",
+            39083412: "George",
+        }
+        self.groups: Dict[int, Tuple[str, List[int]]] = {
+            34894512: ("Restaurant", [23450949, 82514972]),
+            20340193: ("Home", [23450949, 82514972, 25087341]),
+            12349123: ("Travel", [23450949, 82514972, 39083412]),
+            12035391: ("Personal", [23450949]),
+        }
+        self.categories: Dict[Tuple[int, str], Dict[int, str]] = {
+            (1, "Utilities"): {5: "Electricity", 6: "Heat/gas"},
+            (2, "Uncategorized"): {18: "General"},
+            (19, "Entertainment"): {20: "Movies", 21: "Music"},
+            (25, "Food and drink"): {12: "Groceries", 13: "Dining out"},
+        }
+        self.expenses: List[Dict] = list()
+
+        self.httpd = FakeSplitwiseHTTPServer(
+            (host, port), FakeSplitwiseHandler
+        )
+        self.httpd.fake = self
+        self.thread: threading.Thread = None
+
+    @property
+    def base_url(self) -> str:
+        """
+        Returns:
+            str: base url of the server
+        """
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> None:
+        """
+        Serve requests in a background thread.
+        """
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving requests.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "FakeSplitwiseServer":
+        self.start()
+        self.patch = patch_splitwise_urls(self.base_url)
+        self.patch.__enter__()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.patch.__exit__(*exc_info)
+        self.stop()
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        query: Dict[str, str],
+        form: Dict[str, str],
+    ) -> Tuple[int, Dict]:
+        """
+        Answer a request, injecting latency, rate limiting and errors.
+
+        Args:
+            method (str): http method
+            path (str): request path
+            query (Dict[str, str]): query parameters
+            form (Dict[str, str]): form fields of a POST request
+
+        Returns:
+            Tuple[int, Dict]: http status and json content
+        """
+        api_path = path.replace(API_PREFIX, "", 1)
+        endpoint, _, resource_id = api_path.partition("/")
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            faulty = endpoint in self.fault_endpoints
+            if faulty and self.rate_limit is not None:
+                now = time.monotonic()
+                while self.recent_requests and (
+                    now - self.recent_requests[0] >= 1
+                ):
+                    self.recent_requests.popleft()
+                if len(self.recent_requests) >= self.rate_limit:
+                    self.stats[f"{endpoint} 429"] += 1
+                    return 429, {"error": "Rate limit exceeded"}
+                self.recent_requests.append(now)
+
+            if faulty and self.random.random() < self.error_rate:
+                self.stats[f"{endpoint} 500"] += 1
+                return 500, {"error": "Injected server error"}
+
+            routes = {
+                ("GET", "get_current_user"): self.get_current_user,
+                ("GET", "get_friends"): self.get_friends,
+                ("GET", "get_groups"): self.get_groups,
+                ("GET", "get_group"): self.get_group,
+                ("GET", "get_categories"): self.get_categories,
+                ("GET", "get_currencies"): self.get_currencies,
+                ("GET", "get_expenses"): self.get_expenses,
+                ("GET", "get_expense"): self.get_expense,
+                ("POST", "create_expense"): self.create_expense,
+                ("POST", "update_expense"): self.update_expense,
+                ("POST", "delete_expense"): self.delete_expense,
+            }
+            if (
+                not path.startswith(API_PREFIX)
+                or (method, endpoint) not in routes
+            ):
+                self.stats[f"{endpoint} 404"] += 1
+                return 404, {"error": "Not found"}
+
+            status, content = routes[(method, endpoint)](
+                resource_id, query, form
+            )
+            self.stats[f"{endpoint} {status}"] += 1
+            return status, content
+
+    def user_json(self, user_id: int) -> Dict:
+        """
+        Args:
+            user_id (int): user id
+
+        Returns:
+            Dict: user as returned by Splitwise
+        """
+        return {
+            "id": user_id,
+            "first_name": self.users[user_id],
+            "last_name": None,
+            "email": f"{self.users[user_id].lower()}@example.com",
+            "registration_status": "confirmed",
+            "balance": [],
+        }
+
+    def group_json(self, group_id: int) -> Dict:
+        """
+        Args:
+            group_id (int): group id
+
+        Returns:
+            Dict: group as returned by Splitwise
+        """
+        name, members = self.groups[group_id]
+        return {
+            "id": group_id,
+            "name": name,
+            "updated_at": "2022-12-01T10:00:00Z",
+            "created_at": "2022-12-01T10:00:00Z",
+            "simplify_by_default": False,
+            "original_debts": [],
+            "simplified_debts": [],
+            "members": [self.user_json(member) for member in members],
+        }
+
+    def get_current_user(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns the current user.
+        """
+        user = self.user_json(self.user_id)
+        user.update(
+            default_currency="EUR",
+            locale="en",
+            date_format="DD/MM/YYYY",
+            default_group_id=-1,
+        )
+        return 200, {"user": user}
+
+    def get_friends(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns every user of the account except the current user.
+        """
+        return 200, {
+            "friends": [
+                self.user_json(user_id)
+                for user_id in self.users
+                if user_id != self.user_id
+            ]
+        }
+
+    def get_groups(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns every group with its members.
+        """
+        return 200, {
+            "groups": [self.group_json(group_id) for group_id in self.groups]
+        }
+
+    def get_group(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns the group with the id in the path.
+        """
+        if not resource_id.isdigit() or int(resource_id) not in self.groups:
+            return 404, {"error": "Group not found"}
+        return 200, {"group": self.group_json(int(resource_id))}
+
+    def get_categories(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns the categories and their sub-categories.
+        """
+        return 200, {
+            "categories": [
+                {
+                    "id": category_id,
+                    "name": category_name,
+                    "subcategories": [
+                        {"id": sub_category_id, "name": sub_category_name}
+                        for sub_category_id, sub_category_name in (
+                            sub_categories.items()
+                        )
+                    ],
+                }
+                for (
+                    category_id,
+                    category_name,
+                ), sub_categories in self.categories.items()
+            ]
+        }
+
+    def get_currencies(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns a few of the currencies of Splitwise.
+        """
+        return 200, {
+            "currencies": [
+                {"currency_code": code, "unit": unit}
+                for code, unit in [
+                    ("EUR", "€"),
+                    ("USD", "$"),
+                    ("GBP", "£"),
+                    ("INR", "₹"),
+                ]
+            ]
+        }
+
+    def get_expenses(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns a page of expenses updated after `updated_after`,
+        optionally only those of `group_id`.
+        """
+        expenses = [
+            expense
+            for expense in self.expenses
+            if expense["updated_at"] > query.get("updated_after", "")
+            and (
+                "group_id" not in query
+                or expense["group_id"] == int(query["group_id"])
+            )
+        ]
+        offset = int(query.get("offset", 0))
+        end = offset + (int(query.get("limit", 20)) or len(expenses))
+        return 200, {"expenses": expenses[offset:end]}
+
+    def create_expense(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Validate and store an expense sent as form fields
+        (`users__<n>__<field>` for every user). Invalid expenses are answered
+        with errors, like Splitwise does.
+        """
+        errors: List[str] = list()
+        try:
+            cost = round(float(form["cost"]), 2)
+            group_id = int(form.get("group_id", 0))
+            category_id = int(form.get("category_id", 18))
+        except (KeyError, ValueError):
+            return 200, {"expenses": [], "errors": {"base": ["Invalid cost"]}}
+
+        users: List[Dict] = list()
+        count = 0
+        while f"users__{count}__user_id" in form:
+            user_id = int(form[f"users__{count}__user_id"])
+            paid_share = round(float(form[f"users__{count}__paid_share"]), 2)
+            owed_share = round(float(form[f"users__{count}__owed_share"]), 2)
+            users.append(
+                {
+                    "user": self.user_json(user_id),
+                    "user_id": user_id,
+                    "paid_share": f"{paid_share:.2f}",
+                    "owed_share": f"{owed_share:.2f}",
+                    "net_balance": f"{paid_share - owed_share:.2f}",
+                }
+            )
+            count += 1
+
+        errors.extend(self.group_errors(group_id, users))
+        for share in ["paid_share", "owed_share"]:
+            if round(sum(float(user[share]) for user in users), 2) != cost:
+                errors.append(f"The total of {share} must equal the cost")
+        if errors:
+            return 200, {"expenses": [], "errors": {"base": errors}}
+
+        now = now_iso()
+        expense = {
+            "id": len(self.expenses) + 1,
+            "group_id": group_id,
+            "description": form.get("description", ""),
+            "repeats": False,
+            "repeat_interval": "never",
+            "email_reminder": False,
+            "email_reminder_in_advance": -1,
+            "next_repeat": None,
+            "details": None,
+            "comments_count": 0,
+            "payment": False,
+            "creation_method": None,
+            "transaction_method": "offline",
+            "transaction_confirmed": False,
+            "cost": f"{cost:.2f}",
+            "currency_code": form.get("currency_code", "EUR"),
+            "created_by": self.user_json(self.user_id),
+            "date": form.get("date", now),
+            "created_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+            "receipt": {"original": None, "large": None},
+            "category": self.category_json(category_id),
+            "updated_by": None,
+            "deleted_by": None,
+            "repayments": [],
+            "users": users,
+        }
+        self.expenses.append(expense)
+        return 200, {"expenses": [expense], "errors": {}}
+
+    def group_errors(self, group_id: int, users: List[Dict]) -> List[str]:
+        """
+        Args:
+            group_id (int): group of an expense
+            users (List[Dict]): users of the expense
+
+        Returns:
+            List[str]: errors if the group doesn't exist or a user isn't a
+            member
+        """
+        if group_id not in self.groups:
+            return ["Group does not exist"]
+        if any(
+            user["user_id"] not in self.groups[group_id][1] for user in users
+        ):
+            return ["Every user must be a member of the group"]
+        return []
+
+    def category_json(self, category_id: int) -> Dict:
+        """
+        Args:
+            category_id (int): sub-category id
+
+        Returns:
+            Dict: sub-category as returned with an expense
+        """
+        sub_category_name = [
+            sub_categories[category_id]
+            for sub_categories in self.categories.values()
+            if category_id in sub_categories
+        ]
+        return {
+            "id": category_id,
+            "name": (sub_category_name or ["General"])[0],
+        }
+
+    def find_expense(self, resource_id: str) -> Dict:
+        """
+        Args:
+            resource_id (str): expense id from the url
+
+        Returns:
+            Dict: the expense, None if there is none with that id
+        """
+        try:
+            expense_id = int(resource_id)
+        except ValueError:
+            return None
+        if 1 <= expense_id <= len(self.expenses):
+            return self.expenses[expense_id - 1]
+        return None
+
+    def get_expense(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Returns an expense, deleted expenses included.
+        """
+        expense = self.find_expense(resource_id)
+        if expense is None:
+            return 404, {"errors": {"base": ["Expense not found"]}}
+        return 200, {"expense": expense}
+
+    def update_expense(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Update the group, sub-category or description of an expense. The
+        users are kept, so they must be members of the new group.
+        """
+        expense = self.find_expense(resource_id)
+        if expense is None or expense["deleted_at"] is not None:
+            return 404, {"errors": {"base": ["Expense not found"]}}
+        try:
+            group_id = int(form.get("group_id", expense["group_id"]))
+            category_id = int(
+                form.get("category_id", expense["category"]["id"])
+            )
+        except ValueError:
+            return 200, {"expenses": [], "errors": {"base": ["Invalid id"]}}
+
+        errors = self.group_errors(group_id, expense["users"])
+        if errors:
+            return 200, {"expenses": [], "errors": {"base": errors}}
+        expense.update(
+            group_id=group_id,
+            category=self.category_json(category_id),
+            description=form.get("description", expense["description"]),
+            updated_at=now_iso(),
+            updated_by=self.user_json(self.user_id),
+        )
+        return 200, {"expenses": [expense], "errors": {}}
+
+    def delete_expense(self, resource_id, query, form) -> Tuple[int, Dict]:
+        """
+        Mark an expense as deleted, like Splitwise does.
+        """
+        expense = self.find_expense(resource_id)
+        if expense is None or expense["deleted_at"] is not None:
+            return 404, {"errors": {"base": ["Expense not found"]}}
+        now = now_iso()
+        expense.update(
+            deleted_at=now,
+            updated_at=now,
+            deleted_by=self.user_json(self.user_id),
+        )
+        return 200, {"success": True, "errors": {}}
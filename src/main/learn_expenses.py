@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import defaultdict
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+if TYPE_CHECKING:
+    import splitwise
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{2,}")
+
+
+class ExpenseIndex:
+    def __init__(self, index_path: str) -> None:
+        self.index_path: str = str(index_path)
+        self.updated_after: str = None
+        self.documents: Dict[str, Dict[str, Union[str, int, float]]] = dict()
+        self.postings: Dict[str, Set[str]] = defaultdict(set)
+
+    def load(self) -> None:
+        """
+        Load documents and sync cursor from the index file, if it exists, and
+        rebuild the inverted index.
+        """
+        self.updated_after = None
+        self.documents = dict()
+        self.postings = defaultdict(set)
+
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path, "r") as index_file:
+            content = json.load(index_file)
+
+        self.updated_after = content["updated_after"]
+        for expense_id, document in content["documents"].items():
+            self.add_document(expense_id, document)
+
+    def save(self) -> None:
+        """
+        Write documents and sync cursor to the index file.
+        """
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        with open(self.index_path, "w") as index_file:
+            json.dump(
+                {
+                    "updated_after": self.updated_after,
+                    "documents": self.documents,
+                },
+                index_file,
+            )
+
+    def tokenize(self, description: str) -> List[str]:
+        """
+        Split a description into lowercase word tokens. Numbers are ignored
+        since they are mostly card numbers, terminal ids and dates.
+
+        Args:
+            description (str): expense description
+
+        Returns:
+            List[str]: tokens
+        """
+        return TOKEN_PATTERN.findall(description.lower())
+
+    def add_document(
+        self, expense_id: str, document: Dict[str, Union[str, int, float]]
+    ) -> None:
+        """
+        Add or replace a document in the index.
+
+        Args:
+            expense_id (str): Splitwise expense id
+            document (Dict[str, Union[str, int, float]]): description,
+            sub_category_id, group_id, friend_ids and friend_shares.
+        """
+        self.remove_document(expense_id)
+        self.documents[expense_id] = document
+        for token in set(self.tokenize(document["description"])):
+            self.postings[token].add(expense_id)
+
+    def remove_document(self, expense_id: str) -> None:
+        """
+        Remove a document from the index if it exists.
+
+        Args:
+            expense_id (str): Splitwise expense id
+        """
+        document = self.documents.pop(expense_id, None)
+        if document is None:
+            return
+
+        for token in set(self.tokenize(document["description"])):
+            self.postings[token].discard(expense_id)
+            if not self.postings[token]:
+                del self.postings[token]
+
+    def document_from_expense(
+        self, expense: splitwise.expense.Expense, user_id: int
+    ) -> Optional[Dict[str, Union[str, int, float]]]:
+        """
+        Turn a Splitwise expense into an index document. Only expenses paid
+        in full by the user are kept, since those are the only ones this tool
+        creates.
+
+        Args:
+            expense (splitwise.expense.Expense): Splitwise expense
+            user_id (int): current user id
+
+        Returns:
+            Optional[Dict[str, Union[str, int, float]]]: document or None if
+            the expense can't be learned from.
+        """
+        if expense.getDeletedAt() is not None or expense.getPayment():
+            return None
+
+        cost = float(expense.getCost())
+        if cost <= 0:
+            return None
+
+        friend_ids: List[int] = list()
+        friend_shares: List[float] = list()
+        user_paid: float = 0.0
+        for expense_user in expense.getUsers():
+            if expense_user.getId() == user_id:
+                user_paid = float(expense_user.getPaidShare())
+            elif float(expense_user.getOwedShare()) > 0:
+                friend_ids.append(expense_user.getId())
+                friend_shares.append(
+                    round(float(expense_user.getOwedShare()) / cost, 4)
+                )
+
+        if round(user_paid, 2) != round(cost, 2):
+            return None
+
+        return {
+            "description": expense.getDescription() or "",
+            "sub_category_id": expense.getCategory().getId(),
+            "group_id": expense.getGroupId() or 0,
+            "friend_ids": friend_ids,
+            "friend_shares": friend_shares,
+        }
+
+    def sync(
+        self,
+        get_expenses: Callable[..., List[splitwise.expense.Expense]],
+        user_id: int,
+        page_size: int = 200,
+    ) -> int:
+        """
+        Fetch expenses updated since the last sync, page by page, and update
+        the index in place.
+
+        Args:
+            get_expenses (Callable[..., List[splitwise.expense.Expense]]):
+            fetches a page of expenses, e.g. UploadExpense.get_expenses or
+            Splitwise.getExpenses
+            user_id (int): current user id
+            page_size (int): number of expenses fetched per request
+
+        Returns:
+            int: number of expenses fetched
+        """
+        fetched: int = 0
+        offset: int = 0
+        latest_update: str = self.updated_after
+
+        while True:
+            expenses = get_expenses(
+                offset=offset,
+                limit=page_size,
+                updated_after=self.updated_after,
+            )
+            for expense in expenses:
+                expense_id = str(expense.getId())
+                document = self.document_from_expense(expense, user_id)
+                if document is None:
+                    self.remove_document(expense_id)
+                else:
+                    self.add_document(expense_id, document)
+
+                updated_at = expense.getUpdatedAt()
+                if updated_at and (
+                    latest_update is None or updated_at > latest_update
+                ):
+                    latest_update = updated_at
+
+            fetched += len(expenses)
+            offset += len(expenses)
+            if len(expenses) < page_size:
+                break
+
+        self.updated_after = latest_update
+        return fetched
+
+    def predict(
+        self, description: str, neighbours: int = 5
+    ) -> Optional[
+        Tuple[Tuple[int, int, Tuple[int, ...], Tuple[float, ...]], float]
+    ]:
+        """
+        Predict sub-category, group, friends and friends' shares for a
+        description from its nearest TF-IDF neighbours.
+
+        The confidence is the similarity-weighted share of the neighbours
+        voting for the prediction, scaled by the best similarity among them.
+
+        Args:
+            description (str): expense description
+            neighbours (int): number of nearest neighbours that vote
+
+        Returns:
+            Optional[Tuple[Tuple[int, int, Tuple[int, ...], Tuple[float,
+            ...]], float]]: (sub_category_id, group_id, friend_ids,
+            friend_shares) and a confidence between 0 and 1, or None if no
+            document shares a token with the description.
+        """
+        query_tokens = self.tokenize(description or "")
+        if not query_tokens or not self.documents:
+            return None
+
+        total_documents = len(self.documents)
+
+        def idf(token: str) -> float:
+            return (
+                math.log(
+                    (total_documents + 1) / (len(self.postings[token]) + 1)
+                )
+                + 1
+            )
+
+        query_weights: Dict[str, float] = defaultdict(float)
+        for token in query_tokens:
+            if token in self.postings:
+                query_weights[token] += idf(token)
+        if not query_weights:
+            return None
+        query_norm = math.sqrt(sum(w * w for w in query_weights.values()))
+
+        candidates: Set[str] = set()
+        for token in query_weights:
+            candidates |= self.postings[token]
+
+        scored: List[Tuple[float, str]] = list()
+        for expense_id in candidates:
+            document_weights: Dict[str, float] = defaultdict(float)
+            for token in self.tokenize(
+                self.documents[expense_id]["description"]
+            ):
+                document_weights[token] += idf(token)
+            document_norm = math.sqrt(
+                sum(w * w for w in document_weights.values())
+            )
+            dot = sum(
+                weight * document_weights.get(token, 0.0)
+                for token, weight in query_weights.items()
+            )
+            scored.append((dot / (query_norm * document_norm), expense_id))
+
+        scored.sort(reverse=True)
+        votes: Dict[Tuple, float] = defaultdict(float)
+        best_similarity: Dict[Tuple, float] = dict()
+        for similarity, expense_id in scored[:neighbours]:
+            document = self.documents[expense_id]
+            label = (
+                document["sub_category_id"],
+                document["group_id"],
+                tuple(document["friend_ids"]),
+                tuple(document["friend_shares"]),
+            )
+            votes[label] += similarity
+            best_similarity[label] = max(
+                best_similarity.get(label, 0.0), similarity
+            )
+
+        label = max(votes, key=votes.get)
+        confidence = (
+            votes[label] / sum(votes.values()) * best_similarity[label]
+        )
+
+        return label, round(confidence, 4)
@@ -0,0 +1,126 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Pattern, Sequence, Tuple
+
+# Substitutions applied in order to every description to get the key of its
+# merchant, as [pattern, replacement]. Banks can replace them with their own,
+# e.g. to remove the city they add after the merchant, under
+# "merchant_patterns" in the cleaning profiles.
+DEFAULT_MERCHANT_PATTERNS: List[List[str]] = [
+    # Card numbers, e.g. "CARD 4871 04XX XXXX 1234" or "XXXX1234".
+    [
+        r"\b(?:card|carte|kaart)\b[\s.:#]*(?:n[or]\b\.?\s*)?"
+        r"(?:[\dx*]+(?:\s+|$))*",
+        " ",
+    ],
+    [r"(?<![a-z])[x*]{2,}[\dx*\s-]*\d{2,}\b", " "],
+    # Dates and times, e.g. "20/12/2022", "20.12" or "13:45".
+    [r"\b\d{1,4}[/.-]\d{1,2}(?:[/.-]\d{1,4})?\b", " "],
+    [r"\b\d{1,2}:\d{2}(?::\d{2})?\b", " "],
+    # Terminal and reference ids, e.g. "TID: 0042" or "REF A12B".
+    [r"\b(?:terminal|term|tid|pos|ref|trx)\b[\s.:#]*[\w-]*\d[\w-]*", " "],
+    # Store numbers and any other word with a digit.
+    [r"\b\w*\d\w*\b", " "],
+    # Punctuation.
+    [r"[^\w\s&']|_", " "],
+]
+
+
+def compile_merchant_patterns(
+    patterns: Sequence[Sequence[str]],
+) -> List[Tuple[Pattern, str]]:
+    """
+    Compile the substitutions, case-insensitive. Consecutive patterns with
+    the same replacement are merged into one alternation, so a description
+    is scanned once for all of them.
+
+    Args:
+        patterns (Sequence[Sequence[str]]): [pattern, replacement] pairs
+
+    Returns:
+        List[Tuple[Pattern, str]]: compiled pattern and replacement of every
+        pass
+    """
+    passes: List[Tuple[List[str], str]] = list()
+    for pattern, replacement in patterns:
+        if passes and passes[-1][1] == replacement:
+            passes[-1][0].append(pattern)
+        else:
+            passes.append(([pattern], replacement))
+    return [
+        (
+            re.compile(
+                "|".join(f"(?:{pattern})" for pattern in pass_patterns),
+                re.IGNORECASE,
+            ),
+            replacement,
+        )
+        for pass_patterns, replacement in passes
+    ]
+
+
+def merchant_key(
+    description: str, compiled_patterns: List[Tuple[Pattern, str]]
+) -> str:
+    """
+    Args:
+        description (str): expense description
+        compiled_patterns (List[Tuple[Pattern, str]]): see
+        compile_merchant_patterns
+
+    Returns:
+        str: lowercase merchant key, e.g. "colruyt" for
+        "COLRUYT 1020 20/12 CARD XXXX1234"
+    """
+    for pattern, replacement in compiled_patterns:
+        description = pattern.sub(replacement, description)
+    return " ".join(description.lower().split())
+
+
+def merchant_keys(
+    descriptions: Iterable[str],
+    compiled_patterns: List[Tuple[Pattern, str]],
+) -> List[str]:
+    """
+    Normalize many descriptions. Statements repeat the same descriptions a
+    lot, so each distinct description is only normalized once.
+
+    Args:
+        descriptions (Iterable[str]): expense descriptions
+        compiled_patterns (List[Tuple[Pattern, str]]): see
+        compile_merchant_patterns
+
+    Returns:
+        List[str]: merchant key of every description
+    """
+    keys: Dict[str, str] = dict()
+    result: List[str] = list()
+    for description in descriptions:
+        key = keys.get(description)
+        if key is None:
+            key = keys[description] = merchant_key(
+                description, compiled_patterns
+            )
+        result.append(key)
+    return result
+
+
+DEFAULT_COMPILED_PATTERNS: List[
+    Tuple[Pattern, str]
+] = compile_merchant_patterns(DEFAULT_MERCHANT_PATTERNS)
+
+
+@lru_cache(maxsize=4096)
+def default_merchant_key(description: str) -> str:
+    """
+    Merchant key of a description with the default substitutions, for clean
+    csv files written without a merchant column. Statements repeat the same
+    descriptions a lot, so the recent keys are cached.
+
+    Args:
+        description (str): expense description
+
+    Returns:
+        str: lowercase merchant key
+    """
+    return merchant_key(description, DEFAULT_COMPILED_PATTERNS)
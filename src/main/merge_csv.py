@@ -0,0 +1,176 @@
+import csv
+import heapq
+import os
+import sys
+from collections import Counter
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from src.main.compressed_files import open_csv
+from src.main.records import REQUIRED_FIELDS, Transaction
+
+
+def read_clean_csv(file_path: str) -> Iterator[Transaction]:
+    """
+    Read the expenses of a clean csv file one row at a time. Dates,
+    currencies and merchants repeat a lot, so they are interned. Files
+    without a merchant column get an empty merchant.
+
+    Args:
+        file_path (str): path to the clean csv file, which can be compressed
+
+    Yields:
+        Iterator[Transaction]: an expense.
+
+    Raises:
+        ValueError: if a column of the expenses is missing
+    """
+    with open_csv(file_path, newline="") as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter=";")
+        header: List[str] = next(csv_reader, [])
+        missing_columns = set(REQUIRED_FIELDS) - set(header)
+        if missing_columns:
+            raise ValueError(
+                f"{file_path} has no {', '.join(missing_columns)} column."
+            )
+        date, amount, description, currency = [
+            header.index(field) for field in REQUIRED_FIELDS
+        ]
+        merchant = header.index("merchant") if "merchant" in header else None
+        for row in csv_reader:
+            if not row:
+                continue
+            yield Transaction(
+                sys.intern(row[date]),
+                row[amount],
+                row[description],
+                sys.intern(row[currency]),
+                "" if merchant is None else sys.intern(row[merchant]),
+            )
+
+
+def date_key(expense: Transaction) -> str:
+    """
+    Args:
+        expense (Transaction): expense dated DD/MM/YYYY or YYYY-MM-DD
+
+    Returns:
+        str: date as YYYY-MM-DD, which sorts chronologically
+    """
+    raw_date = expense.date
+    if len(raw_date) == 10 and raw_date[2] == "/" and raw_date[5] == "/":
+        return f"{raw_date[6:]}-{raw_date[3:5]}-{raw_date[:2]}"
+    return raw_date
+
+
+def is_chronological(file_path: str) -> bool:
+    """
+    Args:
+        file_path (str): path to a clean csv file
+
+    Returns:
+        bool: True if the expenses of the file are in chronological order
+    """
+    previous_key: str = ""
+    for expense in read_clean_csv(file_path):
+        key = date_key(expense)
+        if key < previous_key:
+            return False
+        previous_key = key
+    return True
+
+
+def read_chronological(file_path: str) -> Iterator[Transaction]:
+    """
+    Read the expenses of a clean csv file in chronological order. Files
+    already in that order are streamed, the others, e.g. statements listing
+    the latest expense first, are sorted in memory, one file at a time.
+
+    Args:
+        file_path (str): path to the clean csv file
+
+    Returns:
+        Iterator[Transaction]: expenses, oldest first
+    """
+    if is_chronological(file_path):
+        return read_clean_csv(file_path)
+    return iter(sorted(read_clean_csv(file_path), key=date_key))
+
+
+def merge_clean_csvs(
+    file_paths: Iterable[str], drop_duplicates: bool = False
+) -> Iterator[Transaction]:
+    """
+    Merge the expenses of many clean csv files by date, as one stream: only
+    the next expense of every file is kept in memory. Expenses of the same
+    date keep the order of the files.
+
+    Args:
+        file_paths (Iterable[str]): paths to the clean csv files, e.g. one
+        per account and month
+        drop_duplicates (bool): drop expenses already read from another
+        file, e.g. when statements overlap. Identical expenses of one file
+        are all kept.
+
+    Yields:
+        Iterator[Transaction]: expenses, oldest first
+    """
+    # Every expense is tagged with the index of its file.
+    streams = [
+        zip(read_chronological(file_path), repeat(index))
+        for index, file_path in enumerate(file_paths)
+    ]
+    merged = heapq.merge(*streams, key=lambda item: date_key(item[0]))
+    if not drop_duplicates:
+        for expense, _ in merged:
+            yield expense
+        return
+
+    # Duplicates have the same date, so only the expenses of the current
+    # date are remembered.
+    current_key: str = None
+    yielded: Counter = Counter()
+    read: Dict[Tuple[Tuple[str, ...], int], int] = Counter()
+    for expense, index in merged:
+        key = date_key(expense)
+        if key != current_key:
+            current_key = key
+            yielded.clear()
+            read.clear()
+        # Files with and without a merchant column hold the same expenses.
+        fields = expense[: len(REQUIRED_FIELDS)]
+        read[fields, index] += 1
+        # An expense is new once its file has more copies of it than any
+        # file read before.
+        if read[fields, index] > yielded[fields]:
+            yielded[fields] += 1
+            yield expense
+
+
+def write_clean_csv(expenses: Iterable[Transaction], output_path: str) -> int:
+    """
+    Write expenses to a clean csv file, one row at a time. The file is
+    compressed if its path ends with .gz, .bz2 or .xz. Expenses read from
+    files without a merchant column get the merchant key of their
+    description.
+
+    Args:
+        expenses (Iterable[Transaction]): expenses
+        output_path (str): path to the clean csv file
+
+    Returns:
+        int: number of expenses written
+    """
+    output_dir = os.path.dirname(str(output_path))
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    count: int = 0
+    with open_csv(output_path, "w", newline="") as csv_file:
+        csv_writer = csv.writer(csv_file, delimiter=";")
+        csv_writer.writerow(Transaction._fields)
+        for expense in expenses:
+            csv_writer.writerow(
+                expense._replace(merchant=expense.merchant_key)
+            )
+            count += 1
+    return count
@@ -0,0 +1,331 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple, Union
+
+LATENCY_BUCKETS: List[float] = [
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+]
+
+PROMETHEUS_NAMES: Dict[str, Tuple[str, str, str]] = {
+    "api": (
+        "splitwise_api_request_seconds",
+        "call",
+        "Latency of Splitwise API calls.",
+    ),
+    "prompt": (
+        "upload_prompt_seconds",
+        "stage",
+        "Time spent answering upload prompts.",
+    ),
+}
+
+
+class Histogram:
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS) -> None:
+        self.buckets: List[float] = buckets
+        self.bucket_counts: List[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Args:
+            value (float): observed value
+        """
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket containing it.
+
+        Args:
+            q (float): quantile (0-1)
+
+        Returns:
+            float: estimated quantile, the largest value seen if it is in the
+            last bucket
+        """
+        rank = q * self.count
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(upper_bound, self.max)
+        return self.max
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.started: float = time.monotonic()
+        self.histograms: Dict[Tuple[str, str], Histogram] = dict()
+        self.errors: Counter = Counter()
+        self.retries: Counter = Counter()
+
+    def observe(self, kind: str, name: str, seconds: float) -> None:
+        """
+        Record a duration.
+
+        Args:
+            kind (str): "api" for Splitwise calls, "prompt" for prompt stages
+            name (str): call or stage name
+            seconds (float): duration
+        """
+        with self.lock:
+            self.histograms.setdefault((kind, name), Histogram()).observe(
+                seconds
+            )
+
+    @contextmanager
+    def time(self, kind: str, name: str) -> Iterator[None]:
+        """
+        Record the duration of the with block, even if it raises.
+
+        Args:
+            kind (str): "api" for Splitwise calls, "prompt" for prompt stages
+            name (str): call or stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, name, time.perf_counter() - start)
+
+    def count_error(self, call: str, status: int) -> None:
+        """
+        Args:
+            call (str): Splitwise call
+            status (int): http status of the failed request
+        """
+        with self.lock:
+            self.errors[(call, status)] += 1
+
+    def count_retry(self, call: str) -> None:
+        """
+        Args:
+            call (str): Splitwise call
+        """
+        with self.lock:
+            self.retries[call] += 1
+
+    def total_seconds(self, kind: str) -> float:
+        """
+        Args:
+            kind (str): "api" or "prompt"
+
+        Returns:
+            float: time spent in all calls or stages of that kind
+        """
+        with self.lock:
+            return sum(
+                histogram.sum
+                for (histogram_kind, _), histogram in self.histograms.items()
+                if histogram_kind == kind
+            )
+
+    def summary(self) -> Dict[str, Union[float, Dict]]:
+        """
+        Returns:
+            Dict[str, Union[float, Dict]]: session duration, time waiting on
+            Splitwise and on prompts, and the count, total, mean, p50, p95
+            and max duration, errors and retries of every call and stage
+        """
+        summary: Dict[str, Union[float, Dict]] = {
+            "session_seconds": round(time.monotonic() - self.started, 3),
+            "api_seconds": round(self.total_seconds("api"), 3),
+            "prompt_seconds": round(self.total_seconds("prompt"), 3),
+            "api": dict(),
+            "prompt": dict(),
+        }
+        with self.lock:
+            for (kind, name), histogram in sorted(self.histograms.items()):
+                summary[kind][name] = {
+                    "count": histogram.count,
+                    "total_seconds": round(histogram.sum, 3),
+                    "mean_seconds": round(histogram.sum / histogram.count, 3),
+                    "p50_seconds": round(histogram.quantile(0.5), 3),
+                    "p95_seconds": round(histogram.quantile(0.95), 3),
+                    "max_seconds": round(histogram.max, 3),
+                }
+            for (call, status), count in sorted(self.errors.items()):
+                call_summary = summary["api"].setdefault(call, dict())
+                call_summary.setdefault("errors", dict())[str(status)] = count
+            for call, count in sorted(self.retries.items()):
+                summary["api"].setdefault(call, dict())["retries"] = count
+        return summary
+
+    def save_json(self, json_path: str) -> None:
+        """
+        Write the summary to a json file.
+
+        Args:
+            json_path (str): path to the json file
+        """
+        write_atomically(json_path, json.dumps(self.summary(), indent=2))
+
+    def save_prometheus(self, textfile_path: str) -> None:
+        """
+        Write the metrics in the Prometheus text format, e.g. for the node
+        exporter textfile collector.
+
+        Args:
+            textfile_path (str): path to the .prom file
+        """
+        lines: List[str] = list()
+        with self.lock:
+            for kind, (metric, label, help_text) in PROMETHEUS_NAMES.items():
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_kind, name), histogram in sorted(
+                    self.histograms.items()
+                ):
+                    if histogram_kind != kind:
+                        continue
+                    cumulative = 0
+                    for upper_bound, bucket_count in zip(
+                        histogram.buckets + ["+Inf"], histogram.bucket_counts
+                    ):
+                        cumulative += bucket_count
+                        lines.append(
+                            f'{metric}_bucket{{{label}="{name}",'
+                            f'le="{upper_bound}"}} {cumulative}'
+                        )
+                    lines.append(
+                        f'{metric}_sum{{{label}="{name}"}} {histogram.sum}'
+                    )
+                    lines.append(
+                        f'{metric}_count{{{label}="{name}"}} {histogram.count}'
+                    )
+
+            lines.append(
+                "# HELP splitwise_api_errors_total Failed Splitwise API calls."
+            )
+            lines.append("# TYPE splitwise_api_errors_total counter")
+            for (call, status), count in sorted(self.errors.items()):
+                lines.append(
+                    f'splitwise_api_errors_total{{call="{call}",'
+                    f'status="{status}"}} {count}'
+                )
+            lines.append(
+                "# HELP splitwise_api_retries_total Retried Splitwise API "
+                "calls."
+            )
+            lines.append("# TYPE splitwise_api_retries_total counter")
+            for call, count in sorted(self.retries.items()):
+                lines.append(
+                    f'splitwise_api_retries_total{{call="{call}"}} {count}'
+                )
+
+        lines.append("# HELP upload_session_seconds Duration of the session.")
+        lines.append("# TYPE upload_session_seconds gauge")
+        lines.append(
+            f"upload_session_seconds {time.monotonic() - self.started}"
+        )
+        write_atomically(textfile_path, "\n".join(lines) + "\n")
+
+    def print_summary(self) -> None:
+        """
+        Print where the time of the session went.
+        """
+        summary = self.summary()
+        print(
+            (
+                f"\nSession took {format_duration(summary['session_seconds'])}"
+                f": {format_duration(summary['api_seconds'])} waiting on "
+                f"Splitwise and {format_duration(summary['prompt_seconds'])} "
+                "answering prompts."
+            )
+        )
+        for call, call_summary in summary["api"].items():
+            if "count" in call_summary:
+                print(
+                    (
+                        f"{call}: {call_summary['count']} calls, p50 "
+                        f"{call_summary['p50_seconds']}s, p95 "
+                        f"{call_summary['p95_seconds']}s, "
+                        f"{sum(call_summary.get('errors', {}).values())} "
+                        f"errors, {call_summary.get('retries', 0)} retries"
+                    )
+                )
+
+
+class Progress:
+    def __init__(self, total: int) -> None:
+        self.total: int = total
+        self.started: float = time.monotonic()
+
+    def line(self, done: int) -> str:
+        """
+        Args:
+            done (int): number of expenses done
+
+        Returns:
+            str: progress with the elapsed time and the estimated time left
+        """
+        elapsed = time.monotonic() - self.started
+        percent = round(100 * done / self.total) if self.total else 100
+        eta = "unknown"
+        if done:
+            eta = format_duration(elapsed / done * (self.total - done))
+        return (
+            f"[{done}/{self.total} done, {percent}%, elapsed "
+            f"{format_duration(elapsed)}, ETA {eta}]"
+        )
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Args:
+        seconds (float): duration
+
+    Returns:
+        str: duration as h:mm:ss or m:ss
+    """
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def write_atomically(file_path: str, contents: str) -> None:
+    """
+    Write a file through a temporary file, so readers never see it half
+    written.
+
+    Args:
+        file_path (str): path to the file
+        contents (str): file contents
+    """
+    file_dir = os.path.dirname(str(file_path))
+    if file_dir and not os.path.exists(file_dir):
+        os.makedirs(file_dir)
+    temporary_path = f"{file_path}.tmp"
+    with open(temporary_path, "w") as temporary_file:
+        temporary_file.write(contents)
+    os.replace(temporary_path, file_path)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:
+    # Without fcntl (Windows) only the threads of one process share a bucket.
+    fcntl = None
+
+
+def account_key(api_key: str) -> str:
+    """
+    Args:
+        api_key (str): Splitwise API key of the account
+
+    Returns:
+        str: key of the account in the rate limit file, which doesn't reveal
+        the API key
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        limiter_path: str,
+        account: str,
+        rate: float = 10.0,
+        burst: int = None,
+        min_rate: float = 0.5,
+        recovery: float = 0.02,
+    ) -> None:
+        """
+        Token bucket shared by every process calling Splitwise for the same
+        account. The buckets of the accounts are kept in a json file and
+        changed under an exclusive lock on the file. Every request reserves
+        the next free slot, so processes are served in the order they ask
+        and none can take the whole bucket.
+
+        When Splitwise answers with a 429, the rate is halved and every
+        process waits as long as Splitwise asks. The rate then grows back
+        towards `rate` with every request.
+
+        Args:
+            limiter_path (str): path to the json file of the buckets
+            account (str): key of the account, see account_key
+            rate (float): maximum requests per second
+            burst (int): requests that can be sent at once after a pause,
+            `rate` if None
+            min_rate (float): the rate is never halved below this
+            recovery (float): share of `rate` added back to the rate after
+            every request
+        """
+        self.limiter_path: str = str(limiter_path)
+        self.account = account
+        self.rate = rate
+        self.burst: int = burst if burst is not None else max(1, int(rate))
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def bucket(self) -> Iterator[Dict[str, float]]:
+        """
+        Lock the rate limit file and yield the bucket of the account, which
+        is saved when the block exits.
+
+        Yields:
+            Iterator[Dict[str, float]]: current rate, time at which the
+            next request would be sent if the bucket were empty and end of
+            the last slow down
+        """
+        limiter_dir = os.path.dirname(self.limiter_path)
+        if limiter_dir and not os.path.exists(limiter_dir):
+            os.makedirs(limiter_dir, exist_ok=True)
+        with self.lock, open(self.limiter_path, "a+") as limiter_file:
+            if fcntl is not None:
+                fcntl.flock(limiter_file, fcntl.LOCK_EX)
+            limiter_file.seek(0)
+            try:
+                buckets: Dict[str, Dict[str, float]] = json.loads(
+                    limiter_file.read()
+                )
+            except ValueError:
+                buckets = dict()
+            bucket = buckets.setdefault(
+                self.account,
+                {"rate": self.rate, "next_slot": 0.0, "throttled_until": 0.0},
+            )
+            yield bucket
+            limiter_file.seek(0)
+            limiter_file.truncate()
+            json.dump(buckets, limiter_file)
+            limiter_file.flush()
+
+    def reserve(self) -> float:
+        """
+        Reserve the next free slot of the account.
+
+        Returns:
+            float: seconds to wait before sending the request
+        """
+        with self.bucket() as bucket:
+            now = time.time()
+            rate = min(bucket["rate"], self.rate)
+            interval = 1.0 / rate
+            # The bucket is full when next_slot is in the past, and every
+            # request moves it one interval later. A request waits once
+            # next_slot is more than `burst` intervals ahead.
+            next_slot = max(bucket["next_slot"], now)
+            bucket["next_slot"] = next_slot + interval
+            if now >= bucket["throttled_until"]:
+                bucket["rate"] = min(
+                    self.rate, rate + self.recovery * self.rate
+                )
+        return max(0.0, next_slot - (self.burst - 1) * interval - now)
+
+    def acquire(self) -> float:
+        """
+        Wait until a request can be sent.
+
+        Returns:
+            float: seconds waited
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def throttle(self, retry_after: float = 0.0) -> None:
+        """
+        Slow down every process of the account after a 429.
+
+        Args:
+            retry_after (float): seconds Splitwise asked to wait
+        """
+        with self.bucket() as bucket:
+            now = time.time()
+            # The other requests sent before the slow down may get a 429 too,
+            # the rate is only halved once for all of them.
+            if now >= bucket["throttled_until"]:
+                bucket["rate"] = max(self.min_rate, bucket["rate"] / 2)
+            interval = 1.0 / bucket["rate"]
+            bucket["throttled_until"] = now + max(retry_after, interval)
+            # Empty the bucket until Splitwise accepts requests again.
+            bucket["next_slot"] = max(
+                bucket["next_slot"],
+                now + retry_after + (self.burst - 1) * interval,
+            )
+
+    def current_rate(self) -> float:
+        """
+        Returns:
+            float: requests per second currently allowed for the account
+        """
+        with self.bucket() as bucket:
+            return bucket["rate"]
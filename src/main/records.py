@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple, Tuple
+
+from src.main.merchant_keys import default_merchant_key
+
+if TYPE_CHECKING:
+    import splitwise
+
+# Columns every clean csv file has. The merchant column was added later.
+REQUIRED_FIELDS: Tuple[str, ...] = (
+    "date",
+    "amount",
+    "description",
+    "currency",
+)
+
+
+class Transaction(NamedTuple):
+    """
+    An expense of the cleaned csv file.
+    """
+
+    date: str
+    amount: str
+    description: str
+    currency: str
+    merchant: str = ""
+
+    @property
+    def total_expense(self) -> float:
+        """
+        Returns:
+            float: amount rounded to cents
+
+        Raises:
+            ValueError: if the amount is not a number
+        """
+        return round(float(self.amount), 2)
+
+    @property
+    def merchant_key(self) -> str:
+        """
+        Returns:
+            str: merchant of the merchant column, or the merchant key of the
+            description if the clean csv file has no merchant column
+        """
+        return self.merchant or default_merchant_key(self.description)
+
+
+class Decision(NamedTuple):
+    """
+    The data to create an expense on Splitwise. Expenses of the personal
+    expense group have no friends and no shares.
+    """
+
+    sub_category_name: str
+    sub_category_obj: splitwise.category.Category
+    group_name: str
+    group_id: int
+    friend_names: Tuple[str, ...] = ()
+    friend_ids: Tuple[int, ...] = ()
+    user_shares: Tuple[str, ...] = ()
@@ -0,0 +1,149 @@
+import json
+import os
+import re
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+
+class SelectMenu:
+    def __init__(self, options: Dict[int, str], recent: List[str] = None):
+        self.options: Dict[int, str] = dict(options)
+        self.recent: List[str] = recent if recent is not None else list()
+        self.names: List[Tuple[str, int]] = sorted(
+            (name.lower(), number) for number, name in self.options.items()
+        )
+        self.words: List[Tuple[str, int]] = sorted(
+            (name.lower()[start:], number)
+            for number, name in self.options.items()
+            for start in [match.start() for match in re.finditer(r"\w+", name)]
+        )
+
+    def rank(self, number: int) -> Tuple[int, int]:
+        """
+        Sort key putting recently chosen options first, most recent first,
+        and the others in their listed order.
+
+        Args:
+            number (int): option number
+
+        Returns:
+            Tuple[int, int]: sort key
+        """
+        name = self.options[number]
+        if name in self.recent:
+            return self.recent.index(name), number
+        return len(self.recent), number
+
+    def ordered(self) -> List[int]:
+        """
+        Returns:
+            List[int]: option numbers, recently chosen first
+        """
+        return sorted(self.options, key=self.rank)
+
+    def prefix_matches(
+        self, prefixes: List[Tuple[str, int]], text: str
+    ) -> List[int]:
+        """
+        Return the options with a key starting with the text.
+
+        Args:
+            prefixes (List[Tuple[str, int]]): sorted keys and option numbers
+            text (str): lowercase search text
+
+        Returns:
+            List[int]: matching option numbers
+        """
+        matches: List[int] = list()
+        start: int = bisect_left(prefixes, (text,))
+        for key, number in prefixes[start:]:
+            if not key.startswith(text):
+                break
+            if number not in matches:
+                matches.append(number)
+        return matches
+
+    def search(self, text: str) -> List[int]:
+        """
+        Find the options matching the typed text: an exact name, then names
+        starting with the text, then names with a word starting with the
+        text and finally names containing the letters of the text in order.
+        Single characters only match the start of a name.
+
+        Args:
+            text (str): typed text
+
+        Returns:
+            List[int]: matching option numbers, recently chosen first
+        """
+        text = text.strip().lower()
+        if not text:
+            return list()
+
+        exact = [
+            number
+            for number, name in self.options.items()
+            if name.lower() == text
+        ]
+        if exact:
+            return exact
+
+        matches = self.prefix_matches(self.names, text)
+        if not matches and len(text) > 1:
+            matches = self.prefix_matches(self.words, text)
+        if not matches and len(text) > 1:
+            letters = re.compile(".*".join(re.escape(char) for char in text))
+            matches = [
+                number
+                for number, name in self.options.items()
+                if letters.search(name.lower())
+            ]
+
+        return sorted(matches, key=self.rank)
+
+
+class RecentChoices:
+    def __init__(self, recent_path: str = None, size: int = 10) -> None:
+        self.recent_path: str = recent_path
+        self.size: int = size
+        self.choices: Dict[str, List[str]] = dict()
+
+    def load(self) -> None:
+        """
+        Load recent choices from the recent choices file, if it exists.
+        """
+        if self.recent_path is not None and os.path.exists(self.recent_path):
+            with open(self.recent_path, "r") as recent_file:
+                self.choices = json.load(recent_file)
+
+    def get(self, menu_key: str) -> List[str]:
+        """
+        Args:
+            menu_key (str): menu the choices were made in
+
+        Returns:
+            List[str]: recently chosen names, most recent first
+        """
+        return self.choices.setdefault(menu_key, list())
+
+    def add(self, menu_key: str, name: str) -> None:
+        """
+        Move a name to the front of a menu's recent choices and save them.
+
+        Args:
+            menu_key (str): menu the choice was made in
+            name (str): chosen name
+        """
+        recent = self.get(menu_key)
+        if name in recent:
+            recent.remove(name)
+        recent.insert(0, name)
+        while len(recent) > self.size:
+            recent.pop()
+
+        if self.recent_path is not None:
+            recent_dir = os.path.dirname(self.recent_path)
+            if recent_dir and not os.path.exists(recent_dir):
+                os.makedirs(recent_dir)
+            with open(self.recent_path, "w") as recent_file:
+                json.dump(self.choices, recent_file)
@@ -0,0 +1,171 @@
+import os
+from typing import Iterable, Iterator, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Columns the expenses can be grouped by. The month comes from the date.
+REPORT_COLUMNS: List[str] = ["merchant", "month", "currency", "sign"]
+
+
+def month_values(dates: pd.Series) -> pd.Series:
+    """
+    Args:
+        dates (pd.Series): dates as DD/MM/YYYY or YYYY-MM-DD
+
+    Returns:
+        pd.Series: month of every date as YYYY-MM
+    """
+    dates = dates.fillna("").astype(str)
+    return pd.Series(
+        np.where(
+            dates.str[2] == "/",
+            dates.str[6:10] + "-" + dates.str[3:5],
+            dates.str[:7],
+        ),
+        index=dates.index,
+    )
+
+
+def month_categories(dates: pd.Series) -> pd.Categorical:
+    """
+    Month of categorical dates. A statement has few distinct dates, so only
+    the categories are parsed.
+
+    Args:
+        dates (pd.Series): categorical dates as DD/MM/YYYY or YYYY-MM-DD
+
+    Returns:
+        pd.Categorical: month of every date as YYYY-MM
+    """
+    codes, months = pd.factorize(
+        month_values(pd.Series(dates.cat.categories, dtype=object))
+    )
+    return pd.Categorical.from_codes(codes[dates.cat.codes], months)
+
+
+def read_report_chunks(
+    file_path: str, chunk_size: int = 1_000_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the columns of a clean csv file needed for the report, chunk_size
+    rows at a time. Clean csv files written before the merchant and sign
+    columns were added are grouped by description and counted as unsigned.
+
+    Args:
+        file_path (str): path to the clean csv file
+        chunk_size (int): number of rows read at a time
+
+    Yields:
+        Iterator[pd.DataFrame]: amount in cents and the report columns of
+        every expense of the chunk
+    """
+    header: List[str] = list(pd.read_csv(file_path, sep=";", nrows=0))
+    merchant_column = "merchant" if "merchant" in header else "description"
+    usecols = ["date", "amount", "currency", merchant_column]
+    if "sign" in header:
+        usecols.append("sign")
+    for chunk in pd.read_csv(
+        file_path,
+        sep=";",
+        usecols=usecols,
+        # Categories keep one copy of the values that repeat, so grouping
+        # compares integer codes.
+        dtype={**dict.fromkeys(usecols, "category"), "amount": np.float64},
+        chunksize=chunk_size,
+        keep_default_na=False,
+    ):
+        yield pd.DataFrame(
+            {
+                # Cents add up exactly, whatever the order of the chunks.
+                "cents": (chunk["amount"] * 100).round().astype(np.int64),
+                "merchant": chunk[merchant_column],
+                "month": month_categories(chunk["date"]),
+                "currency": chunk["currency"],
+                "sign": chunk["sign"] if "sign" in chunk else "unsigned",
+            }
+        )
+
+
+def spending_report(
+    file_paths: Iterable[str],
+    group_by: Sequence[str] = REPORT_COLUMNS,
+    chunk_size: int = 1_000_000,
+) -> pd.DataFrame:
+    """
+    Count and total the expenses of clean csv files per merchant, month,
+    currency and sign. Every chunk is aggregated on its own and only the
+    partial aggregates are kept, so files of any size fit in memory.
+
+    Args:
+        file_paths (Iterable[str]): paths to the clean csv files
+        group_by (Sequence[str]): columns of REPORT_COLUMNS to group by
+        chunk_size (int): number of rows read at a time
+
+    Returns:
+        pd.DataFrame: count, total, mean, min and max amount of every group,
+        sorted by group
+
+    Raises:
+        ValueError: if a column to group by is unknown
+    """
+    group_by = list(group_by)
+    unknown_columns = set(group_by) - set(REPORT_COLUMNS)
+    if unknown_columns:
+        raise ValueError(
+            f"The report can't be grouped by {', '.join(unknown_columns)}."
+        )
+    partials: List[pd.DataFrame] = [
+        chunk.groupby(group_by, sort=False, observed=True)["cents"].agg(
+            ["count", "sum", "min", "max"]
+        )
+        for file_path in file_paths
+        for chunk in read_report_chunks(file_path, chunk_size)
+        if len(chunk)
+    ]
+    if not partials:
+        return pd.DataFrame(
+            columns=group_by + ["count", "total", "mean", "min", "max"]
+        )
+    cents = (
+        pd.concat(partials)
+        .groupby(level=list(range(len(group_by))), observed=True)
+        .agg({"count": "sum", "sum": "sum", "min": "min", "max": "max"})
+    )
+    cents.index.names = group_by
+    report = pd.DataFrame(
+        {
+            "count": cents["count"],
+            "total": (cents["sum"] / 100).round(2),
+            "mean": (cents["sum"] / cents["count"] / 100).round(2),
+            "min": cents["min"] / 100,
+            "max": cents["max"] / 100,
+        }
+    )
+    report = report.reset_index()
+    report[group_by] = report[group_by].astype(str)
+    return report.sort_values(group_by, ignore_index=True)
+
+
+def write_report(report: pd.DataFrame, output_path: str) -> str:
+    """
+    Write the report as a ; separated csv file, or as a json list of groups
+    if the output path ends with .json.
+
+    Args:
+        report (pd.DataFrame): see spending_report
+        output_path (str): path to the report file
+
+    Returns:
+        str: path to the report file
+    """
+    output_dir = os.path.dirname(str(output_path))
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    if str(output_path).endswith(".json"):
+        report.to_json(
+            output_path, orient="records", indent=2, double_precision=2
+        )
+    else:
+        report.to_csv(output_path, index=False, sep=";")
+    return str(output_path)
@@ -0,0 +1,76 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+def to_cents(amounts: Sequence[float]) -> np.ndarray:
+    """
+    Convert amounts to integer cents.
+
+    Args:
+        amounts (Sequence[float]): amounts
+
+    Returns:
+        np.ndarray: amounts in cents
+    """
+    return np.rint(np.asarray(amounts, dtype=float) * 100).astype(np.int64)
+
+
+def allocate_cents(
+    costs_cents: Sequence[int], weights: Sequence[Sequence[float]]
+) -> np.ndarray:
+    """
+    Split each cost between its participants in proportion to their weights
+    with the largest remainder method, so the shares of an expense always sum
+    to its cost. The cents left after rounding every share down go to the
+    participants with the largest remainders. Ties go to the participants
+    listed last, so the payer (listed first) never absorbs a rounding cent.
+
+    Expenses with fewer participants are padded with zero weights, which
+    always get a zero share.
+
+    Args:
+        costs_cents (Sequence[int]): cost of each expense in cents
+        weights (Sequence[Sequence[float]]): non-negative weight of each
+        participant for each expense
+
+    Returns:
+        np.ndarray: share of each participant for each expense in cents
+    """
+    costs_cents = np.asarray(costs_cents, dtype=np.int64)
+    weights = np.asarray(weights, dtype=float)
+    total_expenses, participants = weights.shape
+
+    exact_shares = np.round(
+        costs_cents[:, None] * weights / weights.sum(axis=1, keepdims=True),
+        6,
+    )
+    shares = np.floor(exact_shares).astype(np.int64)
+    remainders = exact_shares - shares
+    missing_cents = costs_cents - shares.sum(axis=1)
+
+    order = (
+        participants
+        - 1
+        - np.argsort(-remainders[:, ::-1], axis=1, kind="stable")
+    )
+    extra_cents = np.arange(participants)[None, :] < missing_cents[:, None]
+    shares[np.arange(total_expenses)[:, None], order] += extra_cents
+
+    return shares
+
+
+def format_cents(shares_cents: np.ndarray) -> List[List[str]]:
+    """
+    Format shares in cents the way they are sent to Splitwise.
+
+    Args:
+        shares_cents (np.ndarray): shares in cents
+
+    Returns:
+        List[List[str]]: shares as strings, e.g. "16.67"
+    """
+    return [
+        [str(share / 100) for share in expense_shares]
+        for expense_shares in shares_cents.tolist()
+    ]
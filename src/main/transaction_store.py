@@ -0,0 +1,370 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+
+from src.main.records import Decision, Transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    batch TEXT NOT NULL,
+    row_number INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    description TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    decision TEXT,
+    worker TEXT,
+    expense_id INTEGER,
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (batch, row_number)
+);
+CREATE INDEX IF NOT EXISTS transactions_status
+    ON transactions (batch, status, row_number);
+"""
+
+# pending: cleaned, not uploaded yet (with or without a decision)
+# claimed: being uploaded by a worker
+# uploaded, failed: result of the upload
+# interrupted: claimed by a worker that stopped, it may have added the
+# expense to Splitwise before stopping, so it is only uploaded again once
+# the user has checked
+STATUSES = ["pending", "claimed", "uploaded", "failed", "interrupted"]
+
+ClaimedRow = Tuple[int, Transaction, Decision]
+
+# Seconds after which a row still claimed is considered left behind by a
+# worker that crashed or was killed. An upload takes a few seconds at most.
+CLAIM_TIMEOUT = 600.0
+
+
+def batch_key(file_path: str) -> str:
+    """
+    Args:
+        file_path (str): path to a clean csv file
+
+    Returns:
+        str: key of the rows of the file in the store
+    """
+    return os.path.abspath(str(file_path))
+
+
+def decision_to_json(decision: Decision) -> str:
+    """
+    Args:
+        decision (Decision): data to create an expense
+
+    Returns:
+        str: json of the decision, the sub-category as its id and name
+    """
+    sub_category = decision.sub_category_obj
+    return json.dumps(
+        decision._replace(
+            sub_category_obj={
+                "id": sub_category.getId(),
+                "name": sub_category.getName(),
+            }
+        )._asdict()
+    )
+
+
+def decision_from_json(decision_json: str) -> Decision:
+    """
+    Args:
+        decision_json (str): json of a decision
+
+    Returns:
+        Decision: data to create an expense
+    """
+    # The Splitwise client is only imported once a decision is needed.
+    from splitwise.category import Category
+
+    fields = json.loads(decision_json)
+    return Decision(
+        sub_category_name=fields["sub_category_name"],
+        sub_category_obj=Category(fields["sub_category_obj"]),
+        group_name=fields["group_name"],
+        group_id=fields["group_id"],
+        friend_names=tuple(fields["friend_names"]),
+        friend_ids=tuple(fields["friend_ids"]),
+        user_shares=tuple(fields["user_shares"]),
+    )
+
+
+class TransactionStore:
+    def __init__(self, state_path: str) -> None:
+        """
+        SQLite store of the cleaned transactions and of their decisions and
+        upload results, shared by the cleaning and the upload and by any
+        number of upload workers, in threads or in other processes.
+
+        Args:
+            state_path (str): path to the SQLite database
+        """
+        self.state_path: str = str(state_path)
+        self.lock = threading.Lock()
+        self.connection: sqlite3.Connection = None
+
+    def open(self) -> None:
+        """
+        Open the database, creating it if it doesn't exist.
+        """
+        state_dir = os.path.dirname(self.state_path)
+        if state_dir and not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+        # Other processes may hold the write lock for a moment, e.g. while
+        # claiming rows.
+        self.connection = sqlite3.connect(
+            self.state_path, timeout=30.0, check_same_thread=False
+        )
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add_transactions(
+        self, batch: str, transactions: Iterable[Transaction]
+    ) -> None:
+        """
+        Insert the rows of a clean csv file in one transaction. Rows already
+        stored are replaced while they are pending, so a file cleaned again
+        is updated, but rows with a decision or a result are kept.
+
+        Args:
+            batch (str): key of the file
+            transactions (Iterable[Transaction]): rows of the file
+        """
+        now = time.time()
+        rows = [
+            (batch, row_number, *transaction[:4], now)
+            for row_number, transaction in enumerate(transactions, start=1)
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                """
+                INSERT INTO transactions
+                    (batch, row_number, date, amount, description, currency,
+                    updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (batch, row_number) DO UPDATE SET
+                    date = excluded.date,
+                    amount = excluded.amount,
+                    description = excluded.description,
+                    currency = excluded.currency,
+                    updated_at = excluded.updated_at
+                WHERE status = 'pending' AND decision IS NULL
+                """,
+                rows,
+            )
+
+    def record_decisions(
+        self, batch: str, decisions: Dict[int, Decision]
+    ) -> None:
+        """
+        Record the decisions of rows not uploaded yet. Failed rows become
+        pending again, so they are retried.
+
+        Args:
+            batch (str): key of the file
+            decisions (Dict[int, Decision]): decision by row number (1-based)
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                """
+                UPDATE transactions
+                SET decision = ?, status = 'pending', error = NULL,
+                    updated_at = ?
+                WHERE batch = ? AND row_number = ?
+                AND status IN ('pending', 'failed')
+                """,
+                [
+                    (decision_to_json(decision), now, batch, row_number)
+                    for row_number, decision in decisions.items()
+                ],
+            )
+
+    def claim(
+        self,
+        batch: str,
+        worker: str,
+        limit: int = 1,
+        row_number: int = None,
+    ) -> List[ClaimedRow]:
+        """
+        Claim pending rows with a decision for a worker. The update is a
+        single statement, so a row is only ever claimed by one worker.
+
+        Args:
+            batch (str): key of the file
+            worker (str): name of the worker
+            limit (int): number of rows to claim at most
+            row_number (int): claim this row only
+
+        Returns:
+            List[ClaimedRow]: row number, transaction and decision of the
+            claimed rows
+        """
+        condition = "" if row_number is None else "AND row_number = ?"
+        parameters = [] if row_number is None else [row_number]
+        with self.lock, self.connection:
+            rows = self.connection.execute(
+                f"""
+                UPDATE transactions
+                SET status = 'claimed', worker = ?, updated_at = ?
+                WHERE batch = ? AND status = 'pending' AND row_number IN (
+                    SELECT row_number FROM transactions
+                    WHERE batch = ? AND status = 'pending'
+                    AND decision IS NOT NULL {condition}
+                    ORDER BY row_number LIMIT ?
+                )
+                RETURNING row_number, date, amount, description, currency,
+                    decision
+                """,
+                [worker, time.time(), batch, batch, *parameters, limit],
+            ).fetchall()
+        return sorted(
+            (
+                row["row_number"],
+                Transaction(
+                    row["date"],
+                    row["amount"],
+                    row["description"],
+                    row["currency"],
+                ),
+                decision_from_json(row["decision"]),
+            )
+            for row in rows
+        )
+
+    def interrupt_stale_claims(
+        self, batch: str, timeout: float = CLAIM_TIMEOUT
+    ) -> int:
+        """
+        Mark rows claimed more than `timeout` seconds ago as interrupted.
+        The worker that claimed them crashed or was killed, maybe after
+        Splitwise added the expense, so they aren't claimed again. A slow
+        worker still records the result of its upload.
+
+        Args:
+            batch (str): key of the file
+            timeout (float): seconds after which a claim is stale
+
+        Returns:
+            int: number of interrupted rows
+        """
+        with self.lock, self.connection:
+            return self.connection.execute(
+                """
+                UPDATE transactions
+                SET status = 'interrupted', updated_at = ?,
+                    error = 'The upload was interrupted.'
+                WHERE batch = ? AND status = 'claimed' AND updated_at < ?
+                """,
+                (time.time(), batch, time.time() - timeout),
+            ).rowcount
+
+    def retry_interrupted(self, batch: str) -> int:
+        """
+        Make the interrupted rows pending again, once the user has checked
+        that they aren't on Splitwise.
+
+        Args:
+            batch (str): key of the file
+
+        Returns:
+            int: number of rows to upload again
+        """
+        with self.lock, self.connection:
+            return self.connection.execute(
+                """
+                UPDATE transactions
+                SET status = 'pending', worker = NULL, error = NULL,
+                    updated_at = ?
+                WHERE batch = ? AND status = 'interrupted'
+                """,
+                (time.time(), batch),
+            ).rowcount
+
+    def mark_uploaded(
+        self, batch: str, row_number: int, expense_id: int = None
+    ) -> None:
+        """
+        Args:
+            batch (str): key of the file
+            row_number (int): row number (1-based)
+            expense_id (int): id of the expense on Splitwise
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE transactions
+                SET status = 'uploaded', expense_id = ?, error = NULL,
+                    updated_at = ?
+                WHERE batch = ? AND row_number = ?
+                """,
+                (expense_id, time.time(), batch, row_number),
+            )
+
+    def mark_failed(self, batch: str, row_number: int, error: str) -> None:
+        """
+        Args:
+            batch (str): key of the file
+            row_number (int): row number (1-based)
+            error (str): why the upload failed
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE transactions
+                SET status = 'failed', error = ?, updated_at = ?
+                WHERE batch = ? AND row_number = ?
+                """,
+                (error, time.time(), batch, row_number),
+            )
+
+    def row_numbers(self, batch: str, status: str) -> Set[int]:
+        """
+        Args:
+            batch (str): key of the file
+            status (str): one of STATUSES
+
+        Returns:
+            Set[int]: row numbers (1-based) with the status
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                """
+                SELECT row_number FROM transactions
+                WHERE batch = ? AND status = ?
+                """,
+                (batch, status),
+            ).fetchall()
+        return {row["row_number"] for row in rows}
+
+    def counts(self, batch: str) -> Dict[str, int]:
+        """
+        Args:
+            batch (str): key of the file
+
+        Returns:
+            Dict[str, int]: number of rows by status
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                """
+                SELECT status, COUNT(*) AS count FROM transactions
+                WHERE batch = ? GROUP BY status
+                """,
+                (batch,),
+            ).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update((row["status"], row["count"]) for row in rows)
+        return counts
@@ -0,0 +1,205 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import splitwise
+from splitwise.exception import SplitwiseException, SplitwiseNotFoundException
+from splitwise.expense import Expense
+
+from src.main.upload_expenses import UploadExpense
+from src.main.upload_sessions import UploadSessions
+
+
+class UndoSession:
+    def __init__(
+        self,
+        upload_expense: UploadExpense,
+        upload_sessions: UploadSessions,
+        session_id: str,
+        workers: int = 4,
+    ) -> None:
+        """
+        Delete or update every expense created by an upload session,
+        concurrently, then check each of them on Splitwise. Rate limited
+        requests are retried by UploadExpense.call_splitwise.
+
+        Args:
+            upload_expense (UploadExpense): Splitwise client with retries
+            upload_sessions (UploadSessions): log of the upload sessions
+            session_id (str): id of the session to undo
+            workers (int): number of concurrent requests
+        """
+        self.upload_expense = upload_expense
+        self.upload_sessions = upload_sessions
+        self.session_id = session_id
+        self.workers = workers
+
+    def expense_ids(self) -> List[int]:
+        """
+        Returns:
+            List[int]: ids of the expenses of the session still on Splitwise
+        """
+        return [
+            row["expense_id"]
+            for row in self.upload_sessions.expenses(
+                self.session_id, ["created", "updated", "failed"]
+            )
+        ]
+
+    def delete_expense(self, expense_id: int) -> str:
+        """
+        Args:
+            expense_id (int): id of the expense on Splitwise
+
+        Returns:
+            str: error, None if the expense was deleted
+        """
+        try:
+            success, errors = self.upload_expense.call_splitwise(
+                "deleteExpense", expense_id
+            )
+        except SplitwiseNotFoundException:
+            # Already deleted, e.g. by an earlier undo that was interrupted.
+            return None
+        except SplitwiseException as error:
+            return str(error)
+        if errors:
+            return str(errors.getErrors())
+        return None if success else "Splitwise did not delete the expense."
+
+    def update_expense(
+        self,
+        expense_id: int,
+        group_id: int = None,
+        sub_category: splitwise.category.Category = None,
+    ) -> str:
+        """
+        Args:
+            expense_id (int): id of the expense on Splitwise
+            group_id (int): new group, unchanged if None
+            sub_category (splitwise.category.Category): new sub-category,
+            unchanged if None
+
+        Returns:
+            str: error, None if the expense was updated
+        """
+        splitwise_expense = Expense()
+        splitwise_expense.setId(expense_id)
+        if group_id is not None:
+            splitwise_expense.setGroupId(group_id)
+        if sub_category is not None:
+            splitwise_expense.setCategory(sub_category)
+        try:
+            _, errors = self.upload_expense.call_splitwise(
+                "updateExpense", splitwise_expense
+            )
+        except SplitwiseException as error:
+            return str(error)
+        return None if not errors else str(errors.getErrors())
+
+    def verify_expense(
+        self,
+        expense_id: int,
+        group_id: int = None,
+        sub_category: splitwise.category.Category = None,
+        delete: bool = True,
+    ) -> str:
+        """
+        Fetch an expense again to check that it was deleted or updated.
+
+        Args:
+            expense_id (int): id of the expense on Splitwise
+            group_id (int): expected group after an update
+            sub_category (splitwise.category.Category): expected sub-category
+            after an update
+            delete (bool): whether the expense should be deleted
+
+        Returns:
+            str: error, None if the expense is as expected
+        """
+        try:
+            expense = self.upload_expense.call_splitwise(
+                "getExpense", expense_id
+            )
+        except SplitwiseNotFoundException:
+            expense = None
+        except SplitwiseException as error:
+            return f"Could not be checked - {error}"
+
+        if delete:
+            if expense is None or expense.getDeletedAt() is not None:
+                return None
+            return "Still on Splitwise."
+        if expense is None or expense.getDeletedAt() is not None:
+            return "Deleted from Splitwise."
+        if group_id is not None and expense.getGroupId() != group_id:
+            return "Not moved to the new group."
+        if (
+            sub_category is not None
+            and expense.getCategory().getId() != sub_category.getId()
+        ):
+            return "Not moved to the new sub-category."
+        return None
+
+    def run(
+        self,
+        group_id: int = None,
+        sub_category: splitwise.category.Category = None,
+    ) -> Dict[int, str]:
+        """
+        Delete the expenses of the session or, given a group or a
+        sub-category, update them, then verify every expense and record its
+        status.
+
+        Args:
+            group_id (int): new group of the expenses
+            sub_category (splitwise.category.Category): new sub-category of
+            the expenses
+
+        Returns:
+            Dict[int, str]: error by expense id of the expenses that could not
+            be undone
+        """
+        delete: bool = group_id is None and sub_category is None
+        expense_ids: List[int] = self.expense_ids()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            if delete:
+                undo_errors = list(
+                    executor.map(self.delete_expense, expense_ids)
+                )
+            else:
+                undo_errors = list(
+                    executor.map(
+                        lambda expense_id: self.update_expense(
+                            expense_id, group_id, sub_category
+                        ),
+                        expense_ids,
+                    )
+                )
+            # Every expense is checked, since a request that failed may
+            # still have been applied.
+            verify_errors = list(
+                executor.map(
+                    lambda expense_id: self.verify_expense(
+                        expense_id, group_id, sub_category, delete
+                    ),
+                    expense_ids,
+                )
+            )
+
+        errors: Dict[int, str] = dict()
+        for expense_id, undo_error, verify_error in zip(
+            expense_ids, undo_errors, verify_errors
+        ):
+            if verify_error is None:
+                self.upload_sessions.set_status(
+                    self.session_id,
+                    expense_id,
+                    "deleted" if delete else "updated",
+                )
+            else:
+                errors[expense_id] = undo_error or verify_error
+                self.upload_sessions.set_status(
+                    self.session_id, expense_id, "failed", errors[expense_id]
+                )
+        return errors
@@ -0,0 +1,316 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from splitwise.exception import SplitwiseException
+
+from src.main.upload_expenses import UPLOAD_MODES, UploadExpense
+
+
+class UploadDaemonHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path == "/status":
+            self.send_json(200, self.server.daemon.status())
+        else:
+            self.send_json(404, {"error": f"Unknown path {self.path}."})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            content: Dict = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "The request is not valid json."})
+            return
+
+        try:
+            if self.path == "/jobs":
+                self.send_json(*self.server.daemon.run_job(**content))
+            elif self.path == "/refresh":
+                self.server.daemon.refresh_metadata()
+                self.send_json(200, self.server.daemon.status())
+            else:
+                self.send_json(404, {"error": f"Unknown path {self.path}."})
+        except (TypeError, ValueError, re.error, FileNotFoundError) as error:
+            # e.g. a decisions file that can't be read or is removed.
+            self.send_json(400, {"error": str(error)})
+        except SplitwiseException as error:
+            self.send_json(502, {"error": f"Splitwise - {error}"})
+        except (sqlite3.Error, OSError) as error:
+            # e.g. a state or sessions file that can't be opened.
+            self.send_json(500, {"error": str(error)})
+
+    def send_json(self, status: int, content: Dict) -> None:
+        """
+        Args:
+            status (int): http status
+            content (Dict): json response
+        """
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class UploadDaemonHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class UploadDaemon:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        upload_mode: str = "threaded",
+        workers: int = 8,
+        metadata_ttl: float = 3600.0,
+        metrics_path: str = None,
+        prometheus_path: str = None,
+        sessions_path: str = None,
+        rate_limit_path: str = None,
+        rate_limit: float = 10.0,
+    ) -> None:
+        """
+        Long running process that keeps the Splitwise client, groups,
+        friends and categories in memory and uploads cleaned csv files
+        submitted over http, without prompts.
+
+        Args:
+            host (str): host to listen on, keep it local
+            port (int): port to listen on, 0 picks a free port
+            upload_mode (str): default upload mode of the jobs
+            workers (int): default number of concurrent uploads of the jobs
+            metadata_ttl (float): seconds before the groups, friends and
+            categories are fetched again
+            metrics_path (str): json file the metrics are saved to after
+            every job
+            prometheus_path (str): Prometheus textfile the metrics are saved
+            to after every job
+            sessions_path (str): SQLite log of the expenses created by each
+            job, so that a job can be undone
+            rate_limit_path (str): json file of the request rate shared with
+            the other processes uploading to the same account
+            rate_limit (float): maximum requests per second to Splitwise
+        """
+        self.upload_mode = upload_mode
+        self.workers = workers
+        self.metadata_ttl = metadata_ttl
+        self.upload_expense = UploadExpense(
+            None,
+            metrics_path=metrics_path,
+            prometheus_path=prometheus_path,
+            sessions_path=sessions_path,
+            rate_limit_path=rate_limit_path,
+            rate_limit=rate_limit,
+        )
+        # UploadExpense keeps the expenses of the current file, so jobs run
+        # one at a time.
+        self.lock = threading.Lock()
+        self.metadata_loaded_at: float = None
+        self.jobs_done: int = 0
+
+        self.httpd = UploadDaemonHTTPServer((host, port), UploadDaemonHandler)
+        self.httpd.daemon = self
+        self.thread: threading.Thread = None
+
+    @property
+    def base_url(self) -> str:
+        """
+        Returns:
+            str: base url of the daemon
+        """
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def serve_forever(self) -> None:
+        """
+        Fetch the metadata and serve jobs until interrupted.
+        """
+        self.refresh_metadata()
+        self.httpd.serve_forever()
+
+    def start(self) -> None:
+        """
+        Serve jobs in a background thread.
+        """
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving jobs.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> "UploadDaemon":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def refresh_metadata(self) -> None:
+        """
+        Fetch the user info and categories, and the currencies once.
+        """
+        upload_expense = self.upload_expense
+        with self.lock:
+            (
+                upload_expense.user_id,
+                upload_expense.user_friends,
+                upload_expense.user_groups,
+                upload_expense.user_groups_members,
+            ) = upload_expense.get_user_info()
+            (
+                upload_expense.categories,
+                upload_expense.all_sub_categories,
+            ) = upload_expense.get_categories_and_sub_categories()
+            upload_expense.load_currencies()
+            self.metadata_loaded_at = time.monotonic()
+
+    def metadata_age(self) -> float:
+        """
+        Returns:
+            float: seconds since the metadata was fetched, None if it never
+            was
+        """
+        if self.metadata_loaded_at is None:
+            return None
+        return time.monotonic() - self.metadata_loaded_at
+
+    def run_job(
+        self,
+        file_path: str,
+        decisions_path: str = None,
+        mode: str = None,
+        workers: int = None,
+    ) -> Tuple[int, Dict]:
+        """
+        Upload a cleaned csv file with its decisions.
+
+        Args:
+            file_path (str): absolute path to the cleaned csv file
+            decisions_path (str): absolute path to the decisions file, the
+            decisions are read from the csv file if None
+            mode (str): upload mode, the daemon's if None
+            workers (int): concurrent uploads, the daemon's if None
+
+        Returns:
+            Tuple[int, Dict]: http status and result of the job
+        """
+        mode = self.upload_mode if mode is None else mode
+        workers = self.workers if workers is None else workers
+        if mode not in UPLOAD_MODES:
+            return 400, {"error": f"Unknown upload mode {mode}."}
+        for path in [file_path, decisions_path]:
+            if path is not None and not os.path.isfile(path):
+                return 400, {"error": f"There is no file {path}."}
+
+        age = self.metadata_age()
+        if age is None or age > self.metadata_ttl:
+            self.refresh_metadata()
+
+        upload_expense = self.upload_expense
+        with self.lock:
+            upload_expense.file_path = file_path
+            session_id = upload_expense.start_session()
+            try:
+                upload_expense.expenses = list(
+                    upload_expense.get_csv_file_contents()
+                )
+            except ValueError as error:
+                return 400, {"error": str(error)}
+            errors, failed_jobs = upload_expense.upload_with_decisions(
+                decisions_path, mode, workers
+            )
+            total_expenses = len(upload_expense.expenses)
+            self.jobs_done += 1
+            upload_expense.export_metrics()
+
+        return 200, {
+            "file_path": file_path,
+            "session_id": session_id,
+            "expenses": total_expenses,
+            "uploaded": 0 if errors else total_expenses - len(failed_jobs),
+            "failed": [
+                f"{expense.date} {expense.description}"
+                for expense, _, _ in failed_jobs
+            ],
+            "errors": errors,
+        }
+
+    def status(self) -> Dict:
+        """
+        Returns:
+            Dict: jobs done, age of the metadata and metrics of the Splitwise
+            calls
+        """
+        return {
+            "jobs_done": self.jobs_done,
+            "metadata_age_seconds": self.metadata_age(),
+            "metrics": self.upload_expense.metrics.summary(),
+        }
+
+
+def submit_job(
+    url: str,
+    file_path: str,
+    decisions_path: str = None,
+    mode: str = None,
+    workers: int = None,
+) -> Tuple[int, Dict]:
+    """
+    Submit a cleaned csv file to a running upload daemon and wait for the
+    result.
+
+    Args:
+        url (str): base url of the daemon, e.g. "http://127.0.0.1:8765/"
+        file_path (str): path to the cleaned csv file
+        decisions_path (str): path to the decisions file
+        mode (str): upload mode, the daemon's if None
+        workers (int): concurrent uploads, the daemon's if None
+
+    Returns:
+        Tuple[int, Dict]: http status and result of the job
+
+    Raises:
+        URLError: if the daemon can't be reached
+    """
+    # The daemon may run from another directory.
+    content = {
+        "file_path": os.path.abspath(file_path),
+        "decisions_path": (
+            None if decisions_path is None else os.path.abspath(decisions_path)
+        ),
+        "mode": mode,
+        "workers": workers,
+    }
+    request = Request(
+        url.rstrip("/") + "/jobs",
+        data=json.dumps(content).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urlopen(request) as response:
+            return response.status, json.load(response)
+    except HTTPError as error:
+        return error.code, json.load(error)
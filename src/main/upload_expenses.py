@@ -1,25 +1,118 @@
-import csv
-import os
-from typing import Dict, List, Tuple, Union
+from __future__ import annotations
 
-import splitwise
-from dotenv import load_dotenv
-from splitwise import Splitwise
-from splitwise.expense import Expense, ExpenseUser
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    Union,
+)
+
+from src.main.categorize_expenses import CategorizeExpense
+from src.main.cluster_expenses import ExpenseClusters
+from src.main.decisions import ExpenseDecisions
+from src.main.dry_run import RECORDED_CALLS, DryRunSplitwise
+from src.main.expense_store import ExpenseStore
+from src.main.learn_expenses import ExpenseIndex
+from src.main.merge_csv import merge_clean_csvs, read_clean_csv
+from src.main.metrics import Metrics, Progress
+from src.main.rate_limiter import RateLimiter, account_key
+from src.main.records import Decision, Transaction
+from src.main.select_menu import RecentChoices, SelectMenu
+from src.main.split_expenses import allocate_cents, format_cents, to_cents
+from src.main.transaction_store import TransactionStore, batch_key
+from src.main.upload_sessions import UploadSessions, new_session_id
+from src.main.validate_expenses import validate_chunks, validate_transactions
+
+if TYPE_CHECKING:
+    import splitwise
+    from splitwise import Splitwise
+    from splitwise.exception import SplitwiseException
+
+UploadJob = Tuple[Transaction, Decision, float]
+
+UPLOAD_MODES = ["sequential", "threaded", "async"]
+
+# Calls that create data on Splitwise are only retried when the request was
+# rejected before reaching it, i.e. rate limited, so expenses aren't added
+# twice.
+WRITE_CALLS = {"createExpense"}
+
+
+def worker_name() -> str:
+    """
+    Returns:
+        str: name of the current thread in the transaction store
+    """
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def http_status(error: SplitwiseException) -> int:
+    """
+    Args:
+        error (SplitwiseException): error raised by the Splitwise client
+
+    Returns:
+        int: http status of the failed request, 0 if there was no response
+    """
+    status = error.http_status
+    # The client stores the status of unknown errors as a 1-tuple.
+    if isinstance(status, tuple):
+        status = status[0]
+    return status or 0
 
 
 class UploadExpense:
-    def __init__(self, file_path: str) -> None:
+    def __init__(
+        self,
+        file_path: Union[str, List[str]],
+        rules_path: str = None,
+        index_path: str = None,
+        confidence_threshold: float = 0.8,
+        recent_path: str = None,
+        metrics_path: str = None,
+        prometheus_path: str = None,
+        max_retries: int = 3,
+        store_path: str = None,
+        state_path: str = None,
+        sessions_path: str = None,
+        dry_run_path: str = None,
+        rate_limit_path: str = None,
+        rate_limit: float = 10.0,
+        drop_duplicates: bool = False,
+        retry_interrupted: bool = False,
+    ) -> None:
+        # Many clean csv files are merged by date and uploaded as one.
         self.file_path = file_path
-        load_dotenv()
-        self.consumer_key: str = os.environ["CONSUMER_KEY"]
-        self.consumer_secret: str = os.environ["CONSUMER_SECRET"]
-        self.api_key: str = os.environ["API_KEY"]
-        self.splitwise_obj = Splitwise(
-            self.consumer_key,
-            self.consumer_secret,
-            api_key=self.api_key,
-        )
+        self.drop_duplicates = drop_duplicates
+        self.rules_path = rules_path
+        self.index_path = index_path
+        self.confidence_threshold = confidence_threshold
+        # The Splitwise client, and the credentials it needs, are only loaded
+        # on the first call to Splitwise, so offline work starts fast.
+        self.splitwise_client: Splitwise = None
+        self.client_lock = threading.Lock()
+        self.rate_limit_path = rate_limit_path
+        self.rate_limit = rate_limit
+        self.rate_limiter: RateLimiter = None
+        self.dry_run_path = dry_run_path
+        if dry_run_path is not None:
+            self.splitwise_client = DryRunSplitwise(self.make_client)
+            # Nothing is added to Splitwise, so there is nothing to track or
+            # undo.
+            state_path = None
+            sessions_path = None
         self.user_id: str = None
         self.user_friends: Dict[int, str] = dict()
         self.user_groups: Dict[int, str] = dict()
@@ -28,79 +121,1008 @@ class UploadExpense:
         self.all_sub_categories: Dict[
             str, Dict[str, splitwise.category.Category]
         ] = dict()
-        self.expenses: List[Dict[str, str]] = list()
+        self.expenses: Iterator[Transaction] = iter(())
+        self.categorizer: CategorizeExpense = None
+        self.expense_index: ExpenseIndex = None
+        self.store_path = store_path
+        self.expense_store: ExpenseStore = None
+        self.state_path = state_path
+        self.state_store: TransactionStore = None
+        # Upload the rows interrupted by a worker that stopped again.
+        self.retry_interrupted = retry_interrupted
+        # Id of the last expense created by each thread, recorded in the
+        # transaction store.
+        self.created = threading.local()
+        self.sessions_path = sessions_path
+        self.upload_sessions: UploadSessions = None
+        self.session_id: str = None
+        self.currency_codes: Set[str] = set()
+        self.invalid_expenses: Dict[int, List[str]] = dict()
+        self.recent_choices: RecentChoices = RecentChoices(recent_path)
+        self.recent_choices.load()
+        self.menus: Dict[str, SelectMenu] = dict()
+        self.metrics: Metrics = Metrics()
+        self.metrics_path = metrics_path
+        self.prometheus_path = prometheus_path
+        self.max_retries = max_retries
+        self.retry_delay: float = 1.0
+
+    def make_client(self) -> Splitwise:
+        """
+        Build the Splitwise client from the credentials of the environment or
+        the .env file.
 
-    def run_pipeline(self) -> None:
+        Returns:
+            Splitwise: authenticated Splitwise client
+        """
+        from dotenv import load_dotenv
+        from splitwise import Splitwise
+
+        load_dotenv()
+        return Splitwise(
+            os.environ["CONSUMER_KEY"],
+            os.environ["CONSUMER_SECRET"],
+            api_key=os.environ["API_KEY"],
+        )
+
+    @property
+    def splitwise_obj(self) -> Splitwise:
+        """
+        Returns:
+            Splitwise: Splitwise client, built on first use
+        """
+        with self.client_lock:
+            if self.splitwise_client is None:
+                self.splitwise_client = self.make_client()
+            return self.splitwise_client
+
+    def get_rate_limiter(self) -> RateLimiter:
+        """
+        Build the rate limiter of the account on first use, if a rate limit
+        file is given. It doesn't wait for the client, which a dry run only
+        builds inside its first read call.
+
+        Returns:
+            RateLimiter: rate limiter of the account, None without a rate
+            limit file
+        """
+        with self.client_lock:
+            if self.rate_limiter is None and self.rate_limit_path is not None:
+                from dotenv import load_dotenv
+
+                load_dotenv()
+                self.rate_limiter = RateLimiter(
+                    self.rate_limit_path,
+                    account_key(os.environ["API_KEY"]),
+                    self.rate_limit,
+                )
+            return self.rate_limiter
+
+    def run_pipeline(self, workers: int = 8, pipelined: bool = False) -> None:
         """
         Method to run the entire pipeline.
+
+        Args:
+            workers (int): number of concurrent uploads of expenses marked in
+            bulk or answered once for a merchant
+            pipelined (bool): upload each confirmed expense in the background
+            while the next one is shown
         """
+        self.start_session()
+        # The categories, the expense index, the expense store and the csv
+        # file are fetched and checked in the background while the personal
+        # group prompt waits for the user.
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            categories_future: Future = executor.submit(self.load_categories)
+            total_expenses_future: Future = executor.submit(self.preflight)
+            store_future: Future = None
+            if self.store_path is not None:
+                store_future = executor.submit(self.load_expense_store)
+            state_future: Future = None
+            if self.state_path is not None:
+                state_future = executor.submit(self.load_state_store)
+            (
+                self.user_id,
+                self.user_friends,
+                self.user_groups,
+                self.user_groups_members,
+            ) = self.get_user_info()
+            index_future: Future = None
+            if self.index_path is not None:
+                index_future = executor.submit(self.load_expense_index)
+
+            with self.metrics.time("prompt", "personal_group"):
+                user_personal_expense_group_id: int = (
+                    self.choose_personal_expense_group(
+                        self.user_groups,
+                        self.user_groups_members,
+                        self.user_id,
+                    )
+                )
 
-        (
-            self.user_id,
-            self.user_friends,
-            self.user_groups,
-            self.user_groups_members,
-        ) = self.get_user_info()
-        user_personal_expense_group_id: int = (
-            self.choose_personal_expense_group(
-                self.user_groups, self.user_groups_members, self.user_id
+            categories_future.result()
+            total_expenses: int = total_expenses_future.result()
+            self.report_invalid_expenses()
+            if state_future is not None:
+                state_future.result()
+            if index_future is not None:
+                print(
+                    (
+                        f"\nLearned from {index_future.result()} new or "
+                        "updated expenses on Splitwise."
+                    )
+                )
+            if store_future is not None:
+                print(
+                    (
+                        f"\nSynced {store_future.result()} new or updated "
+                        "expenses to the local store."
+                    )
+                )
+
+        uploaded_expenses: Dict[int, Decision] = dict()
+        if user_personal_expense_group_id is not None:
+            with self.metrics.time("prompt", "mode"):
+                user_input: str = input(
+                    (
+                        "\nPress Enter if you want to mark personal expenses "
+                        "in bulk or press any other key to go through the "
+                        "expenses one by one - "
+                    )
+                )
+            if user_input == "":
+                uploaded_expenses = self.mark_personal_expenses(
+                    user_personal_expense_group_id
+                )
+                self.upload_marked_expenses(uploaded_expenses, workers)
+
+        with self.metrics.time("prompt", "mode"):
+            user_input: str = input(
+                (
+                    "\nPress Enter if you want to answer once for expenses "
+                    "from the same merchant or press any other key to go "
+                    "through the expenses one by one - "
+                )
             )
-        )
-        (
-            self.categories,
-            self.all_sub_categories,
-        ) = self.get_categories_and_sub_categories()
+        if user_input == "":
+            merchant_expenses: Dict[int, Decision] = self.answer_clusters(
+                user_personal_expense_group_id, uploaded_expenses
+            )
+            self.upload_marked_expenses(merchant_expenses, workers)
+            uploaded_expenses.update(merchant_expenses)
 
         self.expenses = self.get_csv_file_contents()
 
         print("\nExpense Upload")
-        print(f"\nThere are in total {len(self.expenses)} expenses.")
+        print(f"\nThere are in total {total_expenses} expenses.")
+        # Expenses uploaded in a previous run or by another worker.
+        uploaded_rows: Set[int] = set(uploaded_expenses)
+        interrupted_rows: Set[int] = set()
+        if self.state_store is not None:
+            uploaded_rows.update(
+                self.state_store.row_numbers(self.batch, "uploaded")
+            )
+            interrupted_rows = self.state_store.row_numbers(
+                self.batch, "interrupted"
+            )
+        if uploaded_rows:
+            print(f"{len(uploaded_rows)} of them have been uploaded.")
+        skipped_rows: Set[int] = (
+            uploaded_rows | interrupted_rows | set(self.invalid_expenses)
+        )
+        progress = Progress(total_expenses - len(skipped_rows))
         count: int = 0
-        for expense in self.expenses:
+        done: int = 0
+        failed_uploads: List[Tuple[int, UploadJob]] = list()
+        pending_uploads: List[Tuple[int, UploadJob, Future]] = list()
+        # A single upload worker keeps the expenses in the order of the csv
+        # file on Splitwise.
+        with ThreadPoolExecutor(max_workers=1) as uploader:
+            for expense in self.expenses:
+
+                count += 1
+                if count in skipped_rows:
+                    continue
+                total_expense: float = expense.total_expense
+                failed_uploads.extend(
+                    self.collect_pending_uploads(pending_uploads)
+                )
+                print(f"\nExpense {count} {progress.line(done)}\n")
+                done += 1
+                for key, val in expense._asdict().items():
+                    print(f"{key}: {val}")
 
-            total_expense: float = round(float(expense["amount"]), 2)
-            count += 1
-            print(f"\nExpense {count}\n")
-            for key, val in expense.items():
-                print(f"{key}: {val}")
+                with self.metrics.time("prompt", "upload"):
+                    user_input: str = input(
+                        (
+                            "\nPress Enter if you want to upload this expense "
+                            "on Splitwise or press any other key to go to the "
+                            "next expense - "
+                        )
+                    )
+                if user_input == "":
+                    expense_info: Decision = self.ask_expense_info(
+                        expense, user_personal_expense_group_id
+                    )
+                    job: UploadJob = (expense, expense_info, total_expense)
+                    if pipelined:
+                        pending_uploads.append(
+                            (
+                                count,
+                                job,
+                                uploader.submit(
+                                    self.upload_row, count, job, True
+                                ),
+                            )
+                        )
+                    elif not self.upload_row(count, job):
+                        failed_uploads.append((count, job))
+                else:
+                    continue
 
-            user_input: str = input(
+            if pending_uploads:
+                print(
+                    (
+                        f"\nWaiting for {len(pending_uploads)} expenses to be "
+                        "uploaded."
+                    )
+                )
+            failed_uploads.extend(
+                self.collect_pending_uploads(pending_uploads, wait=True)
+            )
+
+        failed_uploads = self.retry_failed_uploads(failed_uploads)
+        if failed_uploads:
+            print(
                 (
-                    "\nPress Enter if you want to upload this expense on "
-                    "Splitwise or press any other key to go to the next "
-                    "expense - "
+                    f"\n{len(failed_uploads)} expenses have not been uploaded "
+                    "on Splitwise."
                 )
             )
-            if user_input == "":
-                data: str = None
+        else:
+            print(
+                "\nAll expenses have been successfully uploaded on Splitwise."
+            )
+        self.print_session()
+        self.save_dry_run()
+        self.export_metrics()
 
-                while data != "":
-                    expense_info: Dict[
-                        str,
-                        Union[str, float, splitwise.category.Category, int],
-                    ] = self.collect_data(
-                        self.user_id,
-                        self.user_friends,
-                        self.user_groups,
-                        self.user_groups_members,
-                        user_personal_expense_group_id,
-                        self.categories,
-                        self.all_sub_categories,
-                        total_expense,
+    def collect_pending_uploads(
+        self,
+        pending_uploads: List[Tuple[int, UploadJob, Future]],
+        wait: bool = False,
+    ) -> List[Tuple[int, UploadJob]]:
+        """
+        Remove the finished background uploads from the pending uploads and
+        report the ones that failed.
+
+        Args:
+            pending_uploads (List[Tuple[int, UploadJob, Future]]): row number
+            (1-based), job and future of every background upload
+            wait (bool): wait for every pending upload to finish
+
+        Returns:
+            List[Tuple[int, UploadJob]]: row number and job of the failed
+            uploads
+        """
+        failed_uploads: List[Tuple[int, UploadJob]] = list()
+        still_pending: List[Tuple[int, UploadJob, Future]] = list()
+        for row_number, job, future in pending_uploads:
+            if not wait and not future.done():
+                still_pending.append((row_number, job, future))
+                continue
+            try:
+                uploaded: bool = future.result()
+            except Exception as error:
+                print(f"\n{error}")
+                uploaded = False
+            if not uploaded:
+                print(
+                    (
+                        f"\nExpense {row_number} ({job[0].description}) could "
+                        "not be uploaded. You can retry at the end."
                     )
-                    data = self.confirm_data(expense, expense_info)
+                )
+                failed_uploads.append((row_number, job))
+        pending_uploads[:] = still_pending
+        return failed_uploads
+
+    def retry_failed_uploads(
+        self, failed_uploads: List[Tuple[int, UploadJob]]
+    ) -> List[Tuple[int, UploadJob]]:
+        """
+        List the expenses that could not be uploaded and retry them until
+        they are all uploaded or the user skips them.
+
+        Args:
+            failed_uploads (List[Tuple[int, UploadJob]]): row number
+            (1-based) and job of the failed uploads
 
-                if expense_info["group_id"] == user_personal_expense_group_id:
-                    self.upload_expense_personal_group(
-                        expense, expense_info, total_expense
+        Returns:
+            List[Tuple[int, UploadJob]]: row number and job of the uploads
+            that still failed
+        """
+        while failed_uploads:
+            print(f"\n{len(failed_uploads)} expenses could not be uploaded:")
+            for row_number, (expense, _, _) in failed_uploads:
+                print(
+                    (
+                        f"{row_number}: {expense.date} {expense.amount} "
+                        f"{expense.description}"
                     )
-                else:
-                    self.upload_expense_other_groups(
-                        expense, expense_info, total_expense
+                )
+            user_input: str = input(
+                (
+                    "\nPress Enter to retry uploading them or press any other "
+                    "key to skip them - "
+                )
+            )
+            if user_input != "":
+                break
+            failed_uploads = [
+                (row_number, job)
+                for row_number, job in failed_uploads
+                if not self.upload_row(row_number, job)
+            ]
+        return failed_uploads
+
+    def ask_expense_info(
+        self, expense: Transaction, user_personal_expense_group_id: int
+    ) -> Decision:
+        """
+        Predict or collect the data to create an expense until the user
+        confirms it.
+
+        Args:
+            expense (Transaction): expense from csv file
+            user_personal_expense_group_id (int): group id for personal
+            expense group
+
+        Returns:
+            Decision: confirmed data to create expense
+        """
+        total_expense: float = expense.total_expense
+        data: str = None
+
+        expense_info: Decision = self.predict_expense_info(
+            expense.description,
+            total_expense,
+            user_personal_expense_group_id,
+        )
+        if expense_info is not None:
+            with self.metrics.time("prompt", "confirm"):
+                data = self.confirm_data(expense, expense_info)
+
+        while data != "":
+            expense_info = self.collect_data(
+                self.user_id,
+                self.user_friends,
+                self.user_groups,
+                self.user_groups_members,
+                user_personal_expense_group_id,
+                self.categories,
+                self.all_sub_categories,
+                total_expense,
+                expense.description if data is None else None,
+                expense.merchant_key if data is None else None,
+            )
+            with self.metrics.time("prompt", "confirm"):
+                data = self.confirm_data(expense, expense_info)
+
+        return expense_info
+
+    def load_categories(self) -> None:
+        """
+        Fetch the categories and sub-categories and compile the merchant
+        rules, if any, against them.
+        """
+        (
+            self.categories,
+            self.all_sub_categories,
+        ) = self.get_categories_and_sub_categories()
+
+        if self.rules_path is not None:
+            self.categorizer = CategorizeExpense(self.rules_path)
+            self.categorizer.compile_rules(self.all_sub_categories)
+
+    def load_currencies(self) -> None:
+        """
+        Fetch the currency codes of Splitwise, once.
+        """
+        if not self.currency_codes:
+            self.currency_codes = {
+                currency.getCode()
+                for currency in self.call_splitwise("getCurrencies")
+            }
+
+    def preflight(self) -> int:
+        """
+        Check every expense of the csv file before anything is asked or
+        uploaded, so no prompt or request is spent on an expense that can't
+        be uploaded. The file is streamed in chunks, only the problems are
+        kept.
+
+        Returns:
+            int: number of expenses
+        """
+        self.load_currencies()
+        total_expenses, self.invalid_expenses = validate_chunks(
+            self.get_csv_file_contents(), self.currency_codes
+        )
+        return total_expenses
+
+    def run_check(self) -> bool:
+        """
+        Check every expense of the csv file without connecting to Splitwise,
+        so currencies are only checked if their codes are already known.
+
+        Returns:
+            bool: True if every expense can be uploaded
+        """
+        total_expenses, self.invalid_expenses = validate_chunks(
+            self.get_csv_file_contents(), self.currency_codes
+        )
+        if not self.invalid_expenses:
+            print(
+                f"\nThe {total_expenses} expenses of the csv file are valid."
+            )
+            return True
+        self.report_invalid_expenses()
+        return False
+
+    def report_invalid_expenses(self) -> None:
+        """
+        List the expenses that can't be uploaded and why.
+        """
+        if not self.invalid_expenses:
+            return
+        print(
+            (
+                f"\n{len(self.invalid_expenses)} expenses can't be uploaded "
+                "and will be skipped. Fix them in the csv file and upload "
+                "them again:"
+            )
+        )
+        for line in self.invalid_expense_lines():
+            print(line)
+
+    def invalid_expense_lines(self) -> List[str]:
+        """
+        Returns:
+            List[str]: row number and problems of every invalid expense
+        """
+        return [
+            f"Row {row_number}: {', '.join(problems)}."
+            for row_number, problems in self.invalid_expenses.items()
+        ]
+
+    def load_expense_index(self) -> int:
+        """
+        Load the expense index and add the expenses added or updated on
+        Splitwise since the last sync. The user id must be known.
+
+        Returns:
+            int: number of expenses fetched from Splitwise
+        """
+        expense_index = ExpenseIndex(self.index_path)
+        expense_index.load()
+        fetched: int = expense_index.sync(self.get_expenses, self.user_id)
+        expense_index.save()
+        self.expense_index = expense_index
+        return fetched
+
+    def load_expense_store(self) -> int:
+        """
+        Open the local expense store and add the expenses added or updated on
+        Splitwise since the last sync.
+
+        Returns:
+            int: number of expenses fetched from Splitwise
+        """
+        expense_store = ExpenseStore(self.store_path)
+        expense_store.open()
+        fetched: int = expense_store.sync(self.get_expenses)
+        self.expense_store = expense_store
+        return fetched
+
+    def record_expense(self, expense: splitwise.expense.Expense) -> None:
+        """
+        Record an expense just created on Splitwise under the upload session
+        and write it through to the local expense store, if any. The expense
+        is on Splitwise either way, so a failure is only reported.
+
+        Args:
+            expense (splitwise.expense.Expense): created expense
+        """
+        self.created.expense_id = expense.getId()
+        if self.dry_run_path is not None:
+            return
+        try:
+            if self.upload_sessions is not None:
+                self.upload_sessions.add_expense(
+                    self.session_id,
+                    expense.getId(),
+                    expense.getDate(),
+                    expense.getCost(),
+                    expense.getDescription(),
+                    expense.getGroupId(),
+                )
+            if self.expense_store is not None:
+                self.expense_store.add_expense(expense)
+        except sqlite3.Error as error:
+            print(
+                f"\nExpense {expense.getId()} could not be recorded - {error}"
+            )
+
+    def start_session(self) -> str:
+        """
+        Start a new upload session, recorded in the sessions file if any.
+
+        Returns:
+            str: id of the session
+        """
+        self.session_id = new_session_id()
+        if self.sessions_path is not None:
+            if self.upload_sessions is None:
+                self.upload_sessions = UploadSessions(self.sessions_path)
+                self.upload_sessions.open()
+            self.upload_sessions.start(self.session_id, self.file_name)
+        return self.session_id
+
+    def print_session(self) -> None:
+        """
+        Tell the user how to undo the session, if it created any expenses.
+        """
+        if self.upload_sessions is None or not self.upload_sessions.expenses(
+            self.session_id
+        ):
+            return
+        print(
+            (
+                f"\nThis upload session is {self.session_id}. To undo it, run "
+                f"run_undo_session.py {self.session_id}"
+            )
+        )
+
+    @property
+    def merged(self) -> bool:
+        """
+        Returns:
+            bool: True if many clean csv files are uploaded as one
+        """
+        return isinstance(self.file_path, (list, tuple))
+
+    @property
+    def file_name(self) -> str:
+        """
+        Returns:
+            str: path to the csv file, or paths to the merged files
+        """
+        if self.file_path is None or not self.merged:
+            return self.file_path
+        return os.pathsep.join(str(path) for path in self.file_path)
+
+    @property
+    def batch(self) -> str:
+        """
+        Returns:
+            str: key of the rows of the csv file in the transaction store
+        """
+        if not self.merged:
+            return batch_key(self.file_path)
+        # Dropping duplicates changes the row numbers of the merged files.
+        return os.pathsep.join(
+            [batch_key(path) for path in self.file_path]
+            + (["drop_duplicates"] if self.drop_duplicates else [])
+        )
+
+    def load_state_store(self) -> None:
+        """
+        Open the transaction store and add the rows of the csv file, unless
+        they were added when it was cleaned. Rows claimed long ago by a
+        worker that crashed are interrupted: they are only uploaded again
+        with retry_interrupted, once the user has checked Splitwise.
+        """
+        state_store = TransactionStore(self.state_path)
+        state_store.open()
+        state_store.add_transactions(self.batch, self.get_csv_file_contents())
+        if self.retry_interrupted:
+            retried: int = state_store.retry_interrupted(self.batch)
+            if retried:
+                print(f"\n{retried} interrupted expenses will be uploaded.")
+        state_store.interrupt_stale_claims(self.batch)
+        interrupted: int = state_store.counts(self.batch)["interrupted"]
+        if interrupted:
+            print(
+                (
+                    f"\n{interrupted} expenses were being uploaded by a "
+                    "worker that stopped and may already be on Splitwise. "
+                    "They are skipped, check them on Splitwise and upload "
+                    "again with --retry-interrupted if they are missing."
+                )
+            )
+        self.state_store = state_store
+
+    def upload_row(
+        self, row_number: int, job: UploadJob, quiet: bool = False
+    ) -> bool:
+        """
+        Upload an expense of the csv file. With a transaction store, its
+        decision and the result are recorded, and it is only uploaded if no
+        other worker has claimed it.
+
+        Args:
+            row_number (int): row number (1-based)
+            job (UploadJob): expense, expense info and total expense amount.
+            quiet (bool): don't print the outcome.
+
+        Returns:
+            bool: True if the expense is on Splitwise.
+        """
+        if self.state_store is None:
+            return self.upload_expense(job, quiet)
+
+        self.state_store.record_decisions(self.batch, {row_number: job[1]})
+        if not self.state_store.claim(
+            self.batch, worker_name(), row_number=row_number
+        ):
+            if not quiet:
+                print(
+                    (
+                        f"\nExpense {row_number} has already been uploaded "
+                        "or is being uploaded."
                     )
-            else:
-                continue
-        print("\nAll expenses have been successfully uploaded on Splitwise.")
+                )
+            return True
+        return self.upload_claimed_row(row_number, job, quiet)
+
+    def upload_claimed_row(
+        self, row_number: int, job: UploadJob, quiet: bool = False
+    ) -> bool:
+        """
+        Upload an expense claimed in the transaction store and record the
+        result.
+
+        Args:
+            row_number (int): row number (1-based)
+            job (UploadJob): expense, expense info and total expense amount.
+            quiet (bool): don't print the outcome.
+
+        Returns:
+            bool: True if the expense was added to Splitwise.
+        """
+        self.created.expense_id = None
+        try:
+            uploaded: bool = self.upload_expense(job, quiet)
+        except Exception as error:
+            self.state_store.mark_failed(self.batch, row_number, str(error))
+            raise
+        if uploaded:
+            self.state_store.mark_uploaded(
+                self.batch, row_number, self.created.expense_id
+            )
+        else:
+            self.state_store.mark_failed(
+                self.batch, row_number, "Splitwise did not add the expense."
+            )
+        return uploaded
+
+    def upload_rows(
+        self,
+        jobs: Dict[int, UploadJob],
+        mode: str = "threaded",
+        workers: int = 8,
+    ) -> List[Tuple[int, UploadJob]]:
+        """
+        Upload expenses of the csv file whose info has already been
+        collected. With a transaction store, the decisions are recorded and
+        `workers` threads claim and upload the pending rows one at a time,
+        so other processes can drain the same rows without uploading an
+        expense twice.
+
+        Args:
+            jobs (Dict[int, UploadJob]): expense, expense info and total
+            expense amount by row number (1-based)
+            mode (str): "sequential", "threaded" or "async", rows of a
+            transaction store are uploaded from threads unless sequential
+            workers (int): number of concurrent uploads
+
+        Returns:
+            List[Tuple[int, UploadJob]]: row number and job of the expenses
+            that could not be uploaded
+        """
+        if self.state_store is None:
+            failed_jobs = {
+                id(job)
+                for job in self.upload_batch(
+                    list(jobs.values()), mode, workers
+                )
+            }
+            return [
+                (row_number, job)
+                for row_number, job in jobs.items()
+                if id(job) in failed_jobs
+            ]
+        if mode not in UPLOAD_MODES:
+            raise ValueError(f"Unknown upload mode {mode}.")
+
+        self.state_store.record_decisions(
+            self.batch,
+            {row_number: job[1] for row_number, job in jobs.items()},
+        )
+
+        def drain() -> List[Tuple[int, UploadJob]]:
+            failed_uploads: List[Tuple[int, UploadJob]] = list()
+            while True:
+                claimed = self.state_store.claim(self.batch, worker_name())
+                if not claimed:
+                    return failed_uploads
+                row_number, expense, expense_info = claimed[0]
+                job = (expense, expense_info, expense.total_expense)
+                try:
+                    uploaded = self.upload_claimed_row(row_number, job)
+                except Exception as error:
+                    print(f"\nExpense {expense.description} failed - {error}")
+                    uploaded = False
+                if not uploaded:
+                    failed_uploads.append((row_number, job))
+
+        workers = 1 if mode == "sequential" else workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(drain) for _ in range(workers)]
+        return sorted(
+            failed_upload
+            for future in futures
+            for failed_upload in future.result()
+        )
+
+    def run_headless(
+        self,
+        decisions_path: str = None,
+        upload_mode: str = "sequential",
+        workers: int = 8,
+    ) -> None:
+        """
+        Method to upload the entire csv file without any prompts, using the
+        decisions in the decisions file or, if no decisions file is given, in
+        the extra columns of the csv file. Nothing is uploaded unless every
+        expense has a valid decision.
+
+        Args:
+            decisions_path (str): path to the decisions file
+            upload_mode (str): "sequential", "threaded" or "async"
+            workers (int): number of concurrent uploads
+        """
+        self.start_session()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            categories_future: Future = executor.submit(
+                self.get_categories_and_sub_categories
+            )
+            currencies_future: Future = executor.submit(self.load_currencies)
+            store_future: Future = None
+            if self.store_path is not None:
+                store_future = executor.submit(self.load_expense_store)
+            state_future: Future = None
+            if self.state_path is not None:
+                state_future = executor.submit(self.load_state_store)
+            # Every decision is validated before anything is uploaded, so the
+            # expenses are kept for the upload.
+            expenses_future: Future = executor.submit(
+                lambda: list(self.get_csv_file_contents())
+            )
+            (
+                self.user_id,
+                self.user_friends,
+                self.user_groups,
+                self.user_groups_members,
+            ) = self.get_user_info()
+            (
+                self.categories,
+                self.all_sub_categories,
+            ) = categories_future.result()
+            self.expenses = expenses_future.result()
+            currencies_future.result()
+            if store_future is not None:
+                store_future.result()
+            if state_future is not None:
+                state_future.result()
+
+        self.upload_with_decisions(decisions_path, upload_mode, workers)
+        self.print_session()
+        self.save_dry_run()
+        self.export_metrics()
+
+    def upload_with_decisions(
+        self,
+        decisions_path: str = None,
+        upload_mode: str = "sequential",
+        workers: int = 8,
+    ) -> Tuple[List[str], List[UploadJob]]:
+        """
+        Check the loaded expenses and validate their decisions, and upload
+        them if every expense is valid and has a valid decision. The user
+        info and categories must already be fetched, and the currencies to
+        check them.
+
+        Args:
+            decisions_path (str): path to the decisions file, the decisions
+            are read from the csv file if None
+            upload_mode (str): "sequential", "threaded" or "async"
+            workers (int): number of concurrent uploads
+
+        Returns:
+            Tuple[List[str], List[UploadJob]]: validation errors and the jobs
+            that could not be uploaded
+        """
+        self.invalid_expenses = validate_transactions(
+            self.expenses, self.currency_codes
+        )
+        if self.invalid_expenses:
+            errors = self.invalid_expense_lines()
+            print("\nThe csv file could not be validated.\n")
+            for error in errors:
+                print(error)
+            print("\nNo expenses have been uploaded.")
+            return errors, list()
+
+        if decisions_path is None:
+            if self.merged:
+                raise ValueError(
+                    "Merged csv files are uploaded with a decisions file."
+                )
+            decisions = ExpenseDecisions(self.file_path, inline=True)
+        else:
+            decisions = ExpenseDecisions(decisions_path)
+        decisions.load()
+
+        all_expense_info, errors = decisions.resolve(
+            self.expenses,
+            self.user_id,
+            self.user_friends,
+            self.user_groups,
+            self.user_groups_members,
+            self.all_sub_categories,
+        )
+        if errors:
+            print("\nThe decisions file could not be validated.\n")
+            for error in errors:
+                print(error)
+            print("\nNo expenses have been uploaded.")
+            return errors, list()
+
+        print("\nExpense Upload")
+        print(f"\nThere are in total {len(self.expenses)} expenses.")
+        jobs: Dict[int, UploadJob] = {
+            row_number: (expense, expense_info, expense.total_expense)
+            for row_number, (expense, expense_info) in enumerate(
+                zip(self.expenses, all_expense_info), start=1
+            )
+        }
+        interrupted_rows: Set[int] = set()
+        if self.state_store is not None:
+            uploaded_rows = self.state_store.row_numbers(
+                self.batch, "uploaded"
+            )
+            if uploaded_rows:
+                print(f"{len(uploaded_rows)} of them have been uploaded.")
+            interrupted_rows = self.state_store.row_numbers(
+                self.batch, "interrupted"
+            )
+        failed_jobs = [
+            job for _, job in self.upload_rows(jobs, upload_mode, workers)
+        ]
+        if failed_jobs:
+            print(f"\n{len(failed_jobs)} expenses could not be uploaded:")
+            for expense, _, _ in failed_jobs:
+                print(f"{expense.date} {expense.description}")
+        elif interrupted_rows:
+            print(
+                (
+                    f"\n{len(interrupted_rows)} interrupted expenses have "
+                    "not been uploaded again."
+                )
+            )
+        else:
+            print(
+                "\nAll expenses have been successfully uploaded on Splitwise."
+            )
+        return errors, failed_jobs
+
+    def save_dry_run(self) -> None:
+        """
+        Save what a dry run would have sent to Splitwise to the dry run
+        file.
+        """
+        if self.dry_run_path is None:
+            return
+        self.splitwise_client.save(self.dry_run_path)
+        print(
+            (
+                f"\nDry run: {len(self.splitwise_client.payloads)} changes "
+                f"that would have been sent to Splitwise were saved to "
+                f"{self.dry_run_path}."
+            )
+        )
+
+    def export_metrics(self) -> None:
+        """
+        Print where the time of the session went and save the metrics to the
+        json file and the Prometheus textfile, if given.
+        """
+        self.metrics.print_summary()
+        if self.metrics_path is not None:
+            self.metrics.save_json(self.metrics_path)
+        if self.prometheus_path is not None:
+            self.metrics.save_prometheus(self.prometheus_path)
+
+    def call_splitwise(self, call: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Call the Splitwise client, recording the latency and errors of every
+        attempt. Rate limited requests are retried, and so are server errors
+        of read calls, waiting twice as long after every attempt or as long
+        as the server asks. With a rate limiter, every request waits for a
+        token of the account and a 429 slows down every process sharing it.
+
+        Args:
+            call (str): name of the Splitwise method, e.g. "getFriends"
+            *args (Any): arguments of the method
+            **kwargs (Any): keyword arguments of the method
+
+        Returns:
+            Any: result of the method
+
+        Raises:
+            SplitwiseException: if the call fails and can't be retried
+        """
+        from splitwise.exception import SplitwiseException
+
+        splitwise_obj = self.splitwise_obj
+        rate_limiter: RateLimiter = None
+        # A dry run records writes without sending them.
+        if self.dry_run_path is None or call not in RECORDED_CALLS:
+            rate_limiter = self.get_rate_limiter()
+        attempt: int = 0
+        while True:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            try:
+                with self.metrics.time("api", call):
+                    return getattr(splitwise_obj, call)(*args, **kwargs)
+            except SplitwiseException as error:
+                status: int = http_status(error)
+                self.metrics.count_error(call, status)
+                retry_after: float = 0.0
+                try:
+                    retry_after = float(error.http_headers.get("Retry-After"))
+                except (TypeError, ValueError):
+                    pass
+                if status == 429 and rate_limiter is not None:
+                    rate_limiter.throttle(retry_after)
+                retryable: bool = status == 429 or (
+                    status >= 500 and call not in WRITE_CALLS
+                )
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay: float = max(
+                    self.retry_delay * 2**attempt, retry_after
+                )
+            attempt += 1
+            self.metrics.count_retry(call)
+            time.sleep(delay)
+
+    def get_expenses(self, **kwargs: Any) -> List[splitwise.expense.Expense]:
+        """
+        Fetch a page of expenses through call_splitwise, so syncs share the
+        rate limit, retries and metrics of the other calls.
+
+        Args:
+            **kwargs (Any): arguments of Splitwise.getExpenses, e.g. offset,
+            limit and updated_after
+
+        Returns:
+            List[splitwise.expense.Expense]: expenses of the page
+        """
+        return self.call_splitwise("getExpenses", **kwargs)
 
     def get_user_info(
         self,
@@ -113,15 +1135,15 @@ class UploadExpense:
             Tuple[int, Dict[int, str], Dict[int, str], Dict[int, List[int]]]:
             user_id, friends, groups, groups_members
         """
-        user_id: int = self.splitwise_obj.getCurrentUser().getId()
+        user_id: int = self.call_splitwise("getCurrentUser").getId()
 
         friends: Dict[int, str] = dict()
-        friends_obj = self.splitwise_obj.getFriends()
+        friends_obj = self.call_splitwise("getFriends")
         for friend in friends_obj:
             friends[friend.getId()] = friend.getFirstName()
 
         groups: Dict[int, str] = dict()
-        groups_obj = self.splitwise_obj.getGroups()
+        groups_obj = self.call_splitwise("getGroups")
         groups_members: Dict[int, List[int]] = dict()
         for group in groups_obj:
             group_name = group.getName()
@@ -130,8 +1152,8 @@ class UploadExpense:
 
             group_members_obj = [
                 member
-                for member in self.splitwise_obj.getGroup(
-                    group_id
+                for member in self.call_splitwise(
+                    "getGroup", group_id
                 ).getMembers()
             ]
             groups_members[group_id] = [
@@ -157,21 +1179,25 @@ class UploadExpense:
 
         if user_input == "":
             personal_expense_group_id: int = None
+            group_index_name_map: Dict[int, str] = dict(
+                enumerate(all_groups.values())
+            )
+            self.print_options(
+                self.get_menu("group", group_index_name_map), show_all=True
+            )
 
             while personal_expense_group_id not in all_groups.keys():
-                print("\n")
-                for index, group in enumerate(all_groups.values()):
-                    print(f"{index} - {group}")
-
                 try:
-                    personal_group_index: int = input(
+                    personal_group_index: int = self.read_choice(
+                        "group",
+                        group_index_name_map,
                         (
-                            "\nHere are your groups. Enter the number "
+                            "\nHere are your groups. Enter the number or name "
                             "of the personal expense group - "
-                        )
+                        ),
                     )
                     personal_expense_group_id: int = list(all_groups.keys())[
-                        int(personal_group_index)
+                        personal_group_index
                     ]
 
                     if (
@@ -188,59 +1214,451 @@ class UploadExpense:
                                 "person. Please a different group."
                             )
                         )
-                except ValueError:
-                    print("\nPlease enter a valid number.")
                 except IndexError:
                     print("\nPlease enter a value within the given list.")
         else:
             return None
 
-    def get_categories_and_sub_categories(
+    def get_categories_and_sub_categories(
+        self,
+    ) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+        """
+        Returns a dictionary of available categories and their ids.
+
+        Returns:
+            Tuple[Dict[str, int], Dict[str, Dict[str, int]]]: Returns a
+            dictionary of categories and their ids and a dictionary of
+            sub-categories and their ids for each category.
+        """
+        categories: Dict[str, int] = dict()
+        all_sub_categories: Dict[
+            str, Dict[str, splitwise.category.Category]
+        ] = dict()
+        categories_obj = self.call_splitwise("getCategories")
+
+        for category in categories_obj:
+            category_name = category.getName()
+            categories[category_name] = category.getId()
+
+            sub_categories_obj = category.getSubcategories()
+            sub_category_for_category: Dict[
+                str, splitwise.category.Category
+            ] = dict()
+            for sub_category in sub_categories_obj:
+                sub_category_for_category[
+                    sub_category.getName()
+                ] = sub_category
+
+            all_sub_categories[category_name] = sub_category_for_category
+        return categories, all_sub_categories
+
+    def get_csv_file_contents(self) -> Iterator[Transaction]:
+        """
+        Read the expenses of the csv file one row at a time, or of the
+        merged csv files by date.
+
+        Returns:
+            Iterator[Transaction]: expenses
+        """
+        if self.merged:
+            return merge_clean_csvs(self.file_path, self.drop_duplicates)
+        return read_clean_csv(self.file_path)
+
+    def choose_bulk_filter(
+        self,
+    ) -> Tuple[str, Callable[[Transaction], object]]:
+        """
+        Choose how to select personal expenses in bulk: by merchant rule, by
+        amount range or by a regex on the description.
+
+        Returns:
+            Tuple[str, Callable[[Transaction], object]]: filter type (r, a, d
+            or an empty string if the user is done) and a function returning
+            a truthy value for the selected expenses, the sub-category of the
+            matching rule for merchant rules.
+        """
+        possible_filter_types: List[str] = ["r", "a", "d", ""]
+        filter_type: str = None
+
+        while filter_type not in possible_filter_types:
+            filter_type = input(
+                (
+                    "\nChoose how to select personal expenses: (merchant "
+                    "rules: r, amount range: a, description: d) or press "
+                    "Enter if you are done - "
+                )
+            )
+            if filter_type not in possible_filter_types:
+                print("\nPlease choose between r, a, d and Enter.")
+            elif filter_type == "r" and self.categorizer is None:
+                print("\nNo merchant rules were given with --rules.")
+                filter_type = None
+
+        if filter_type == "":
+            return filter_type, None
+
+        if filter_type == "r":
+            return filter_type, lambda expense: self.categorizer.match(
+                expense.description, expense.merchant_key
+            )
+
+        if filter_type == "a":
+            amount_range: List[float] = list()
+            while len(amount_range) != 2:
+                try:
+                    amount_range = sorted(
+                        float(amount)
+                        for amount in input(
+                            "\nEnter the amount range, e.g. 0-20 - "
+                        ).split("-")
+                    )
+                except ValueError:
+                    amount_range = list()
+                if len(amount_range) != 2:
+                    print("\nPlease enter two amounts separated by -.")
+            low, high = amount_range
+
+            def amount_filter(expense: Transaction) -> bool:
+                try:
+                    return low <= expense.total_expense <= high
+                except ValueError:
+                    return False
+
+            return filter_type, amount_filter
+
+        pattern: re.Pattern = None
+        while pattern is None:
+            try:
+                pattern = re.compile(
+                    input(
+                        (
+                            "\nEnter a pattern found in the descriptions, "
+                            "e.g. colruyt|delhaize - "
+                        )
+                    ),
+                    re.IGNORECASE,
+                )
+            except re.error:
+                print("\nPlease enter a valid regular expression.")
+        return filter_type, lambda expense: pattern.search(expense.description)
+
+    def mark_personal_expenses(
+        self, user_personal_expense_group_id: int
+    ) -> Dict[int, Decision]:
+        """
+        Mark groups of expenses as personal and choose one sub-category per
+        group, or use the sub-category of the matching merchant rule.
+
+        Args:
+            user_personal_expense_group_id (int): group id for personal
+            expense group
+
+        Returns:
+            Dict[int, Decision]: data to create each marked expense by row
+            number (1-based)
+        """
+        personal_expenses: Dict[int, Decision] = dict()
+        group_name: str = self.user_groups[user_personal_expense_group_id]
+
+        with self.metrics.time("prompt", "bulk_filter"):
+            filter_type, bulk_filter = self.choose_bulk_filter()
+        while bulk_filter is not None:
+            selected: List[Tuple[int, Transaction, object]] = list()
+            for row_number, expense in enumerate(
+                self.get_csv_file_contents(), start=1
+            ):
+                if (
+                    row_number not in personal_expenses
+                    and row_number not in self.invalid_expenses
+                ):
+                    matched = bulk_filter(expense)
+                    if matched:
+                        selected.append((row_number, expense, matched))
+
+            if not selected:
+                print("\nNo remaining expense matches.")
+            else:
+                print(f"\n{len(selected)} expenses match, for example:")
+                for row_number, expense, _ in selected[:5]:
+                    print(
+                        (
+                            f"{row_number}: {expense.date} {expense.amount} "
+                            f"{expense.description}"
+                        )
+                    )
+
+                if filter_type != "r":
+                    with self.metrics.time("prompt", "category"):
+                        chosen_category: str = self.choose_category(
+                            self.categories
+                        )
+                        sub_category: Tuple[
+                            str, splitwise.category.Category
+                        ] = self.choose_sub_category(
+                            self.all_sub_categories, chosen_category
+                        )
+                    selected = [
+                        (row_number, expense, sub_category)
+                        for row_number, expense, _ in selected
+                    ]
+
+                with self.metrics.time("prompt", "bulk_confirm"):
+                    user_input: str = input(
+                        (
+                            f"\nPress Enter to mark these {len(selected)} "
+                            "expenses as personal or press any other key to "
+                            "discard them - "
+                        )
+                    )
+                if user_input == "":
+                    for row_number, _, sub_category in selected:
+                        personal_expenses[row_number] = Decision(
+                            sub_category_name=sub_category[0],
+                            sub_category_obj=sub_category[1],
+                            group_name=group_name,
+                            group_id=user_personal_expense_group_id,
+                        )
+
+            with self.metrics.time("prompt", "bulk_filter"):
+                filter_type, bulk_filter = self.choose_bulk_filter()
+
+        return personal_expenses
+
+    def upload_marked_expenses(
+        self, marked_expenses: Dict[int, Decision], workers: int = 8
+    ) -> None:
+        """
+        Upload the expenses whose data is already known concurrently.
+        Expenses that could not be uploaded are unmarked, so they are asked
+        for again.
+
+        Args:
+            marked_expenses (Dict[int, Decision]): data to create each
+            marked expense by row number (1-based)
+            workers (int): number of concurrent uploads
+        """
+        if not marked_expenses:
+            return
+
+        jobs: Dict[int, UploadJob] = dict()
+        for row_number, expense in enumerate(
+            self.get_csv_file_contents(), start=1
+        ):
+            if row_number in marked_expenses:
+                jobs[row_number] = (
+                    expense,
+                    marked_expenses[row_number],
+                    expense.total_expense,
+                )
+
+        print(f"\nUploading {len(jobs)} expenses.")
+        failed_uploads = self.upload_rows(jobs, "threaded", workers)
+        for row_number, _ in failed_uploads:
+            del marked_expenses[row_number]
+        if failed_uploads:
+            print(
+                (
+                    f"\n{len(failed_uploads)} expenses could not be uploaded, "
+                    "they will be asked for one by one."
+                )
+            )
+
+    def answer_clusters(
+        self,
+        user_personal_expense_group_id: int,
+        skipped_rows: Dict[int, Decision],
+    ) -> Dict[int, Decision]:
+        """
+        Group the expenses by merchant (normalized description) and ask the
+        expense questions once for every merchant with several expenses.
+
+        Args:
+            user_personal_expense_group_id (int): group id for personal
+            expense group
+            skipped_rows (Dict[int, Decision]): expenses already uploaded by
+            row number (1-based)
+
+        Returns:
+            Dict[int, Decision]: data to create each expense of the answered
+            merchants by row number (1-based)
+        """
+        clusters = ExpenseClusters()
+        for row_number, expense in enumerate(
+            self.get_csv_file_contents(), start=1
+        ):
+            if (
+                row_number not in skipped_rows
+                and row_number not in self.invalid_expenses
+            ):
+                clusters.add(row_number, expense)
+
+        merchant_expenses: Dict[int, Decision] = dict()
+        shared_expenses: Dict[int, Decision] = dict()
+        repeated_clusters = clusters.repeated()
+        print(
+            (
+                f"\nThere are {len(repeated_clusters)} merchants with more "
+                "than one expense."
+            )
+        )
+        for key, row_numbers in repeated_clusters:
+            examples = clusters.examples[key]
+            print(f"\n{len(row_numbers)} expenses from {key}, for example:")
+            for row_number, expense in examples:
+                print(
+                    (
+                        f"{row_number}: {expense.date} {expense.amount} "
+                        f"{expense.description}"
+                    )
+                )
+            with self.metrics.time("prompt", "merchant"):
+                user_input: str = input(
+                    (
+                        "\nPress Enter to answer once for all of them or "
+                        "press any other key to go through them one by one - "
+                    )
+                )
+            if user_input == "":
+                expense_info: Decision = self.ask_expense_info(
+                    examples[0][1], user_personal_expense_group_id
+                )
+                if expense_info.friend_ids:
+                    shared_expenses.update(
+                        dict.fromkeys(row_numbers, expense_info)
+                    )
+                else:
+                    merchant_expenses.update(
+                        dict.fromkeys(row_numbers, expense_info)
+                    )
+
+        if shared_expenses:
+            # The amounts of the shared expenses are read again to scale
+            # their shares.
+            members: Dict[Decision, List[Tuple[int, float]]] = dict()
+            for row_number, expense in enumerate(
+                self.get_csv_file_contents(), start=1
+            ):
+                if row_number in shared_expenses:
+                    members.setdefault(
+                        shared_expenses[row_number], list()
+                    ).append((row_number, expense.total_expense))
+            for expense_info, cluster_members in members.items():
+                merchant_expenses.update(
+                    self.fan_out_expense_info(expense_info, cluster_members)
+                )
+
+        return merchant_expenses
+
+    def fan_out_expense_info(
         self,
-    ) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+        expense_info: Decision,
+        members: List[Tuple[int, float]],
+    ) -> Dict[int, Decision]:
         """
-        Returns a dictionary of available categories and their ids.
+        Apply the data confirmed for the first expense of a merchant to all
+        its expenses. Shares are scaled to each amount in cents.
+
+        Args:
+            expense_info (Decision): data confirmed for the first expense
+            members (List[Tuple[int, float]]): row number and total amount
+            of every expense of the merchant
 
         Returns:
-            Tuple[Dict[str, int], Dict[str, Dict[str, int]]]: Returns a
-            dictionary of categories and their ids and a dictionary of
-            sub-categories and their ids for each category.
+            Dict[int, Decision]: data to create each expense by row number
         """
-        categories: Dict[str, int] = dict()
-        all_sub_categories: Dict[
-            str, Dict[str, splitwise.category.Category]
-        ] = dict()
-        categories_obj = self.splitwise_obj.getCategories()
-
-        for category in categories_obj:
-            category_name = category.getName()
-            categories[category_name] = category.getId()
-
-            sub_categories_obj = category.getSubcategories()
-            sub_category_for_category: Dict[
-                str, splitwise.category.Category
-            ] = dict()
-            for sub_category in sub_categories_obj:
-                sub_category_for_category[
-                    sub_category.getName()
-                ] = sub_category
+        if not expense_info.friend_ids:
+            return {row_number: expense_info for row_number, _ in members}
 
-            all_sub_categories[category_name] = sub_category_for_category
-        return categories, all_sub_categories
+        weights: List[float] = [
+            float(share) for share in expense_info.user_shares
+        ]
+        if sum(weights) == 0:
+            weights = [1.0] * len(weights)
+        all_shares: List[List[str]] = format_cents(
+            allocate_cents(
+                to_cents([total_expense for _, total_expense in members]),
+                [weights] * len(members),
+            )
+        )
+        return {
+            row_number: expense_info._replace(user_shares=tuple(shares))
+            for (row_number, _), shares in zip(members, all_shares)
+        }
 
-    def get_csv_file_contents(self) -> List[Dict[str, str]]:
+    def predict_expense_info(
+        self,
+        description: str,
+        total_expense: float,
+        user_personal_expense_group_id: int,
+    ) -> Decision:
         """
-        Open csv file and save all expenses in a list of dictionaries.
+        Predict the data to create an expense from past expenses with a
+        similar description.
+
+        Args:
+            description (str): expense description
+            total_expense (float): total expense amount
+            user_personal_expense_group_id (int): group id for personal expense
+            group
 
         Returns:
-            List[Dict[str, str]]: list of dictionaries containing all
-            expenses.
+            Decision: data to create expense, or None if there is
+            no prediction above the confidence threshold or it no longer
+            matches the user's groups, friends and categories.
         """
-        with open(self.file_path, "r") as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=";")
-            all_expenses = [row for row in csv_reader]
+        if self.expense_index is None:
+            return None
 
-        return all_expenses
+        prediction = self.expense_index.predict(description)
+        if prediction is None:
+            return None
+        (
+            sub_category_id,
+            group_id,
+            friend_ids,
+            friend_shares,
+        ), confidence = prediction
+        if confidence < self.confidence_threshold:
+            return None
+
+        sub_category = None
+        for sub_categories in self.all_sub_categories.values():
+            for sub_category_name, sub_category_obj in sub_categories.items():
+                if sub_category_obj.getId() == sub_category_id:
+                    sub_category = (sub_category_name, sub_category_obj)
+        if sub_category is None or group_id not in self.user_groups:
+            return None
+
+        print(f"\nPredicted from past expenses (confidence {confidence}).")
+        expense_info = Decision(
+            sub_category_name=sub_category[0],
+            sub_category_obj=sub_category[1],
+            group_name=self.user_groups[group_id],
+            group_id=group_id,
+        )
+        if not friend_ids:
+            if group_id != user_personal_expense_group_id:
+                return None
+            return expense_info
+
+        for friend_id in friend_ids:
+            if (
+                friend_id not in self.user_friends
+                or friend_id not in self.user_groups_members[group_id]
+            ):
+                return None
+
+        shares_cents = allocate_cents(
+            to_cents([total_expense]),
+            [[max(1 - sum(friend_shares), 0), *friend_shares]],
+        )
+        return expense_info._replace(
+            friend_names=tuple(
+                self.user_friends[friend_id] for friend_id in friend_ids
+            ),
+            friend_ids=tuple(friend_ids),
+            user_shares=tuple(format_cents(shares_cents)[0]),
+        )
 
     def collect_data(
         self,
@@ -252,7 +1670,9 @@ class UploadExpense:
         all_categories: Dict[str, int],
         all_sub_categories: Dict[str, Dict[str, splitwise.category.Category]],
         total_expense: float,
-    ) -> Dict[str, Union[str, float, splitwise.category.Category, int]]:
+        description: str = None,
+        merchant: str = None,
+    ) -> Decision:
         """
         Method to upload expense on Splitwise.
 
@@ -260,99 +1680,108 @@ class UploadExpense:
             user_personal_expense_group_id (int): group id for personal expense
             group
             total_expense (float): total expense amount
+            description (str): expense description used to look up a
+            merchant rule. The category prompts are skipped on a match.
+            merchant (str): merchant key of the expense, looked up first
         Returns:
-            Dict[
-                str, Union[str, float, splitwise.category.Category, int]]:
-                Dictionary containing data to create expense
+            Decision: data to create expense
         """
-        chosen_category: str = self.choose_category(all_categories)
-        (
-            sub_category_name,
-            sub_category_obj,
-        ) = self.choose_sub_category(all_sub_categories, chosen_category)
-
-        group_name, group_id = self.choose_group(
-            user_personal_expense_group_id,
-            user_groups,
-            user_groups_members,
-        )
+        matched_sub_category: Tuple[str, splitwise.category.Category] = None
+        if self.categorizer is not None:
+            matched_sub_category = self.categorizer.match(
+                description, merchant
+            )
 
-        if group_id == user_personal_expense_group_id:
-            expense_info = {
-                "sub_category_name": sub_category_name,
-                "sub_category_obj": sub_category_obj,
-                "group_name": group_name,
-                "group_id": group_id,
-            }
-            return expense_info
+        if matched_sub_category is not None:
+            sub_category_name, sub_category_obj = matched_sub_category
+            print(
+                (
+                    "\nSub-category matched by merchant rule - "
+                    f"{sub_category_name}"
+                )
+            )
         else:
-            friend_name, friend_id = self.choose_friend(
-                group_id,
+            with self.metrics.time("prompt", "category"):
+                chosen_category: str = self.choose_category(all_categories)
+                (
+                    sub_category_name,
+                    sub_category_obj,
+                ) = self.choose_sub_category(
+                    all_sub_categories, chosen_category
+                )
+
+        with self.metrics.time("prompt", "group"):
+            group_name, group_id = self.choose_group(
+                user_personal_expense_group_id,
+                user_groups,
                 user_groups_members,
-                user_id,
-                user_friends,
             )
-            chosen_split_type: str = self.choose_split_type()
 
-            if chosen_split_type == "=":
-                user_1_share, user_2_share = self.split_equally(total_expense)
-            elif chosen_split_type == "+":
-                (
-                    user_1_share,
-                    user_2_share,
-                ) = self.split_by_exact_amount(total_expense)
-            elif chosen_split_type == "%":
-                user_1_share, user_2_share = self.split_by_percentage(
-                    total_expense
-                )
-            expense_info = {
-                "sub_category_name": sub_category_name,
-                "sub_category_obj": sub_category_obj,
-                "group_name": group_name,
-                "group_id": group_id,
-                "friend_name": friend_name,
-                "friend_id": friend_id,
-                "user_1_share": user_1_share,
-                "user_2_share": user_2_share,
-            }
+        expense_info = Decision(
+            sub_category_name=sub_category_name,
+            sub_category_obj=sub_category_obj,
+            group_name=group_name,
+            group_id=group_id,
+        )
+        if group_id == user_personal_expense_group_id:
             return expense_info
+        else:
+            with self.metrics.time("prompt", "friends"):
+                friend_names, friend_ids = self.choose_friends(
+                    group_id,
+                    user_groups_members,
+                    user_id,
+                    user_friends,
+                )
+            with self.metrics.time("prompt", "split"):
+                chosen_split_type: str = self.choose_split_type()
+
+                if chosen_split_type == "=":
+                    user_shares = self.split_equally(
+                        total_expense, len(friend_ids) + 1
+                    )
+                elif chosen_split_type == "+":
+                    user_shares = self.split_by_exact_amount(
+                        total_expense, friend_names
+                    )
+                elif chosen_split_type == "%":
+                    user_shares = self.split_by_percentage(
+                        total_expense, friend_names
+                    )
+            return expense_info._replace(
+                friend_names=tuple(friend_names),
+                friend_ids=tuple(friend_ids),
+                user_shares=tuple(user_shares),
+            )
 
     def confirm_data(
         self,
-        expense: Dict[str, str],
-        expense_info: Dict[
-            str, Union[str, float, splitwise.category.Category, int]
-        ],
+        expense: Transaction,
+        expense_info: Decision,
     ) -> str:
         """
         Print all relevant data and ask user for confirmation
 
         Args:
-            expense (Dict[str, str]): expense from ccsv file
-            expense_info (Dict[
-                    str, Union[str, float, splitwise.category.Category, int]]):
-                    expense info selected by user
+            expense (Transaction): expense from csv file
+            expense_info (Decision): expense info selected by user
 
         Returns:
             str: Empty string if confirmed by user
         """
         print("\n")
-        for key, val in expense.items():
-            if (
-                key == "sub_category_obj"
-                or key == "group_id"
-                or key == "friend_id"
-            ):
-                continue
-            else:
-                print(f"{key}: {val}")
-        for key, val in expense_info.items():
+        for key, val in expense._asdict().items():
+            print(f"{key}: {val}")
+        for key, val in expense_info._asdict().items():
             if (
                 key == "sub_category_obj"
                 or key == "group_id"
-                or key == "friend_id"
+                or key == "friend_ids"
+                or val == ()
             ):
                 continue
+            elif isinstance(val, tuple):
+                print(f"{key}: {', '.join(val)}")
             else:
                 print(f"{key}: {val}")
         data = input(
@@ -364,6 +1793,106 @@ class UploadExpense:
 
         return data
 
+    def get_menu(self, menu_key: str, options: Dict[int, str]) -> SelectMenu:
+        """
+        Return the selection menu for a list of options, building it only the
+        first time it is needed in the session.
+
+        Args:
+            menu_key (str): name of the menu, used for recent choices
+            options (Dict[int, str]): option numbers and names
+
+        Returns:
+            SelectMenu: selection menu
+        """
+        menu = self.menus.get(menu_key)
+        if menu is None or menu.options != options:
+            menu = SelectMenu(options, self.recent_choices.get(menu_key))
+            self.menus[menu_key] = menu
+        return menu
+
+    def print_options(self, menu: SelectMenu, show_all: bool = False) -> None:
+        """
+        Print the options of a menu, recently chosen ones first. Once some
+        options have been chosen before, only those are printed unless all
+        options are requested.
+
+        Args:
+            menu (SelectMenu): selection menu
+            show_all (bool): print every option
+        """
+        print("\n")
+        numbers: List[int] = menu.ordered()
+        recent_numbers: List[int] = [
+            number for number in numbers if menu.options[number] in menu.recent
+        ]
+        if recent_numbers and not show_all:
+            numbers = recent_numbers
+        for number in numbers:
+            print(f"{number} - {menu.options[number]}")
+        if len(numbers) < len(menu.options):
+            print(
+                (
+                    f"... and {len(menu.options) - len(numbers)} more. Type "
+                    "part of a name to search or press Enter to see them all."
+                )
+            )
+
+    def resolve_choice(self, menu: SelectMenu, user_input: str) -> int:
+        """
+        Turn what the user typed into an option number. A number is returned
+        as is, otherwise the text is looked up in the menu.
+
+        Args:
+            menu (SelectMenu): selection menu
+            user_input (str): number or part of a name
+
+        Returns:
+            int: option number or None if the input doesn't resolve to a
+            single option.
+        """
+        try:
+            return int(user_input)
+        except ValueError:
+            pass
+
+        if user_input.strip() == "":
+            self.print_options(menu, show_all=True)
+            return None
+
+        matches: List[int] = menu.search(user_input)
+        if len(matches) == 1:
+            print(f"{matches[0]} - {menu.options[matches[0]]}")
+            return matches[0]
+        elif matches:
+            print(f"\n{user_input.strip()} matches several options.\n")
+            for number in matches:
+                print(f"{number} - {menu.options[number]}")
+        else:
+            print(f"\nNo option matches {user_input.strip()}.")
+        return None
+
+    def read_choice(
+        self, menu_key: str, options: Dict[int, str], prompt: str
+    ) -> int:
+        """
+        Ask for an option until the user enters a number or enough of a name
+        to identify a single option.
+
+        Args:
+            menu_key (str): name of the menu, used for recent choices
+            options (Dict[int, str]): option numbers and names
+            prompt (str): prompt
+
+        Returns:
+            int: entered option number, which may not be in the options
+        """
+        menu = self.get_menu(menu_key, options)
+        chosen_number: int = None
+        while chosen_number is None:
+            chosen_number = self.resolve_choice(menu, input(prompt))
+        return chosen_number
+
     def choose_group(
         self,
         user_personal_expense_group_id: int,
@@ -381,107 +1910,110 @@ class UploadExpense:
             Tuple[str, int]: group name and group id
         """
         chosen_group_id: int = None
+        group_index_name_map: Dict[int, str] = dict(
+            enumerate(all_groups.values())
+        )
+        self.print_options(self.get_menu("group", group_index_name_map))
 
         while chosen_group_id is None:
-            print("\n")
-            group_index_name_map: Dict[int, str] = dict()
-            for index, group in enumerate(all_groups.values()):
-                print(f"{index} - {group}")
-                group_index_name_map[index] = group
-            try:
-                chosen_group_index: int = int(
-                    input(
+            chosen_group_index: int = self.read_choice(
+                "group",
+                group_index_name_map,
+                (
+                    "\nHere are your groups. "
+                    "Enter the number or name of the group "
+                    "under which you want to list the expense - "
+                ),
+            )
+            if chosen_group_index in group_index_name_map.keys():
+                if len(
+                    list(all_groups_members.values())[chosen_group_index]
+                ) == 1 and (
+                    user_personal_expense_group_id is None
+                    or list(all_groups.keys())[chosen_group_index]
+                    != user_personal_expense_group_id
+                ):
+                    print(
                         (
-                            "\nHere are your groups. "
-                            "Enter the number of the group "
-                            "under which you want to list the expense - "
+                            "\nYou are the only member of this group. "
+                            "Please choose another group."
                         )
                     )
-                )
-                if chosen_group_index in group_index_name_map.keys():
-                    if len(
-                        list(all_groups_members.values())[chosen_group_index]
-                    ) == 1 and (
-                        user_personal_expense_group_id is None
-                        or list(all_groups.keys())[chosen_group_index]
-                        != user_personal_expense_group_id
-                    ):
-                        print(
-                            (
-                                "\nYou are the only member of this group. "
-                                "Please choose another group."
-                            )
-                        )
-                    else:
-                        chosen_group_name = list(all_groups.values())[
-                            chosen_group_index
-                        ]
-                        chosen_group_id = list(all_groups.keys())[
-                            chosen_group_index
-                        ]
                 else:
-                    print("\nPlease enter a value within the given list.")
-            except ValueError:
-                print("\nPlease enter a valid number.")
-            except IndexError:
+                    chosen_group_name = list(all_groups.values())[
+                        chosen_group_index
+                    ]
+                    chosen_group_id = list(all_groups.keys())[
+                        chosen_group_index
+                    ]
+            else:
                 print("\nPlease enter a value within the given list.")
 
+        self.recent_choices.add("group", chosen_group_name)
         return chosen_group_name, chosen_group_id
 
-    def choose_friend(
+    def choose_friends(
         self,
         group_id: int,
         all_groups_members: Dict[str, List[int]],
         user_id: int,
         all_friends: Dict[int, str],
-    ) -> Tuple[str, int]:
+    ) -> Tuple[List[str], List[int]]:
         """
-        Select a friend with whom you want to split the expense
+        Select one or more friends with whom you want to split the expense
 
         Args:
-            group_name (str): Name of the chosen group
+            group_id (int): id of the chosen group
         Returns:
-            str: chosen_friend_name
-            int: chosen_friend_id
+            List[str]: chosen friends' names
+            List[int]: chosen friends' ids
         """
-        chosen_friend_id: int = None
-        chosen_friend_name: str = None
-        while chosen_friend_id is None or chosen_friend_name is None:
-            friend_index_name_map: Dict[int, str] = dict()
+        chosen_friend_ids: List[int] = list()
+        friend_index_id_map: Dict[int, int] = {
+            index: group_member_id
             for index, group_member_id in enumerate(
                 all_groups_members[group_id]
+            )
+            if group_member_id != user_id
+        }
+        friend_index_name_map: Dict[int, str] = {
+            index: all_friends[group_member_id]
+            for index, group_member_id in friend_index_id_map.items()
+        }
+        menu_key: str = f"friend:{group_id}"
+        menu = self.get_menu(menu_key, friend_index_name_map)
+        self.print_options(menu)
+
+        while not chosen_friend_ids:
+            friend_num_indexes: List[int] = [
+                self.resolve_choice(menu, friend_input)
+                for friend_input in input(
+                    (
+                        "\nHere are your friends in this group. Enter the "
+                        "numbers or names of the friends with whom you want "
+                        "to split the expense, separated by commas - "
+                    )
+                ).split(",")
+            ]
+            if None in friend_num_indexes:
+                continue
+            if len(set(friend_num_indexes)) == len(friend_num_indexes) and all(
+                friend_num_index in friend_index_id_map.keys()
+                for friend_num_index in friend_num_indexes
             ):
-                if group_member_id == user_id:
-                    continue
-                else:
-                    friend_name = all_friends[group_member_id]
-                    print(f"{index} - {friend_name}")
-                    friend_index_name_map[index] = friend_name
+                chosen_friend_ids = [
+                    friend_index_id_map[friend_num_index]
+                    for friend_num_index in friend_num_indexes
+                ]
+            else:
+                print("\nPlease enter values within the given list.")
 
-            try:
-                friend_num_index = int(
-                    input(
-                        (
-                            "\nHere are your friends in this group. Enter the "
-                            "number of the friend with whom you want to "
-                            "split the expense - "
-                        )
-                    )
-                )
-                if friend_num_index in friend_index_name_map.keys():
-                    chosen_friend_id = all_groups_members[group_id][
-                        friend_num_index
-                    ]
-                    chosen_friend_name = all_friends[chosen_friend_id]
-                else:
-                    print("\nPlease enter a value within the given list.")
-            except ValueError:
-                print("\nPlease enter a valid number.")
-            except IndexError:
-                print("\nPlease enter a value within the given list.")
-            except KeyError:
-                print("\nPlease enter a value within the given list.")
-        return chosen_friend_name, chosen_friend_id
+        chosen_friend_names: List[str] = [
+            all_friends[friend_id] for friend_id in chosen_friend_ids
+        ]
+        for friend_name in reversed(chosen_friend_names):
+            self.recent_choices.add(menu_key, friend_name)
+        return chosen_friend_names, chosen_friend_ids
 
     def choose_sub_category(
         self,
@@ -499,36 +2031,34 @@ class UploadExpense:
         sub_category_list: List[str] = list(
             all_sub_categories[chosen_category].keys()
         )
+        sub_category_index_map: Dict[int, str] = dict(
+            enumerate(sub_category_list)
+        )
+        menu_key: str = f"sub_category:{chosen_category}"
+        self.print_options(self.get_menu(menu_key, sub_category_index_map))
 
         while chosen_sub_category_name not in sub_category_list:
-            print("\n")
-            sub_category_index_map: Dict[int, str] = dict()
-            for index, sub_category in enumerate(sub_category_list):
-                print(f"{index} - {sub_category}")
-                sub_category_index_map[index] = sub_category
-            try:
-                chosen_sub_category_index: int = int(
-                    input(
-                        (
-                            "\nHere are the available sub-categories for this "
-                            "category. Enter the number of the most relevant "
-                            "sub-category. - "
-                        )
-                    )
-                )
-                if chosen_sub_category_index in sub_category_index_map.keys():
-                    chosen_sub_category_name = sub_category_list[
-                        chosen_sub_category_index
-                    ]
-                else:
-                    print("\nPlease enter a value within the given list.")
-            except ValueError:
-                print("\nPlease enter a valid number.")
+            chosen_sub_category_index: int = self.read_choice(
+                menu_key,
+                sub_category_index_map,
+                (
+                    "\nHere are the available sub-categories for this "
+                    "category. Enter the number or name of the most relevant "
+                    "sub-category. - "
+                ),
+            )
+            if chosen_sub_category_index in sub_category_index_map.keys():
+                chosen_sub_category_name = sub_category_list[
+                    chosen_sub_category_index
+                ]
+            else:
+                print("\nPlease enter a value within the given list.")
 
         chosen_sub_category_obj = all_sub_categories[chosen_category][
             chosen_sub_category_name
         ]
 
+        self.recent_choices.add(menu_key, chosen_sub_category_name)
         return chosen_sub_category_name, chosen_sub_category_obj
 
     def choose_category(self, all_categories: Dict[str, int]) -> str:
@@ -540,29 +2070,24 @@ class UploadExpense:
         """
         categories_list: List[str] = list(all_categories.keys())
         category_name: str = ""
+        category_index_map: Dict[int, str] = dict(enumerate(categories_list))
+        self.print_options(self.get_menu("category", category_index_map))
 
         while category_name not in categories_list:
-            category_index_map: Dict[int, str] = dict()
-            print("\n")
-            for index, category in enumerate(categories_list):
-                print(f"{index} - {category}")
-                category_index_map[index] = category
-            try:
-                chosen_category_index: int = int(
-                    input(
-                        (
-                            "\nHere are the available categories. Enter the "
-                            "number of the most relevant category. - "
-                        )
-                    )
-                )
-                if chosen_category_index in category_index_map.keys():
-                    category_name = categories_list[chosen_category_index]
-                else:
-                    print("\nPlease enter a value within the given list.")
-            except ValueError:
-                print("\nPlease enter a valid number.")
+            chosen_category_index: int = self.read_choice(
+                "category",
+                category_index_map,
+                (
+                    "\nHere are the available categories. Enter the "
+                    "number or name of the most relevant category. - "
+                ),
+            )
+            if chosen_category_index in category_index_map.keys():
+                category_name = categories_list[chosen_category_index]
+            else:
+                print("\nPlease enter a value within the given list.")
 
+        self.recent_choices.add("category", category_name)
         return category_name
 
     def choose_split_type(self) -> str:
@@ -588,159 +2113,323 @@ class UploadExpense:
 
         return chosen_split_type
 
-    def split_equally(self, total_expense: float) -> Tuple[str, str]:
+    def split_equally(
+        self, total_expense: float, participants: int = 2
+    ) -> Tuple[str, ...]:
         """
-        Split total expense amount equally between two users and return split
-        amount.
+        Split total expense amount equally between the user and their friends
+        and return split amount. Rounding cents go to the friends.
 
         Args:
             total_expense (float): total expense amount
+            participants (int): number of people sharing the expense
 
         Returns:
-            Tuple[str, str]: user 1 and user 2 split
+            Tuple[str, ...]: user's split followed by each friend's split
         """
-        user_1_share: float = round(total_expense / 2, 2)
-        user_2_share: float = round(total_expense - user_1_share, 2)
+        shares_cents = allocate_cents(
+            to_cents([total_expense]), [[1] * participants]
+        )
 
-        return str(user_1_share), str(user_2_share)
+        return tuple(format_cents(shares_cents)[0])
 
-    def split_by_exact_amount(self, total_expense: float) -> Tuple[str, str]:
+    def split_by_exact_amount(
+        self, total_expense: float, friend_names: List[str] = None
+    ) -> Tuple[str, ...]:
         """
-        Split total expense amount by exact amount between two users and
+        Split total expense amount by the exact amount owed by each friend and
         return split amount.
 
         Args:
             total_expense (float): total expense amount
+            friend_names (List[str]): names of the friends sharing the
+            expense, one friend if not given
 
         Returns:
-            Tuple[str, str]: user 1 and user 2 split
+            Tuple[str, ...]: user's split followed by each friend's split
         """
+        if friend_names is None:
+            friend_names = ["your friend"]
+
         print(f"\nTotal expense amount = {total_expense}")
-        user_2_share: float = 0
-        while not 0 < user_2_share <= total_expense:
-            try:
-                user_2_share = round(
-                    float(input("\nEnter the amount owed by your friend - ")),
-                    2,
-                )
-                if not 0 < user_2_share <= total_expense:
-                    print(f"\nEnter an amount between 0 and {total_expense}")
-                user_1_share: float = round(total_expense - user_2_share, 2)
+        total_cents: int = int(to_cents([total_expense])[0])
+        friend_shares_cents: List[int] = list()
+        for index, friend_name in enumerate(friend_names):
+            max_share_cents: int = (
+                total_cents
+                - sum(friend_shares_cents)
+                - (len(friend_names) - index - 1)
+            )
+            friend_share_cents: int = 0
+            while not 0 < friend_share_cents <= max_share_cents:
+                try:
+                    friend_share_cents = int(
+                        to_cents(
+                            [
+                                float(
+                                    input(
+                                        "\nEnter the amount owed by "
+                                        f"{friend_name} - "
+                                    )
+                                )
+                            ]
+                        )[0]
+                    )
+                    if not 0 < friend_share_cents <= max_share_cents:
+                        print(
+                            "\nEnter an amount between 0 and "
+                            f"{max_share_cents / 100}"
+                        )
+                except ValueError:
+                    print("\nPlease enter a valid number.")
+            friend_shares_cents.append(friend_share_cents)
 
-            except ValueError:
-                print("\nPlease enter a valid number.")
+        shares_cents = allocate_cents(
+            [total_cents],
+            [[total_cents - sum(friend_shares_cents), *friend_shares_cents]],
+        )
 
-        return str(user_1_share), str(user_2_share)
+        return tuple(format_cents(shares_cents)[0])
 
-    def split_by_percentage(self, total_expense: float) -> Tuple[str, str]:
+    def split_by_percentage(
+        self, total_expense: float, friend_names: List[str] = None
+    ) -> Tuple[str, ...]:
         """
-        Split total expense amount by percentage between two users and
+        Split total expense amount by the percentage owed by each friend and
         return split amount.
 
         Args:
             total_expense (float): total expense amount
+            friend_names (List[str]): names of the friends sharing the
+            expense, one friend if not given
 
         Returns:
-            Tuple[str, str]: user 1 and user 2 split
+            Tuple[str, ...]: user's split followed by each friend's split
         """
-        user_2_share_percent: float = 0
-        while not 0 < user_2_share_percent <= 100:
-            try:
-                user_2_share_percent = round(
-                    float(
-                        input("\nEnter the percentage owed by your friend - ")
-                    ),
-                    2,
-                )
-                if not 0 < user_2_share_percent <= 100:
-                    print("\nEnter a percentage between 0 and 100")
-            except ValueError:
-                print("\nPlease enter a valid percentage.")
+        if friend_names is None:
+            friend_names = ["your friend"]
+
+        friend_share_percents: List[float] = list()
+        for friend_name in friend_names:
+            max_share_percent: float = round(
+                100 - sum(friend_share_percents), 2
+            )
+            friend_share_percent: float = 0
+            while not 0 < friend_share_percent <= max_share_percent:
+                try:
+                    friend_share_percent = round(
+                        float(
+                            input(
+                                "\nEnter the percentage owed by "
+                                f"{friend_name} - "
+                            )
+                        ),
+                        2,
+                    )
+                    if not 0 < friend_share_percent <= max_share_percent:
+                        print(
+                            "\nEnter a percentage between 0 and "
+                            f"{max_share_percent}"
+                        )
+                except ValueError:
+                    print("\nPlease enter a valid percentage.")
+            friend_share_percents.append(friend_share_percent)
 
-        user_2_share: float = round(
-            (total_expense * user_2_share_percent) / 100, 2
+        shares_cents = allocate_cents(
+            to_cents([total_expense]),
+            [[100 - sum(friend_share_percents), *friend_share_percents]],
         )
-        user_1_share: float = round(total_expense - user_2_share, 2)
 
-        return str(user_1_share), str(user_2_share)
+        return tuple(format_cents(shares_cents)[0])
 
     def upload_expense_personal_group(
         self,
-        expense: Dict[str, str],
-        expense_info: Dict[
-            str, Union[str, float, splitwise.category.Category, int]
-        ],
+        expense: Transaction,
+        expense_info: Decision,
         total_expense: float,
-    ) -> None:
+        quiet: bool = False,
+    ) -> bool:
         """
         Upload expense to personal group.
 
         Args:
-            expense (Dict[str, str]): dictionary containing date, amount,
-            description and currency.
-            expense_info (Dict[ str, Union[str, float,
-            splitwise.category.Category, int] ]): dictionary containing
-            sub-category name, object, group name & id, friend name & id, and
-            their share.
+            expense (Transaction): date, amount, description and currency.
+            expense_info (Decision): sub-category name, object, group name &
+            id.
             total_expense (float): total expense amount.
+            quiet (bool): don't print the outcome.
+
+        Returns:
+            bool: True if the expense was added to Splitwise.
         """
+        from splitwise.expense import Expense, ExpenseUser
+
         splitwise_expense = Expense()
         splitwise_expense.setCost(total_expense)
-        splitwise_expense.setCategory(expense_info["sub_category_obj"])
-        splitwise_expense.setDescription(expense["description"])
-        splitwise_expense.setDate(expense["date"])
-        splitwise_expense.setCurrencyCode(expense["currency"])
-        splitwise_expense.setGroupId(expense_info["group_id"])
+        splitwise_expense.setCategory(expense_info.sub_category_obj)
+        splitwise_expense.setDescription(expense.description)
+        splitwise_expense.setDate(expense.date)
+        splitwise_expense.setCurrencyCode(expense.currency)
+        splitwise_expense.setGroupId(expense_info.group_id)
         user1 = ExpenseUser()
         user1.setId(self.user_id)
         user1.setPaidShare(total_expense)
         user1.setOwedShare(total_expense)
         splitwise_expense.addUser(user1)
-        nExpense, errors = self.splitwise_obj.createExpense(splitwise_expense)
+        nExpense, errors = self.call_splitwise(
+            "createExpense", splitwise_expense
+        )
         if not errors:
-            print("\nExpense successfully added to Splitwise.")
+            self.record_expense(nExpense)
+            if not quiet:
+                print("\nExpense successfully added to Splitwise.")
+            return True
         else:
-            print(errors.getErrors())
+            if not quiet:
+                print(errors.getErrors())
+            return False
 
     def upload_expense_other_groups(
         self,
-        expense: Dict[str, str],
-        expense_info: Dict[
-            str, Union[str, float, splitwise.category.Category, int]
-        ],
+        expense: Transaction,
+        expense_info: Decision,
         total_expense: float,
-    ) -> None:
+        quiet: bool = False,
+    ) -> bool:
         """
         Upload expense to groups other than personal group.
 
         Args:
-            expense (Dict[str, str]): dictionary containing date, amount,
-            description and currency.
-            expense_info (Dict[ str, Union[str, float,
-            splitwise.category.Category, int] ]): dictionary containing
-            sub-category name, object, group name & id, friend name & id, and
-            their share.
+            expense (Transaction): date, amount, description and currency.
+            expense_info (Decision): sub-category name, object, group name &
+            id, friends' names & ids, and everyone's share, the user's first.
             total_expense (float): total expense amount.
+            quiet (bool): don't print the outcome.
+
+        Returns:
+            bool: True if the expense was added to Splitwise.
         """
+        from splitwise.expense import Expense, ExpenseUser
+
         splitwise_expense = Expense()
         splitwise_expense.setCost(total_expense)
-        splitwise_expense.setCategory(expense_info["sub_category_obj"])
-        splitwise_expense.setDescription(expense["description"])
-        splitwise_expense.setDate(expense["date"])
-        splitwise_expense.setCurrencyCode(expense["currency"])
-        splitwise_expense.setGroupId(expense_info["group_id"])
+        splitwise_expense.setCategory(expense_info.sub_category_obj)
+        splitwise_expense.setDescription(expense.description)
+        splitwise_expense.setDate(expense.date)
+        splitwise_expense.setCurrencyCode(expense.currency)
+        splitwise_expense.setGroupId(expense_info.group_id)
         user1 = ExpenseUser()
         user1.setId(self.user_id)
         user1.setPaidShare(total_expense)
-        user1.setOwedShare(expense_info["user_1_share"])
-        user2 = ExpenseUser()
-        user2.setId(expense_info["friend_id"])
-        user2.setPaidShare("0.0")
-        user2.setOwedShare(expense_info["user_2_share"])
+        user1.setOwedShare(expense_info.user_shares[0])
         splitwise_expense.addUser(user1)
-        splitwise_expense.addUser(user2)
-        nExpense, errors = self.splitwise_obj.createExpense(splitwise_expense)
+        for friend_id, friend_share in zip(
+            expense_info.friend_ids, expense_info.user_shares[1:]
+        ):
+            friend = ExpenseUser()
+            friend.setId(friend_id)
+            friend.setPaidShare("0.0")
+            friend.setOwedShare(friend_share)
+            splitwise_expense.addUser(friend)
+        nExpense, errors = self.call_splitwise(
+            "createExpense", splitwise_expense
+        )
         if not errors:
-            print("\nExpense successfully added to Splitwise.\n")
+            self.record_expense(nExpense)
+            if not quiet:
+                print("\nExpense successfully added to Splitwise.\n")
+            return True
+        else:
+            if not quiet:
+                print(errors.getErrors())
+            return False
+
+    def upload_expense(self, job: UploadJob, quiet: bool = False) -> bool:
+        """
+        Upload an expense to the personal group or to another group,
+        depending on whether it is split with friends.
+
+        Args:
+            job (UploadJob): expense, expense info and total expense
+            amount.
+            quiet (bool): don't print the outcome, e.g. while the user is
+            answering prompts.
+
+        Returns:
+            bool: True if the expense was added to Splitwise.
+        """
+        from splitwise.exception import SplitwiseException
+
+        expense, expense_info, total_expense = job
+        try:
+            if expense_info.friend_ids:
+                return self.upload_expense_other_groups(
+                    expense, expense_info, total_expense, quiet
+                )
+            return self.upload_expense_personal_group(
+                expense, expense_info, total_expense, quiet
+            )
+        except SplitwiseException as error:
+            if not quiet:
+                print(f"\nExpense {expense.description} failed - {error}")
+            return False
+
+    def upload_batch(
+        self,
+        jobs: List[UploadJob],
+        mode: str = "sequential",
+        workers: int = 8,
+    ) -> List[UploadJob]:
+        """
+        Upload expenses whose info has already been collected, one after the
+        other (sequential), from a pool of threads (threaded) or as asyncio
+        tasks (async). The Splitwise client is blocking, so async tasks run
+        it in worker threads too, at most `workers` at a time.
+
+        Args:
+            jobs (List[UploadJob]): expense, expense info and total expense
+            amount of every expense.
+            mode (str): "sequential", "threaded" or "async".
+            workers (int): number of concurrent uploads.
+
+        Returns:
+            List[UploadJob]: jobs that could not be uploaded.
+        """
+        if mode == "sequential":
+            uploaded = [self.upload_expense(job) for job in jobs]
+        elif mode == "threaded":
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                uploaded = list(executor.map(self.upload_expense, jobs))
+        elif mode == "async":
+            uploaded = asyncio.run(self.upload_batch_async(jobs, workers))
         else:
-            print(errors.getErrors())
+            raise ValueError(f"Unknown upload mode {mode}.")
+
+        return [job for job, success in zip(jobs, uploaded) if not success]
+
+    async def upload_batch_async(
+        self, jobs: List[UploadJob], workers: int
+    ) -> List[bool]:
+        """
+        Upload expenses as asyncio tasks, at most `workers` at a time.
+
+        Args:
+            jobs (List[UploadJob]): expense, expense info and total expense
+            amount of every expense.
+            workers (int): number of concurrent uploads.
+
+        Returns:
+            List[bool]: whether each expense was added to Splitwise.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(workers)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            async def upload(job) -> bool:
+                async with semaphore:
+                    return await loop.run_in_executor(
+                        executor, self.upload_expense, job
+                    )
+
+            return await asyncio.gather(*[upload(job) for job in jobs])
@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    file_path TEXT,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_expenses (
+    session_id TEXT NOT NULL REFERENCES sessions (session_id),
+    expense_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    cost TEXT NOT NULL,
+    description TEXT NOT NULL,
+    group_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'created',
+    error TEXT,
+    PRIMARY KEY (session_id, expense_id)
+);
+CREATE INDEX IF NOT EXISTS session_expenses_status
+    ON session_expenses (session_id, status);
+"""
+
+# created: added to Splitwise by the session
+# deleted, updated: undone
+# failed: could not be undone, see the error
+STATUSES = ["created", "deleted", "updated", "failed"]
+
+
+def new_session_id() -> str:
+    """
+    Returns:
+        str: id of an upload session, sortable by start time, e.g.
+        20221220-130000-1a2b3c
+    """
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class UploadSessions:
+    def __init__(self, sessions_path: str) -> None:
+        """
+        SQLite log of the expenses created on Splitwise by each upload
+        session, so that a session can be undone.
+
+        Args:
+            sessions_path (str): path to the SQLite database
+        """
+        self.sessions_path: str = str(sessions_path)
+        self.lock = threading.Lock()
+        self.connection: sqlite3.Connection = None
+
+    def open(self) -> None:
+        """
+        Open the database, creating it if it doesn't exist.
+        """
+        sessions_dir = os.path.dirname(self.sessions_path)
+        if sessions_dir and not os.path.exists(sessions_dir):
+            os.makedirs(sessions_dir)
+        self.connection = sqlite3.connect(
+            self.sessions_path, timeout=30.0, check_same_thread=False
+        )
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def start(self, session_id: str, file_path: str) -> None:
+        """
+        Args:
+            session_id (str): id of the new session
+            file_path (str): csv file uploaded by the session
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO sessions VALUES (?, ?, ?)",
+                (
+                    session_id,
+                    None if file_path is None else str(file_path),
+                    time.time(),
+                ),
+            )
+
+    def add_expense(
+        self,
+        session_id: str,
+        expense_id: int,
+        date: str,
+        cost: str,
+        description: str,
+        group_id: int,
+    ) -> None:
+        """
+        Record an expense created by a session.
+
+        Args:
+            session_id (str): id of the session
+            expense_id (int): id of the expense on Splitwise
+            date (str): date of the expense
+            cost (str): cost of the expense
+            description (str): description of the expense
+            group_id (int): group of the expense
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                INSERT OR REPLACE INTO session_expenses
+                    (session_id, expense_id, date, cost, description,
+                    group_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (session_id, expense_id, date, cost, description, group_id),
+            )
+
+    def expenses(
+        self, session_id: str, statuses: List[str] = None
+    ) -> List[sqlite3.Row]:
+        """
+        Args:
+            session_id (str): id of the session
+            statuses (List[str]): only the expenses with these statuses, all
+            if None
+
+        Returns:
+            List[sqlite3.Row]: expenses of the session, in upload order
+        """
+        query = "SELECT * FROM session_expenses WHERE session_id = ?"
+        parameters: List = [session_id]
+        if statuses is not None:
+            query += f" AND status IN ({', '.join('?' * len(statuses))})"
+            parameters.extend(statuses)
+        with self.lock:
+            return self.connection.execute(
+                query + " ORDER BY rowid", parameters
+            ).fetchall()
+
+    def set_status(
+        self,
+        session_id: str,
+        expense_id: int,
+        status: str,
+        error: str = None,
+    ) -> None:
+        """
+        Args:
+            session_id (str): id of the session
+            expense_id (int): id of the expense on Splitwise
+            status (str): one of STATUSES
+            error (str): why the expense could not be undone
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE session_expenses SET status = ?, error = ?
+                WHERE session_id = ? AND expense_id = ?
+                """,
+                (status, error, session_id, expense_id),
+            )
+
+    def sessions(self, limit: int = 10) -> List[Dict]:
+        """
+        Args:
+            limit (int): number of sessions
+
+        Returns:
+            List[Dict]: id, file, start time and number of expenses by
+            status of the latest sessions, the latest first
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                """
+                SELECT sessions.session_id, file_path, started_at, status,
+                    COUNT(expense_id) AS count
+                FROM sessions LEFT JOIN session_expenses
+                    ON sessions.session_id = session_expenses.session_id
+                WHERE sessions.session_id IN (
+                    SELECT session_id FROM sessions
+                    ORDER BY started_at DESC LIMIT ?
+                )
+                GROUP BY sessions.session_id, status
+                ORDER BY started_at DESC
+                """,
+                (limit,),
+            ).fetchall()
+        sessions: Dict[str, Dict] = dict()
+        for row in rows:
+            session = sessions.setdefault(
+                row["session_id"],
+                {
+                    "session_id": row["session_id"],
+                    "file_path": row["file_path"],
+                    "started_at": row["started_at"],
+                    "expenses": dict.fromkeys(STATUSES, 0),
+                },
+            )
+            if row["status"] is not None:
+                session["expenses"][row["status"]] = row["count"]
+        return list(sessions.values())
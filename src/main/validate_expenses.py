@@ -0,0 +1,197 @@
+from itertools import islice
+from typing import Collection, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from src.main.records import Transaction
+
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# Position of the day, month and year digits and of the separators in the
+# accepted date formats, DD/MM/YYYY and YYYY-MM-DD.
+DATE_FORMATS: List[Tuple[List[int], List[int], str]] = [
+    ([0, 1, 3, 4, 6, 7, 8, 9], [2, 5], "/"),
+    ([8, 9, 5, 6, 0, 1, 2, 3], [4, 7], "-"),
+]
+
+
+def digits_to_int(digits: np.ndarray) -> np.ndarray:
+    """
+    Args:
+        digits (np.ndarray): one digit character per column
+
+    Returns:
+        np.ndarray: the number written by the digits of each row
+    """
+    number = np.zeros(len(digits), dtype=np.int64)
+    for column in range(digits.shape[1]):
+        number = number * 10 + digits[:, column].astype(np.int64)
+    return number
+
+
+def valid_dates(dates: Sequence[str]) -> np.ndarray:
+    """
+    Check that every date is a day of the calendar written as DD/MM/YYYY or
+    YYYY-MM-DD.
+
+    Args:
+        dates (Sequence[str]): dates of the expenses
+
+    Returns:
+        np.ndarray: whether each date is valid
+    """
+    dates = np.asarray(dates, dtype=str)
+    valid = np.zeros(len(dates), dtype=bool)
+    if not len(dates):
+        return valid
+    # Every date of the accepted formats has 10 characters, one column each.
+    sized = np.char.str_len(dates) == 10
+    characters = np.where(sized, dates, "0000000000").astype("U10")
+    characters = characters.view("U1").reshape(-1, 10)
+
+    for digit_positions, separators, separator in DATE_FORMATS:
+        # Day, month and year digits.
+        digit_columns = characters[:, digit_positions]
+        matches = (
+            sized
+            & np.char.isdigit(digit_columns).all(axis=1)
+            & (characters[:, separators] == separator).all(axis=1)
+        )
+        digit_columns = np.where(matches[:, None], digit_columns, "1")
+        days = digits_to_int(digit_columns[:, 0:2])
+        months = digits_to_int(digit_columns[:, 2:4])
+        years = digits_to_int(digit_columns[:, 4:8])
+
+        leap_years = (years % 4 == 0) & (
+            (years % 100 != 0) | (years % 400 == 0)
+        )
+        month_index = np.clip(months - 1, 0, 11)
+        month_days = DAYS_IN_MONTH[month_index] + (leap_years & (months == 2))
+        valid |= (
+            matches
+            & (months >= 1)
+            & (months <= 12)
+            & (days >= 1)
+            & (days <= month_days)
+        )
+    return valid
+
+
+def parse_amounts(amounts: Sequence[str]) -> np.ndarray:
+    """
+    Args:
+        amounts (Sequence[str]): amounts of the expenses
+
+    Returns:
+        np.ndarray: amounts as floats, nan where an amount is not a number
+    """
+    amounts = np.char.strip(np.asarray(amounts, dtype=str))
+    try:
+        return amounts.astype(np.float64)
+    except ValueError:
+        # Only files with a bad amount are parsed one value at a time, to
+        # find them.
+        parsed = np.full(len(amounts), np.nan)
+        for index, amount in enumerate(amounts):
+            try:
+                parsed[index] = float(amount)
+            except ValueError:
+                pass
+        return parsed
+
+
+def validate_transactions(
+    transactions: Sequence[Transaction], currency_codes: Collection[str]
+) -> Dict[int, List[str]]:
+    """
+    Check every expense of a clean csv file at once, column by column,
+    before anything is asked or uploaded: amounts must be positive numbers,
+    dates days of the calendar, descriptions not empty and currencies known
+    to Splitwise.
+
+    Args:
+        transactions (Sequence[Transaction]): expenses of the file
+        currency_codes (Collection[str]): currency codes of Splitwise, not
+        checked if empty
+
+    Returns:
+        Dict[int, List[str]]: problems of each invalid expense by row number
+        (1-based)
+    """
+    problems: Dict[int, List[str]] = dict()
+    if not transactions:
+        return problems
+    # The merchants aren't checked.
+    dates, amounts, descriptions, currencies = (
+        np.asarray(column, dtype=str)
+        for column in islice(zip(*transactions), 4)
+    )
+
+    # Expenses are uploaded rounded to cents.
+    parsed_amounts = np.round(parse_amounts(amounts), 2)
+    checks = [
+        (
+            ~(np.isfinite(parsed_amounts) & (parsed_amounts > 0)),
+            amounts,
+            "amount {} is not a positive number",
+        ),
+        (
+            ~valid_dates(dates),
+            dates,
+            "date {} is not a valid DD/MM/YYYY or YYYY-MM-DD date",
+        ),
+        (
+            np.char.str_len(np.char.strip(descriptions)) == 0,
+            descriptions,
+            "description is empty",
+        ),
+    ]
+    if currency_codes:
+        checks.append(
+            (
+                ~np.isin(currencies, list(currency_codes)),
+                currencies,
+                "currency {} is not supported by Splitwise",
+            )
+        )
+
+    for invalid, values, message in checks:
+        for index in np.flatnonzero(invalid):
+            problems.setdefault(int(index) + 1, []).append(
+                message.format(repr(str(values[index])))
+            )
+    return dict(sorted(problems.items()))
+
+
+def validate_chunks(
+    transactions: Iterable[Transaction],
+    currency_codes: Collection[str],
+    chunk_size: int = 10_000,
+) -> Tuple[int, Dict[int, List[str]]]:
+    """
+    Check the expenses of a clean csv file chunk_size rows at a time, so only
+    one chunk and the problems found are held in memory.
+
+    Args:
+        transactions (Iterable[Transaction]): expenses of the file, e.g.
+        streamed from the csv file
+        currency_codes (Collection[str]): currency codes of Splitwise, not
+        checked if empty
+        chunk_size (int): number of expenses checked at a time
+
+    Returns:
+        Tuple[int, Dict[int, List[str]]]: number of expenses and problems of
+        each invalid expense by row number (1-based)
+    """
+    count: int = 0
+    problems: Dict[int, List[str]] = dict()
+    transactions = iter(transactions)
+    while True:
+        chunk = list(islice(transactions, chunk_size))
+        if not chunk:
+            return count, problems
+        for row_number, row_problems in validate_transactions(
+            chunk, currency_codes
+        ).items():
+            problems[count + row_number] = row_problems
+        count += len(chunk)
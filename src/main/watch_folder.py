@@ -0,0 +1,299 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Set, Tuple
+
+from src.main.compressed_files import COMPRESSED_EXTENSIONS
+from src.main.metrics import write_atomically
+
+# Statements can be dropped as csv files, compressed or not, or zip files.
+STATEMENT_EXTENSIONS: Tuple[str, ...] = tuple(
+    [".csv", ".zip"]
+    + [f".csv{extension}" for extension in COMPRESSED_EXTENSIONS]
+)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+
+class Inotify:
+    def __init__(self, directory: str) -> None:
+        """
+        Wake up when a file is written or moved into a directory (Linux).
+
+        Args:
+            directory (str): watched directory
+
+        Raises:
+            OSError: if inotify is not available
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        try:
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except AttributeError:
+            raise OSError("inotify is not available on this system.")
+
+        self.fd: int = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        watch = add_watch(
+            self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if watch < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Can't watch {directory}")
+
+    def wait(self, timeout: float) -> None:
+        """
+        Wait until a file is written or moved into the directory, or until
+        the timeout. The events are discarded, the directory is scanned
+        instead.
+
+        Args:
+            timeout (float): seconds to wait at most
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class InboxWatcher:
+    def __init__(
+        self,
+        inbox_dir: str,
+        clean: Callable[[str], str],
+        upload: Callable[[str], bool] = None,
+        state_path: str = None,
+        debounce: float = 2.0,
+        poll_interval: float = 1.0,
+        workers: int = 2,
+        use_inotify: bool = True,
+    ) -> None:
+        """
+        Clean and upload the statements dropped into an inbox directory.
+
+        Args:
+            inbox_dir (str): watched directory
+            clean (Callable[[str], str]): cleans a raw csv file without
+            prompts and returns the path to the clean csv file, or None if it
+            can't be cleaned without prompts yet, it is then tried again
+            upload (Callable[[str], bool]): uploads a clean csv file and
+            returns whether every expense was uploaded, files are only
+            cleaned if None
+            state_path (str): json file of the processed files, so that they
+            aren't processed again after a restart
+            debounce (float): seconds a file must stay unchanged before it is
+            processed
+            poll_interval (float): seconds between scans of the directory
+            without inotify events
+            workers (int): files processed at the same time
+            use_inotify (bool): wake up on inotify events instead of only
+            polling, where available
+        """
+        self.inbox_dir = inbox_dir
+        self.clean = clean
+        self.upload = upload
+        self.state_path = state_path
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.use_inotify = use_inotify
+        self.lock = threading.Lock()
+        self.state: Dict[str, Dict[str, str]] = dict()
+        # Size and modification time of the files not yet processed, and
+        # when they were last seen changing.
+        self.pending: Dict[str, Tuple[Tuple[int, int], float]] = dict()
+        self.in_progress: Set[str] = set()
+        # Files without stored answers are not recorded, so they are cleaned
+        # once answers are stored for their bank. The user is told once.
+        self.without_profile: Set[str] = set()
+
+    def load_state(self) -> None:
+        """
+        Load the processed files from the state file, if it exists.
+        """
+        if self.state_path is not None and os.path.exists(self.state_path):
+            with open(self.state_path, "r") as state_file:
+                self.state = json.load(state_file)
+
+    def set_status(self, key: str, status: str, **details: str) -> None:
+        """
+        Record the status of a file and save the state file.
+
+        Args:
+            key (str): file key
+            status (str): new status
+            **details (str): e.g. the path to the clean csv file or an error
+        """
+        with self.lock:
+            entry = self.state.setdefault(key, dict())
+            entry.update(details, status=status)
+            if self.state_path is not None:
+                write_atomically(
+                    self.state_path, json.dumps(self.state, indent=2)
+                )
+
+    def ready_files(self, now: float) -> List[Tuple[str, str]]:
+        """
+        Scan the inbox for statements (csv files, compressed or not, or zip
+        files) that haven't changed for the debounce time and haven't been
+        processed yet.
+
+        Args:
+            now (float): current time.monotonic()
+
+        Returns:
+            List[Tuple[str, str]]: path and key of the files to process
+        """
+        ready: List[Tuple[str, str]] = list()
+        seen: Set[str] = set()
+        for entry in os.scandir(self.inbox_dir):
+            name = entry.name
+            if (
+                name.startswith(".")
+                or not name.lower().endswith(STATEMENT_EXTENSIONS)
+                or not entry.is_file()
+            ):
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            # A file replaced by a new statement of the same name gets a new
+            # key and is processed again.
+            key = f"{name}:{stat.st_size}:{stat.st_mtime_ns}"
+            seen.add(entry.path)
+            if key in self.state or key in self.in_progress:
+                continue
+
+            previous = self.pending.get(entry.path)
+            if previous is None or previous[0] != signature:
+                self.pending[entry.path] = (signature, now)
+            elif now - previous[1] >= self.debounce:
+                del self.pending[entry.path]
+                self.in_progress.add(key)
+                ready.append((entry.path, key))
+
+        for path in set(self.pending) - seen:
+            del self.pending[path]
+        return ready
+
+    def process(self, file_path: str, key: str) -> None:
+        """
+        Clean a raw csv file and upload it.
+
+        Args:
+            file_path (str): path to the raw csv file
+            key (str): file key
+        """
+        try:
+            clean_path = self.clean(file_path)
+            if clean_path is None:
+                with self.lock:
+                    first_try = key not in self.without_profile
+                    self.without_profile.add(key)
+                if first_try:
+                    print(
+                        (
+                            f"\nNo answers are stored for the columns of "
+                            f"{file_path}. Clean one file of this bank with "
+                            "run_clean_csv.py, it will then be processed."
+                        )
+                    )
+            elif self.upload is None:
+                self.set_status(key, "cleaned", clean_path=clean_path)
+            else:
+                self.set_status(key, "to_upload", clean_path=clean_path)
+                self.upload_clean_file(key, clean_path)
+        except Exception as error:
+            print(f"\n{file_path} could not be processed - {error}")
+            self.set_status(key, "failed", error=str(error))
+        finally:
+            with self.lock:
+                self.in_progress.discard(key)
+
+    def upload_clean_file(self, key: str, clean_path: str) -> None:
+        """
+        Args:
+            key (str): file key
+            clean_path (str): path to the clean csv file
+        """
+        self.set_status(key, "uploading")
+        if self.upload(clean_path):
+            self.set_status(key, "uploaded")
+        else:
+            self.set_status(key, "failed", error="Not every expense uploaded.")
+
+    def resume(self) -> List[Tuple[str, str]]:
+        """
+        Find the files cleaned but not uploaded before a restart. Files whose
+        upload was interrupted are not uploaded again, since some of their
+        expenses may already be on Splitwise.
+
+        Returns:
+            List[Tuple[str, str]]: key and clean csv path of the files to
+            upload
+        """
+        to_upload: List[Tuple[str, str]] = list()
+        for key, entry in list(self.state.items()):
+            if entry["status"] == "uploading":
+                print(
+                    (
+                        f"\nThe upload of {entry['clean_path']} was "
+                        "interrupted. Check Splitwise before uploading it "
+                        "again."
+                    )
+                )
+                self.set_status(key, "interrupted")
+            elif entry["status"] == "to_upload" and self.upload is not None:
+                to_upload.append((key, entry["clean_path"]))
+        return to_upload
+
+    def run(self, stop_event: threading.Event = None) -> None:
+        """
+        Watch the inbox until the stop event is set.
+
+        Args:
+            stop_event (threading.Event): stops the watcher when set
+        """
+        if stop_event is None:
+            stop_event = threading.Event()
+        self.load_state()
+
+        inotify: Inotify = None
+        if self.use_inotify:
+            try:
+                inotify = Inotify(self.inbox_dir)
+            except OSError as error:
+                print(f"\nPolling {self.inbox_dir} - {error}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for key, clean_path in self.resume():
+                    executor.submit(self.upload_clean_file, key, clean_path)
+
+                while not stop_event.is_set():
+                    for file_path, key in self.ready_files(time.monotonic()):
+                        executor.submit(self.process, file_path, key)
+
+                    timeout = self.poll_interval
+                    if self.pending:
+                        timeout = min(timeout, self.debounce)
+                    if inotify is not None:
+                        inotify.wait(timeout)
+                    else:
+                        stop_event.wait(timeout)
+        finally:
+            if inotify is not None:
+                inotify.close()
@@ -0,0 +1,76 @@
+import argparse
+
+from src.main.benchmark import UPLOAD_MODES, UploadBenchmark
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--expenses",
+        type=int,
+        default=10000,
+        help="number of expenses uploaded in every mode",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=UPLOAD_MODES,
+        default=UPLOAD_MODES,
+        help="upload modes to measure",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="concurrent uploads of the threaded and async modes",
+    )
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="url of a fake server started with run_fake_splitwise.py, "
+        "a server is started in this process if not given",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="seconds added to every response",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="share (0-1) of requests answered with a server error",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=None,
+        help="requests per second before answering with a 429",
+    )
+    parser.add_argument(
+        "--startup-runs",
+        type=int,
+        default=5,
+        help="number of times a csv file is checked offline in a new process",
+    )
+    parser.add_argument(
+        "--client-rate-limit",
+        type=float,
+        default=None,
+        help="requests per second the uploads limit themselves to",
+    )
+    args = parser.parse_args()
+
+    benchmark = UploadBenchmark(
+        total_expenses=args.expenses,
+        modes=args.modes,
+        workers=args.workers,
+        base_url=args.url,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        startup_runs=args.startup_runs,
+        client_rate_limit=args.client_rate_limit,
+    )
+    benchmark.print_report(benchmark.run())
@@ -1,18 +1,76 @@
 import argparse
 from pathlib import Path
 
-from src.main.clean_csv import CleanCsv
+from src.main.clean_csv import CleanCsv, CleaningProfiles, choose_member
+from src.main.compressed_files import COMPRESSED_EXTENSIONS
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("file_path")
+    parser.add_argument(
+        "file_path",
+        help="raw csv file, which can be a gz, bz2, xz or zip file",
+    )
+    parser.add_argument(
+        "--member",
+        default=None,
+        help="csv file to clean inside a zip file, asked for if the zip file "
+        "holds many csv files",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=sorted(COMPRESSED_EXTENSIONS.values()),
+        default=None,
+        help="compress the clean csv file",
+    )
+    parser.add_argument(
+        "--profiles",
+        default="src/data/cleaning_profiles.json",
+        help="json file storing the answers given for each column layout, "
+        "files with stored answers are cleaned without prompts",
+    )
+    parser.add_argument(
+        "--ask",
+        action="store_true",
+        help="answer the questions again instead of using the stored "
+        "answers, which are then replaced",
+    )
+    parser.add_argument(
+        "--state",
+        default=None,
+        help="SQLite database tracking each row from cleaning to upload",
+    )
     args = parser.parse_args()
     file_path = Path(args.file_path)
 
     if file_path.exists():
-        clean_csv_file = CleanCsv(file_path)
+        member = args.member
+        if member is None:
+            member = choose_member(file_path)
+        profiles = CleaningProfiles(args.profiles)
+        profiles.load()
+        answers = None if args.ask else profiles.find(file_path, member)
+        if answers is not None:
+            print(
+                (
+                    f"Using the answers stored for these columns in "
+                    f"{args.profiles}, pass --ask to answer again.\n"
+                )
+            )
+            for question, answer in answers.items():
+                print(f"{question}: {answer}")
+            print()
+        clean_csv_file = CleanCsv(
+            file_path,
+            answers,
+            state_path=args.state,
+            member=member,
+            compression=args.compress,
+        )
         clean_csv_file.run_pipeline()
+        if answers is None:
+            profiles.add(file_path, clean_csv_file.answers, member)
+            profiles.save()
     else:
         print(
             (
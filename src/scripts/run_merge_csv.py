@@ -0,0 +1,47 @@
+import argparse
+from pathlib import Path
+
+from src.main.merge_csv import merge_clean_csvs, write_clean_csv
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "file_paths", nargs="+", help="clean csv files to merge by date"
+    )
+    parser.add_argument(
+        "--output",
+        default="src/data/clean/merged_clean.csv",
+        help="clean csv file of the merged expenses",
+    )
+    parser.add_argument(
+        "--drop-duplicates",
+        action="store_true",
+        help="skip expenses already in another file, e.g. when statements "
+        "overlap",
+    )
+    args = parser.parse_args()
+    missing_paths = [
+        file_path
+        for file_path in args.file_paths
+        if not Path(file_path).exists()
+    ]
+
+    if not missing_paths:
+        count = write_clean_csv(
+            merge_clean_csvs(args.file_paths, args.drop_duplicates),
+            args.output,
+        )
+        print(
+            (
+                f"{count} expenses of {len(args.file_paths)} files have been "
+                f"merged and saved to {args.output}."
+            )
+        )
+    else:
+        print(
+            (
+                "The given filepath is incorrect. Please check if this "
+                f"filepath exists - {', '.join(missing_paths)}"
+            )
+        )
@@ -0,0 +1,57 @@
+import argparse
+from pathlib import Path
+
+from src.main.spending_report import (
+    REPORT_COLUMNS,
+    spending_report,
+    write_report,
+)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "file_paths", nargs="+", help="clean csv files to report on"
+    )
+    parser.add_argument(
+        "--output",
+        default="src/data/reports/spending_report.csv",
+        help="report file, json if it ends with .json, ; separated csv "
+        "otherwise",
+    )
+    parser.add_argument(
+        "--by",
+        nargs="+",
+        choices=REPORT_COLUMNS,
+        default=REPORT_COLUMNS,
+        help="columns to group the expenses by",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1_000_000,
+        help="number of rows read at a time",
+    )
+    args = parser.parse_args()
+    missing_paths = [
+        file_path
+        for file_path in args.file_paths
+        if not Path(file_path).exists()
+    ]
+
+    if not missing_paths:
+        report = spending_report(args.file_paths, args.by, args.chunk_size)
+        write_report(report, args.output)
+        print(
+            (
+                f"{int(report['count'].sum())} expenses in {len(report)} "
+                f"groups have been saved to {args.output}."
+            )
+        )
+    else:
+        print(
+            (
+                "The given filepath is incorrect. Please check if this "
+                f"filepath exists - {', '.join(missing_paths)}"
+            )
+        )
@@ -0,0 +1,71 @@
+import argparse
+import sys
+from pathlib import Path
+from urllib.error import URLError
+
+from src.main.upload_daemon import submit_job
+from src.main.upload_expenses import UPLOAD_MODES
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file_path")
+    parser.add_argument(
+        "--decisions",
+        default=None,
+        help="csv file of decisions (row or pattern), the decision columns "
+        "of the csv are used if not given",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=UPLOAD_MODES,
+        default=None,
+        help="how expenses are uploaded, the daemon's mode if not given",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="concurrent uploads, the daemon's if not given",
+    )
+    parser.add_argument(
+        "--url",
+        default="http://127.0.0.1:8765/",
+        help="url of the upload daemon",
+    )
+    args = parser.parse_args()
+    file_path = Path(args.file_path)
+
+    if not file_path.exists():
+        print(
+            (
+                "The given filepath is incorrect. Please check if this "
+                f"filepath exists - {file_path}"
+            )
+        )
+        sys.exit(1)
+
+    try:
+        status, result = submit_job(
+            args.url, file_path, args.decisions, args.mode, args.workers
+        )
+    except URLError as error:
+        print(f"The upload daemon at {args.url} can't be reached - {error}")
+        sys.exit(1)
+
+    if status != 200:
+        print(result["error"])
+        sys.exit(1)
+    if result["errors"]:
+        print("\nThe decisions file could not be validated.\n")
+        for error in result["errors"]:
+            print(error)
+        print("\nNo expenses have been uploaded.")
+        sys.exit(1)
+    print(f"\n{result['uploaded']} of {result['expenses']} expenses uploaded.")
+    print(f"Upload session {result['session_id']}.")
+    if result["failed"]:
+        print(f"\n{len(result['failed'])} expenses could not be uploaded:")
+        for expense in result["failed"]:
+            print(expense)
+        sys.exit(1)
@@ -0,0 +1,147 @@
+import argparse
+import sys
+from datetime import datetime
+
+from src.main.undo_session import UndoSession
+from src.main.upload_expenses import UploadExpense
+from src.main.upload_sessions import UploadSessions
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "session_id",
+        nargs="?",
+        help="upload session to undo, the latest sessions are listed if "
+        "omitted",
+    )
+    parser.add_argument(
+        "--sessions",
+        default="src/data/upload_sessions.sqlite",
+        help="SQLite database of the expenses created by each upload session",
+    )
+    parser.add_argument(
+        "--group",
+        default=None,
+        help="move the expenses to this group instead of deleting them",
+    )
+    parser.add_argument(
+        "--category",
+        default=None,
+        help="category of --sub-category",
+    )
+    parser.add_argument(
+        "--sub-category",
+        default=None,
+        help="move the expenses to this sub-category instead of deleting "
+        "them",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="concurrent requests to Splitwise",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=10.0,
+        help="maximum requests per second to Splitwise, shared by every "
+        "process using the same account",
+    )
+    parser.add_argument(
+        "--rate-limit-file",
+        default="src/data/rate_limit.json",
+        help="json file of the request rate shared by the processes using "
+        "the same account",
+    )
+    args = parser.parse_args()
+
+    upload_sessions = UploadSessions(args.sessions)
+    upload_sessions.open()
+
+    if args.session_id is None:
+        print("Latest upload sessions:\n")
+        for session in upload_sessions.sessions():
+            started_at = datetime.fromtimestamp(session["started_at"])
+            counts = ", ".join(
+                f"{count} {status}"
+                for status, count in session["expenses"].items()
+                if count
+            )
+            print(
+                f"{session['session_id']}  {started_at:%Y-%m-%d %H:%M}  "
+                f"{session['file_path']}  {counts or 'no expenses'}"
+            )
+        sys.exit(0)
+
+    if (args.category is None) != (args.sub_category is None):
+        print("Pass both --category and --sub-category.")
+        sys.exit(1)
+
+    upload_expense = UploadExpense(
+        None,
+        rate_limit_path=args.rate_limit_file,
+        rate_limit=args.rate_limit,
+    )
+    undo_session = UndoSession(
+        upload_expense, upload_sessions, args.session_id, args.workers
+    )
+    expense_ids = undo_session.expense_ids()
+    if not expense_ids:
+        print(f"Session {args.session_id} has no expenses left to undo.")
+        sys.exit(0)
+
+    group_id = None
+    sub_category = None
+    if args.group is not None:
+        _, _, user_groups, _ = upload_expense.get_user_info()
+        group_id = next(
+            (
+                group_id
+                for group_id, group_name in user_groups.items()
+                if group_name.lower() == args.group.lower()
+            ),
+            None,
+        )
+        if group_id is None:
+            print(f"There is no group {args.group}.")
+            sys.exit(1)
+    if args.sub_category is not None:
+        (
+            _,
+            all_sub_categories,
+        ) = upload_expense.get_categories_and_sub_categories()
+        sub_category = all_sub_categories.get(args.category, {}).get(
+            args.sub_category
+        )
+        if sub_category is None:
+            print(f"There is no sub-category {args.sub_category}.")
+            sys.exit(1)
+
+    action = "update"
+    if group_id is None and sub_category is None:
+        action = "delete"
+    user_input = input(
+        (
+            f"\nPress Enter to {action} the {len(expense_ids)} expenses of "
+            f"session {args.session_id} on Splitwise or press any other key "
+            "to cancel - "
+        )
+    )
+    if user_input != "":
+        sys.exit(0)
+
+    errors = undo_session.run(group_id, sub_category)
+    print(
+        (
+            f"\n{len(expense_ids) - len(errors)} of {len(expense_ids)} "
+            f"expenses have been {action}d and checked on Splitwise."
+        )
+    )
+    if errors:
+        print(f"\n{len(errors)} expenses could not be {action}d:")
+        for expense_id, error in errors.items():
+            print(f"{expense_id}: {error}")
+        print("\nRun the same command again to retry them.")
+        sys.exit(1)
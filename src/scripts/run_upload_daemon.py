@@ -0,0 +1,76 @@
+import argparse
+
+from src.main.upload_daemon import UploadDaemon
+from src.main.upload_expenses import UPLOAD_MODES
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--mode",
+        choices=UPLOAD_MODES,
+        default="threaded",
+        help="how expenses are uploaded unless a job asks otherwise",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="concurrent uploads unless a job asks otherwise",
+    )
+    parser.add_argument(
+        "--metadata-ttl",
+        type=float,
+        default=3600.0,
+        help="seconds before groups, friends and categories are fetched "
+        "again",
+    )
+    parser.add_argument(
+        "--metrics",
+        default="src/data/upload_metrics.json",
+        help="json file the metrics are saved to after every job",
+    )
+    parser.add_argument(
+        "--prometheus",
+        default=None,
+        help="Prometheus textfile (.prom) the metrics are saved to after "
+        "every job",
+    )
+    parser.add_argument(
+        "--sessions",
+        default="src/data/upload_sessions.sqlite",
+        help="SQLite database of the expenses created by each job, used to "
+        "undo a job",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=10.0,
+        help="maximum requests per second to Splitwise, shared by every "
+        "process using the same account",
+    )
+    parser.add_argument(
+        "--rate-limit-file",
+        default="src/data/rate_limit.json",
+        help="json file of the request rate shared by the processes using "
+        "the same account",
+    )
+    args = parser.parse_args()
+
+    daemon = UploadDaemon(
+        port=args.port,
+        upload_mode=args.mode,
+        workers=args.workers,
+        metadata_ttl=args.metadata_ttl,
+        metrics_path=args.metrics,
+        prometheus_path=args.prometheus,
+        sessions_path=args.sessions,
+        rate_limit_path=args.rate_limit_file,
+        rate_limit=args.rate_limit,
+    )
+    print(f"Upload daemon listening on {daemon.base_url}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.httpd.server_close()
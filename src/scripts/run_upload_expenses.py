@@ -1,22 +1,170 @@
 import argparse
+import sys
 from pathlib import Path
 
-from src.main.upload_expenses import UploadExpense
+from src.main.upload_expenses import UPLOAD_MODES, UploadExpense
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("file_path")
+    parser.add_argument(
+        "file_path",
+        nargs="+",
+        help="clean csv file, or many clean csv files uploaded as one in "
+        "chronological order",
+    )
+    parser.add_argument(
+        "--rules",
+        default=None,
+        help="csv file (merchant;category;sub_category) of merchant rules",
+    )
+    parser.add_argument(
+        "--index",
+        default=None,
+        help="json file used to learn from past expenses on Splitwise",
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help="SQLite database mirroring your expenses on Splitwise",
+    )
+    parser.add_argument(
+        "--state",
+        default=None,
+        help="SQLite database tracking each row from cleaning to upload, "
+        "rows already uploaded are skipped",
+    )
+    parser.add_argument(
+        "--sessions",
+        default="src/data/upload_sessions.sqlite",
+        help="SQLite database of the expenses created by each upload "
+        "session, used to undo a session",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.8,
+        help="minimum confidence (0-1) to use a learned prediction",
+    )
+    parser.add_argument(
+        "--recent",
+        default="src/data/recent_choices.json",
+        help="json file storing recently chosen categories, groups and "
+        "friends",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="upload without prompts using the decision columns of the csv",
+    )
+    parser.add_argument(
+        "--decisions",
+        default=None,
+        help="csv file of decisions (row or pattern) to upload without "
+        "prompts",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=UPLOAD_MODES,
+        default="sequential",
+        help="how expenses are uploaded without prompts",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="concurrent uploads of the threaded and async modes and of "
+        "personal expenses marked in bulk",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="upload each confirmed expense in the background while the next "
+        "one is shown",
+    )
+    parser.add_argument(
+        "--metrics",
+        default="src/data/upload_metrics.json",
+        help="json file summarizing Splitwise latency, errors and retries "
+        "and time spent on prompts",
+    )
+    parser.add_argument(
+        "--prometheus",
+        default=None,
+        help="Prometheus textfile (.prom) to export the same metrics to",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only check the expenses of the csv file, without connecting "
+        "to Splitwise",
+    )
+    parser.add_argument(
+        "--dry-run",
+        default=None,
+        help="json file to save the expenses to instead of uploading them",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=10.0,
+        help="maximum requests per second to Splitwise, shared by every "
+        "process using the same account",
+    )
+    parser.add_argument(
+        "--rate-limit-file",
+        default="src/data/rate_limit.json",
+        help="json file of the request rate shared by the processes using "
+        "the same account",
+    )
+    parser.add_argument(
+        "--drop-duplicates",
+        action="store_true",
+        help="with many csv files, skip expenses already in another file",
+    )
+    parser.add_argument(
+        "--retry-interrupted",
+        action="store_true",
+        help="with --state, upload again the expenses of a worker that "
+        "stopped, once you have checked they are not on Splitwise",
+    )
     args = parser.parse_args()
-    file_path = Path(args.file_path)
+    file_paths = [Path(file_path) for file_path in args.file_path]
+    missing_paths = [
+        str(file_path) for file_path in file_paths if not file_path.exists()
+    ]
 
-    if file_path.exists():
-        upload_expense_file = UploadExpense(file_path)
-        upload_expense_file.run_pipeline()
+    if not missing_paths:
+        file_path = file_paths[0] if len(file_paths) == 1 else file_paths
+        upload_expense_file = UploadExpense(
+            file_path,
+            rules_path=args.rules,
+            index_path=args.index,
+            confidence_threshold=args.confidence,
+            recent_path=args.recent,
+            metrics_path=args.metrics,
+            prometheus_path=args.prometheus,
+            store_path=args.store,
+            state_path=args.state,
+            sessions_path=args.sessions,
+            dry_run_path=args.dry_run,
+            rate_limit_path=args.rate_limit_file,
+            rate_limit=args.rate_limit,
+            drop_duplicates=args.drop_duplicates,
+            retry_interrupted=args.retry_interrupted,
+        )
+        if args.check:
+            sys.exit(0 if upload_expense_file.run_check() else 1)
+        if args.headless or args.decisions is not None:
+            upload_expense_file.run_headless(
+                args.decisions, args.mode, args.workers
+            )
+        else:
+            upload_expense_file.run_pipeline(args.workers, args.pipelined)
     else:
         print(
             (
                 "The given filepath is incorrect. Please check if this "
-                f"filepath exists - {file_path}"
+                f"filepath exists - {', '.join(missing_paths)}"
             )
         )
@@ -0,0 +1,90 @@
+import argparse
+import os
+
+from src.main.clean_csv import CleaningProfiles
+from src.main.upload_daemon import submit_job
+from src.main.watch_folder import InboxWatcher
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--inbox",
+        default="src/data/raw",
+        help="directory the raw csv statements are dropped into",
+    )
+    parser.add_argument(
+        "--profiles",
+        default="src/data/cleaning_profiles.json",
+        help="json file of the answers stored by run_clean_csv.py",
+    )
+    parser.add_argument(
+        "--state",
+        default="src/data/watch_state.json",
+        help="json file of the processed statements",
+    )
+    parser.add_argument(
+        "--decisions",
+        default=None,
+        help="csv file of decisions (row or pattern) used to upload every "
+        "statement, statements are only cleaned if not given",
+    )
+    parser.add_argument(
+        "--url",
+        default="http://127.0.0.1:8765/",
+        help="url of the upload daemon",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        help="seconds a statement must stay unchanged before it is processed",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="statements processed at the same time",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="poll the inbox instead of using inotify",
+    )
+    args = parser.parse_args()
+
+    def clean(file_path: str) -> str:
+        # Statements are cleaned by several threads, each loads its own copy
+        # of the profiles to pick up answers stored since the watcher
+        # started.
+        profiles = CleaningProfiles(args.profiles)
+        profiles.load()
+        return profiles.clean(file_path)
+
+    def upload(clean_path: str) -> bool:
+        status, result = submit_job(args.url, clean_path, args.decisions)
+        if status != 200:
+            print(f"\n{clean_path} - {result['error']}")
+            return False
+        for error in result["errors"]:
+            print(f"\n{clean_path} - {error}")
+        for expense in result["failed"]:
+            print(f"\n{clean_path} - {expense} could not be uploaded.")
+        return not result["errors"] and not result["failed"]
+
+    if not os.path.exists(args.inbox):
+        os.makedirs(args.inbox)
+    watcher = InboxWatcher(
+        args.inbox,
+        clean,
+        upload if args.decisions is not None else None,
+        state_path=args.state,
+        debounce=args.debounce,
+        workers=args.workers,
+        use_inotify=not args.poll,
+    )
+    print(f"Watching {args.inbox} for statements.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
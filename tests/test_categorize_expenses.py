@@ -0,0 +1,105 @@
+import pytest
+
+from src.main.categorize_expenses import CategorizeExpense
+
+
+@pytest.fixture
+def sub_categories():
+    """
+    Returns a dictionary of dictionaries of sub-category names and their
+    Splitwise objects for each category.
+    """
+    return {
+        "Utilities": {
+            "Cleaning": "<splitwise.category.Category object at 0x104bfb940>",
+        },
+        "Entertainment": {
+            "Games": "<splitwise.category.Category object at 0x104bfb850>",
+        },
+        "Food and drink": {
+            "Dining out": "<splitwise.category.Category object at 0x104bfb9a>",
+            "Groceries": "<splitwise.category.Category object at 0x104bfba90>",
+        },
+    }
+
+
+@pytest.fixture
+def categorize_expense_class(sub_categories):
+    """
+    Returns a CategorizeExpense class instance with compiled test rules.
+    """
+    categorizer = CategorizeExpense("tests/data/rules/test_merchant_rules.csv")
+    categorizer.compile_rules(sub_categories)
+    return categorizer
+
+
+def test_compile_rules_skips_unknown_sub_category(categorize_expense_class):
+    assert [rule[0] for rule in categorize_expense_class.rules] == [
+        "La Piola Pizza",
+        "Colruyt Test",
+        "Colruyt",
+    ]
+
+
+@pytest.mark.parametrize(
+    "description, expected_result",
+    [
+        (
+            "Colruyt",
+            (
+                "Groceries",
+                "<splitwise.category.Category object at 0x104bfba90>",
+            ),
+        ),
+        (
+            "COLRUYT LAEKEN 1020",
+            (
+                "Groceries",
+                "<splitwise.category.Category object at 0x104bfba90>",
+            ),
+        ),
+        (
+            "Colruyt Test",
+            (
+                "Cleaning",
+                "<splitwise.category.Category object at 0x104bfb940>",
+            ),
+        ),
+        (
+            "la piola pizza",
+            (
+                "Dining out",
+                "<splitwise.category.Category object at 0x104bfb9a>",
+            ),
+        ),
+        ("Colruyts", None),
+        ("Netflix", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_match(categorize_expense_class, description, expected_result):
+    assert categorize_expense_class.match(description) == expected_result
+
+
+@pytest.mark.parametrize(
+    "description, merchant, expected_result",
+    [
+        # The store number stuck to the merchant is only removed from the
+        # merchant key.
+        ("COLRUYT1020", "colruyt", "Groceries"),
+        ("COLRUYT1020", None, None),
+        # Rules with punctuation still match the description.
+        ("Colruyt Test", "colruyt test", "Cleaning"),
+        ("La Piola Pizza", "", "Dining out"),
+    ],
+)
+def test_match_merchant(
+    categorize_expense_class, description, merchant, expected_result
+):
+    matched_sub_category = categorize_expense_class.match(
+        description, merchant
+    )
+    assert (
+        None if matched_sub_category is None else matched_sub_category[0]
+    ) == expected_result
@@ -1,29 +1,242 @@
-# from typing import Dict, List
+import bz2
+import csv
+import gzip
+import lzma
+import zipfile
 
-# from src.main import clean_csv
+import pytest
 
-# test_class = clean_csv.CleanCsv("./tests/data/raw/test_data_raw.csv")
-# raw_headers: List[str] = [
-#     "Statement",
-#     "Date",
-#     "Value date",
-#     "Account",
-#     "Description",
-#     "Amount",
-#     "Currency",
-# ]
+from src.main.clean_csv import CleanCsv, CleaningProfiles, choose_member
+from src.main.compressed_files import detect_compression
+from src.main.merge_csv import read_clean_csv
 
-# mapped_headers: Dict[str, str] = {
-#     "date": "Date",
-#     "amount": "Amount",
-#     "description": "Description",
-#     "currency": "Currency",
-# }
+RAW_PATH = "tests/data/raw/test_data_raw.csv"
 
+ANSWERS = {
+    "delimiter": ";",
+    "headers": {
+        "date": "Date",
+        "amount": "Prix",
+        "description": "Detail",
+        "currency": "Currency",
+    },
+    "keep_unsigned": "y",
+    "keep_positive": "x",
+}
 
-# def test_map_headers():
-#     assert test_class.map_headers(raw_headers) == mapped_headers
 
+def iter_values(user_inputs, monkeypatch):
+    inputs = iter(user_inputs)
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
 
-# # def test_clean_amount_values():
-# #     assert test_class.clean_amount_values
+
+def no_input(monkeypatch):
+    def fail(prompt):
+        raise AssertionError(f"Unexpected prompt - {prompt}")
+
+    monkeypatch.setattr("builtins.input", fail)
+
+
+def test_replay_answers(tmp_path, monkeypatch):
+    # Column numbers, keep the unsigned and positive amounts, and the
+    # default description of the three rows without one.
+    iter_values(["1", "5", "4", "6", "y", "x", "", "", ""], monkeypatch)
+    clean_csv = CleanCsv(RAW_PATH, output_dir=tmp_path / "interactive")
+    interactive_path = clean_csv.run_pipeline()
+    assert clean_csv.answers == ANSWERS
+
+    no_input(monkeypatch)
+    replayed_path = CleanCsv(
+        RAW_PATH, clean_csv.answers, output_dir=tmp_path / "replayed"
+    ).run_pipeline()
+    with open(interactive_path) as interactive_file, open(
+        replayed_path
+    ) as replayed_file:
+        assert replayed_file.read() == interactive_file.read()
+
+
+def test_ask(monkeypatch):
+    clean_csv = CleanCsv(RAW_PATH)
+    iter_values(["N"], monkeypatch)
+    assert clean_csv.ask("keep_unsigned", "") == "N"
+    # The stored answer is reused.
+    assert clean_csv.ask("keep_unsigned", "") == "N"
+
+    no_input(monkeypatch)
+    # Without prompts, questions without a stored answer take their
+    # default.
+    assert CleanCsv(RAW_PATH, dict()).ask("keep_positive", "") == ""
+
+
+def test_replay_missing_columns(tmp_path, monkeypatch):
+    no_input(monkeypatch)
+    answers = dict(ANSWERS, headers=dict(ANSWERS["headers"], amount="Total"))
+    with pytest.raises(ValueError):
+        CleanCsv(RAW_PATH, answers, output_dir=tmp_path).run_pipeline()
+
+
+def test_cleaning_profiles(tmp_path, monkeypatch):
+    profiles_path = tmp_path / "profiles" / "cleaning_profiles.json"
+    profiles = CleaningProfiles(profiles_path)
+    profiles.load()
+    assert profiles.find(RAW_PATH) is None
+    assert profiles.clean(RAW_PATH, tmp_path) is None
+
+    profiles.add(RAW_PATH, ANSWERS)
+    profiles.save()
+    other_path = tmp_path / "other.csv"
+    other_path.write_text("date;amount\n")
+    loaded_profiles = CleaningProfiles(profiles_path)
+    loaded_profiles.load()
+    assert loaded_profiles.find(RAW_PATH) == ANSWERS
+    assert loaded_profiles.find(other_path) is None
+
+    no_input(monkeypatch)
+    clean_path = loaded_profiles.clean(RAW_PATH, tmp_path / "clean")
+    assert clean_path.endswith("test_data_raw_clean.csv")
+
+
+def test_merchant_column(tmp_path, monkeypatch):
+    no_input(monkeypatch)
+    clean_path = CleanCsv(
+        RAW_PATH, ANSWERS, output_dir=tmp_path
+    ).run_pipeline()
+    assert [expense.merchant for expense in read_clean_csv(clean_path)] == [
+        "paris",
+        "money transfer",
+        "colruyt",
+        "la piola pizza",
+        "test user credit money",
+        "colruyt test",
+        "colruyt",
+        "colruyt",
+        "expense",
+        "expense",
+        "expense",
+    ]
+
+    # A bank can use its own substitutions.
+    answers = dict(ANSWERS, merchant_patterns=[[" test$", ""]])
+    clean_path = CleanCsv(
+        RAW_PATH, answers, output_dir=tmp_path
+    ).run_pipeline()
+    merchants = [expense.merchant for expense in read_clean_csv(clean_path)]
+    assert merchants[5] == "colruyt"
+    assert merchants[0] == "paris"
+
+
+@pytest.mark.parametrize(
+    "amounts, keep_unsigned, keep_positive, expected_result",
+    [
+        (
+            ["- 22,00", "+ 5,00"],
+            "y",
+            "x",
+            [("22.00", "debit"), ("5.00", "credit")],
+        ),
+        (["- 22,00", "+ 5,00"], "y", "", [("22.00", "debit")]),
+        (
+            ["22,00", "5,00"],
+            "y",
+            "",
+            [("22.00", "unsigned"), ("5.00", "unsigned")],
+        ),
+        (
+            ["- 22,00", "5,00", "+ 1,50"],
+            "y",
+            "x",
+            [("22.00", "debit"), ("5.00", "unsigned"), ("1.50", "credit")],
+        ),
+        (
+            ["- 22,00", "5,00", "+ 1,50"],
+            "N",
+            "x",
+            [("22.00", "debit"), ("1.50", "credit")],
+        ),
+    ],
+)
+def test_sign_column(
+    tmp_path,
+    monkeypatch,
+    amounts,
+    keep_unsigned,
+    keep_positive,
+    expected_result,
+):
+    raw_path = tmp_path / "statement.csv"
+    raw_path.write_text(
+        "Date;Detail;Prix;Currency\n"
+        + "".join(f"20/12/2022;PARIS;{amount};EUR\n" for amount in amounts)
+    )
+    answers = dict(
+        ANSWERS, keep_unsigned=keep_unsigned, keep_positive=keep_positive
+    )
+    no_input(monkeypatch)
+    clean_path = CleanCsv(
+        raw_path, answers, output_dir=tmp_path / "clean"
+    ).run_pipeline()
+    with open(clean_path) as clean_file:
+        rows = list(csv.DictReader(clean_file, delimiter=";"))
+    assert [(row["amount"], row["sign"]) for row in rows] == expected_result
+
+
+@pytest.fixture
+def plain_clean_path(tmp_path, monkeypatch):
+    """
+    Returns the path to the clean csv file of the uncompressed statement.
+    """
+    no_input(monkeypatch)
+    return CleanCsv(
+        RAW_PATH, ANSWERS, output_dir=tmp_path / "plain"
+    ).run_pipeline()
+
+
+@pytest.mark.parametrize(
+    "extension, opener",
+    [(".gz", gzip.open), (".bz2", bz2.open), (".xz", lzma.open)],
+)
+def test_clean_compressed_statement(
+    tmp_path, plain_clean_path, extension, opener
+):
+    raw_path = tmp_path / f"test_data_raw.csv{extension}"
+    with open(RAW_PATH, "rb") as raw_file, opener(raw_path, "wb") as output:
+        output.write(raw_file.read())
+    # The delimiter is sniffed from the decompressed file.
+    answers = {key: ANSWERS[key] for key in ANSWERS if key != "delimiter"}
+    clean_path = CleanCsv(
+        raw_path,
+        answers,
+        output_dir=tmp_path / "clean",
+        compression=extension[1:],
+    ).run_pipeline()
+    assert clean_path.endswith(f"test_data_raw_clean.csv{extension}")
+    assert detect_compression(clean_path) == extension[1:]
+    assert list(read_clean_csv(clean_path)) == list(
+        read_clean_csv(plain_clean_path)
+    )
+
+
+def test_clean_zip_member(tmp_path, plain_clean_path, monkeypatch):
+    zip_path = tmp_path / "statements.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.write(RAW_PATH, "december.csv")
+        archive.writestr("november.csv", "Date;Amount\n")
+        archive.writestr("readme.txt", "Statements of 2022")
+    with pytest.raises(ValueError):
+        CleanCsv(zip_path, ANSWERS).run_pipeline()
+
+    iter_values(["x", "5", "0"], monkeypatch)
+    member = choose_member(zip_path)
+    assert member == "december.csv"
+    profiles = CleaningProfiles()
+    profiles.add(RAW_PATH, ANSWERS)
+    assert profiles.find(zip_path, member) == ANSWERS
+    assert profiles.find(zip_path, "november.csv") is None
+
+    # The clean csv file is named after the member.
+    clean_path = CleanCsv(
+        zip_path, ANSWERS, output_dir=tmp_path / "clean", member=member
+    ).run_pipeline()
+    assert clean_path.endswith("december_clean.csv")
+    with open(clean_path) as clean_file, open(plain_clean_path) as plain_file:
+        assert clean_file.read() == plain_file.read()
@@ -0,0 +1,55 @@
+from src.main.cluster_expenses import ExpenseClusters
+from src.main.records import Transaction
+
+
+def test_repeated():
+    clusters = ExpenseClusters()
+    descriptions = [
+        "PARIS",
+        "Colruyt",
+        "La Piola Pizza",
+        "COLRUYT 1020",
+        "la piola pizza",
+        "Colruyt",
+        "1234",
+        "1234",
+    ]
+    for row_number, description in enumerate(descriptions, start=1):
+        clusters.add(
+            row_number, Transaction("30/11/2022", "1.00", description, "EUR")
+        )
+    assert clusters.repeated() == [
+        ("colruyt", [2, 4, 6]),
+        ("la piola pizza", [3, 5]),
+    ]
+
+
+def test_examples():
+    clusters = ExpenseClusters(max_examples=2)
+    for row_number in range(1, 6):
+        clusters.add(
+            row_number,
+            Transaction("30/11/2022", f"{row_number}.00", "Colruyt", "EUR"),
+        )
+    assert clusters.repeated() == [("colruyt", [1, 2, 3, 4, 5])]
+    assert [expense.amount for _, expense in clusters.examples["colruyt"]] == [
+        "1.00",
+        "2.00",
+    ]
+
+
+def test_repeated_by_merchant():
+    clusters = ExpenseClusters()
+    # The merchant column is used when the clean csv file has one, e.g.
+    # without the city a bank adds, else the key of the description.
+    clusters.add(
+        1,
+        Transaction(
+            "30/11/2022", "1.00", "COLRUYT BRUXELLES", "EUR", "colruyt"
+        ),
+    )
+    clusters.add(2, Transaction("30/11/2022", "1.00", "COLRUYT 1020", "EUR"))
+    clusters.add(
+        3, Transaction("30/11/2022", "1.00", "Colruyt Bruxelles", "EUR")
+    )
+    assert clusters.repeated() == [("colruyt", [1, 2])]
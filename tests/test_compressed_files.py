@@ -0,0 +1,103 @@
+import bz2
+import gzip
+import lzma
+import zipfile
+
+import pytest
+
+from src.main.compressed_files import (
+    csv_members,
+    detect_compression,
+    open_csv,
+    strip_compression,
+)
+from src.main.merge_csv import read_clean_csv, write_clean_csv
+
+CLEAN_CSV = (
+    "date;amount;description;currency;merchant\n"
+    "20/12/2022;22.00;PARIS;EUR;paris\n"
+    "30/11/2022;19.50;La Piola Pizza;EUR;la piola pizza\n"
+)
+
+
+@pytest.fixture
+def zip_path(tmp_path):
+    """
+    Returns the path to a zip file holding two statements and a readme.
+    """
+    zip_path = tmp_path / "statements.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("november.csv", CLEAN_CSV)
+        archive.writestr("december.csv", CLEAN_CSV.replace("PARIS", "LYON"))
+        archive.writestr("readme.txt", "Statements of 2022")
+    return zip_path
+
+
+@pytest.mark.parametrize(
+    "name, opener, expected_result",
+    [
+        ("statement.csv.gz", gzip.open, "gz"),
+        ("statement.csv.bz2", bz2.open, "bz2"),
+        ("statement.csv.xz", lzma.open, "xz"),
+        ("statement.csv", open, None),
+    ],
+)
+def test_open_csv(tmp_path, name, opener, expected_result):
+    file_path = tmp_path / name
+    with opener(file_path, "wt") as csv_file:
+        csv_file.write(CLEAN_CSV)
+    assert detect_compression(file_path) == expected_result
+    with open_csv(file_path) as csv_file:
+        assert csv_file.read() == CLEAN_CSV
+    with open_csv(file_path, "rb") as csv_file:
+        assert csv_file.read() == CLEAN_CSV.encode()
+
+
+def test_detect_compression_from_content(tmp_path):
+    # A gz file without its extension.
+    file_path = tmp_path / "statement.csv"
+    with gzip.open(file_path, "wt") as csv_file:
+        csv_file.write(CLEAN_CSV)
+    assert detect_compression(file_path) == "gz"
+    assert list(read_clean_csv(file_path))[0].description == "PARIS"
+
+
+@pytest.mark.parametrize(
+    "file_name, expected_result",
+    [
+        ("statement.csv.gz", "statement.csv"),
+        ("statement.csv.BZ2", "statement.csv"),
+        ("statement.zip", "statement"),
+        ("statement.csv", "statement.csv"),
+    ],
+)
+def test_strip_compression(file_name, expected_result):
+    assert strip_compression(file_name) == expected_result
+
+
+def test_zip_members(zip_path, tmp_path):
+    assert csv_members(zip_path) == ["november.csv", "december.csv"]
+    with pytest.raises(ValueError):
+        open_csv(zip_path)
+    with open_csv(zip_path, member="december.csv") as csv_file:
+        assert "LYON" in csv_file.read()
+
+    single_path = tmp_path / "single.zip"
+    with zipfile.ZipFile(single_path, "w") as archive:
+        archive.writestr("statement.txt", CLEAN_CSV)
+    # Without csv files, every file is a member.
+    assert csv_members(single_path) == ["statement.txt"]
+    with open_csv(single_path) as csv_file:
+        assert csv_file.read() == CLEAN_CSV
+
+
+@pytest.mark.parametrize("extension", [".gz", ".bz2", ".xz"])
+def test_write_compressed_clean_csv(tmp_path, extension):
+    clean_path = tmp_path / "statement.csv"
+    clean_path.write_text(CLEAN_CSV)
+    compressed_path = tmp_path / f"statement_clean.csv{extension}"
+    assert write_clean_csv(read_clean_csv(clean_path), compressed_path) == 2
+    assert detect_compression(compressed_path) == extension[1:]
+    assert list(read_clean_csv(compressed_path)) == list(
+        read_clean_csv(clean_path)
+    )
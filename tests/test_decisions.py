@@ -0,0 +1,217 @@
+import pytest
+
+from src.main.decisions import ExpenseDecisions
+from src.main.records import Decision, Transaction
+from src.main.upload_expenses import UploadExpense
+
+
+@pytest.fixture
+def decisions_class():
+    """
+    Returns an ExpenseDecisions class instance with loaded test decisions.
+    """
+    decisions = ExpenseDecisions("tests/data/decisions/test_decisions.csv")
+    decisions.load()
+    return decisions
+
+
+@pytest.fixture
+def expenses():
+    """
+    Returns the expenses of the cleaned test csv file.
+    """
+    return list(
+        UploadExpense(
+            "tests/data/clean/test_data_raw_clean.csv"
+        ).get_csv_file_contents()
+    )
+
+
+@pytest.fixture
+def account():
+    """
+    Returns the user id, friends, groups, groups members and sub-categories
+    of the test account.
+    """
+    return (
+        23450949,
+        {82514972: "Tom", 25087341: "Linda", 39083412: "George"},
+        {
+            34894512: "Restaurant",
+            20340193: "Home",
+            12035391: "Personal",
+        },
+        {
+            34894512: [23450949, 82514972],
+            20340193: [23450949, 82514972, 25087341],
+            12035391: [23450949],
+        },
+        {
+            "Utilities": {"Electricity": "electricity"},
+            "Uncategorized": {"General": "general"},
+            "Food and drink": {
+                "Dining out": "dining out",
+                "Groceries": "groceries",
+            },
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "row_number, description, expected_group",
+    [
+        (1, "PARIS", "Home"),
+        (2, "Money Transfer", "Home"),
+        (3, "COLRUYT 1020", "Personal"),
+        (4, "La Piola Pizza", "Restaurant"),
+    ],
+)
+def test_find_decision(
+    decisions_class, row_number, description, expected_group
+):
+    assert (
+        decisions_class.find_decision(row_number, description)["group"]
+        == expected_group
+    )
+
+
+def test_resolve(decisions_class, expenses, account):
+    all_expense_info, errors = decisions_class.resolve(expenses, *account)
+    assert errors == []
+    assert all_expense_info[0] == Decision(
+        sub_category_name="General",
+        sub_category_obj="general",
+        group_name="Home",
+        group_id=20340193,
+        friend_names=("Tom",),
+        friend_ids=(82514972,),
+        user_shares=("11.0", "11.0"),
+    )
+    assert all_expense_info[1].friend_ids == (25087341,)
+    assert all_expense_info[1].user_shares == ("10.0", "100.0")
+    assert all_expense_info[2] == Decision(
+        sub_category_name="Groceries",
+        sub_category_obj="groceries",
+        group_name="Personal",
+        group_id=12035391,
+    )
+    assert all_expense_info[3].user_shares == ("11.7", "7.8")
+
+
+def test_resolve_several_friends(decisions_class, account, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;group;friend;category;sub_category;split\n"
+        "1;Home;Tom,Linda;Utilities;Electricity;=\n"
+        "2;Home;Tom, Linda;Utilities;Electricity;+3,4.5\n"
+        "3;Home;Linda,Tom;Utilities;Electricity;%50,25\n"
+    )
+    decisions = ExpenseDecisions(decisions_path)
+    decisions.load()
+    expenses = [
+        Transaction("20/12/2022", "10.00", "A", "EUR"),
+        Transaction("20/12/2022", "10.00", "B", "EUR"),
+        Transaction("20/12/2022", "0.02", "C", "EUR"),
+    ]
+    all_expense_info, errors = decisions.resolve(expenses, *account)
+    assert errors == []
+    assert all_expense_info[0].friend_ids == (82514972, 25087341)
+    assert [expense_info.user_shares for expense_info in all_expense_info] == [
+        ("3.33", "3.33", "3.34"),
+        ("2.5", "3.0", "4.5"),
+        ("0.0", "0.01", "0.01"),
+    ]
+
+
+def test_resolve_reports_every_error(account, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;group;friend;category;sub_category;split\n"
+        "1;Home;George;Utilities;Electricity;=\n"
+        "2;Personal;Tom;Utilities;Heat;\n"
+        "3;Travel;Tom;Utilities;Electricity;=\n"
+    )
+    decisions = ExpenseDecisions(decisions_path)
+    decisions.load()
+    expenses = [
+        Transaction("20/12/2022", "10.00", "A", "EUR"),
+        Transaction("20/12/2022", "10.00", "B", "EUR"),
+        Transaction("20/12/2022", "10,00", "C", "EUR"),
+        Transaction("20/12/2022", "10.00", "D", "EUR"),
+    ]
+    all_expense_info, errors = decisions.resolve(expenses, *account)
+    assert all_expense_info == [None, None, None, None]
+    assert errors == [
+        "Expense 1 (A): George is not exactly one friend in Home.",
+        "Expense 2 (B): Utilities - Heat is not a valid sub-category; "
+        "Personal is a personal group so it takes no friend or split.",
+        "Expense 3 (C): 10,00 is not a valid amount; Travel is not one of "
+        "your groups.",
+        "Expense 4 (D) has no decision.",
+    ]
+
+
+def test_load_reports_invalid_rows(account, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;pattern;group;friend;category;sub_category;split\n"
+        "one;;Personal;;Utilities;Electricity;\n"
+        "0;;Personal;;Utilities;Electricity;\n"
+        ";colruyt(;Personal;;Utilities;Electricity;\n"
+        "2;;Personal;;Utilities;Electricity;\n"
+    )
+    decisions = ExpenseDecisions(decisions_path)
+    decisions.load()
+    assert list(decisions.row_decisions) == [2]
+    expenses = [
+        Transaction("20/12/2022", "10.00", "Colruyt", "EUR"),
+        Transaction("20/12/2022", "10.00", "B", "EUR"),
+    ]
+    all_expense_info, errors = decisions.resolve(expenses, *account)
+    assert all_expense_info[0] is None
+    assert errors[:2] == [
+        "Line 2 of the decisions file: one is not a row number.",
+        "Line 3 of the decisions file: 0 is not a row number.",
+    ]
+    assert errors[2].startswith(
+        "Line 4 of the decisions file: colruyt( is not a valid pattern ("
+    )
+    assert errors[3:] == ["Expense 1 (Colruyt) has no decision."]
+
+
+@pytest.mark.parametrize(
+    "total_expense, split, friends, expected_result",
+    [
+        (33.33, "=", 1, [1.0, 1.0]),
+        (33.33, "=", 2, [1.0, 1.0, 1.0]),
+        (15.55, "+10.5", 1, [505.0, 1050]),
+        (15.55, "+10.5,5.05", 2, [0.0, 1050, 505]),
+        (50, "%20.54324", 1, [79.46, 20.54]),
+        (50, "%20,30", 2, [50.0, 20.0, 30.0]),
+    ],
+)
+def test_split_weights(
+    decisions_class, total_expense, split, friends, expected_result
+):
+    assert (
+        decisions_class.split_weights(total_expense, split, friends)
+        == expected_result
+    )
+
+
+@pytest.mark.parametrize(
+    "split, friends",
+    [
+        ("", 1),
+        ("+0", 1),
+        ("+12", 1),
+        ("+5,6", 2),
+        ("+5", 2),
+        ("%101", 1),
+        ("%a", 1),
+        ("x", 1),
+    ],
+)
+def test_split_weights_invalid(decisions_class, split, friends):
+    with pytest.raises(ValueError):
+        decisions_class.split_weights(10, split, friends)
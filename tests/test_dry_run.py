@@ -0,0 +1,117 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from splitwise.category import Category
+from splitwise.expense import Expense, ExpenseUser
+
+from src.main.dry_run import expense_payload
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.upload_expenses import UploadExpense
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Returns a running fake Splitwise server used by every Splitwise client.
+    """
+    # The fake server accepts any credentials.
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+    with FakeSplitwiseServer() as server:
+        yield server
+
+
+@pytest.fixture
+def no_credentials(monkeypatch):
+    """
+    Removes the Splitwise credentials from the environment and the .env
+    file.
+    """
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setattr("dotenv.load_dotenv", lambda: False)
+
+
+def test_offline_without_credentials(no_credentials):
+    upload_expense = UploadExpense("tests/data/clean/test_data_raw_clean.csv")
+    assert upload_expense.run_check()
+    assert upload_expense.splitwise_client is None
+    with pytest.raises(KeyError):
+        upload_expense.splitwise_obj
+
+
+def test_import_without_client():
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, src.main.upload_expenses; "
+            "print('splitwise' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert process.stdout.strip() == "False"
+
+
+def test_expense_payload():
+    expense = Expense()
+    expense.setCost("10.00")
+    expense.setDescription("Colruyt")
+    expense.setCategory(Category({"id": 12, "name": "Groceries"}))
+    user = ExpenseUser()
+    user.setId(23450949)
+    user.setPaidShare("10.00")
+    user.setOwedShare("10.00")
+    expense.addUser(user)
+    assert expense_payload(expense) == {
+        "cost": "10.00",
+        "description": "Colruyt",
+        "users__0__user_id": 23450949,
+        "users__0__paid_share": "10.00",
+        "users__0__owed_share": "10.00",
+        "category_id": 12,
+    }
+    # The expense can still be sent.
+    assert expense.getUsers() == [user]
+
+
+def test_dry_run(fake_server, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;pattern;group;friend;category;sub_category;split\n"
+        ";.;Personal;;Food and drink;Groceries;\n"
+    )
+    dry_run_path = tmp_path / "dry_run.json"
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv",
+        state_path=tmp_path / "state.sqlite",
+        sessions_path=tmp_path / "upload_sessions.sqlite",
+        dry_run_path=dry_run_path,
+    )
+    upload_expense.run_headless(decisions_path)
+    assert fake_server.expenses == []
+    assert fake_server.stats["get_categories 200"] == 1
+
+    payloads = json.loads(dry_run_path.read_text())
+    assert len(payloads) == 10
+    assert payloads[0] == {
+        "call": "createExpense",
+        "payload": {
+            "cost": 22.0,
+            "description": "PARIS",
+            "date": "20/12/2022",
+            "currency_code": "EUR",
+            "group_id": 12035391,
+            "users__0__user_id": 23450949,
+            "users__0__paid_share": 22.0,
+            "users__0__owed_share": 22.0,
+            "category_id": 12,
+        },
+    }
+    # A dry run isn't tracked or recorded as an upload session.
+    assert upload_expense.state_store is None
+    assert upload_expense.upload_sessions is None
@@ -0,0 +1,146 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.main.benchmark import UploadBenchmark
+from src.main.expense_store import ExpenseStore, to_iso_date
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.upload_expenses import UploadExpense
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Returns a running fake Splitwise server used by every Splitwise client.
+    """
+    # The fake server accepts any credentials.
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+    with FakeSplitwiseServer() as server:
+        yield server
+
+
+@pytest.fixture
+def upload_expense_class(fake_server, tmp_path):
+    """
+    Returns a UploadExpense class instance with the metadata of the fake
+    Splitwise account and an expense store.
+    """
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv",
+        store_path=tmp_path / "expenses.sqlite",
+    )
+    (
+        upload_expense.user_id,
+        upload_expense.user_friends,
+        upload_expense.user_groups,
+        upload_expense.user_groups_members,
+    ) = upload_expense.get_user_info()
+    (
+        upload_expense.categories,
+        upload_expense.all_sub_categories,
+    ) = upload_expense.get_categories_and_sub_categories()
+    return upload_expense
+
+
+@pytest.mark.parametrize(
+    "raw_date, expected_result",
+    [
+        ("2022-12-20T13:00:00Z", "2022-12-20"),
+        ("2022-12-20", "2022-12-20"),
+        ("20/12/2022", "2022-12-20"),
+    ],
+)
+def test_to_iso_date(raw_date, expected_result):
+    assert to_iso_date(raw_date) == expected_result
+
+
+def test_sync(upload_expense_class, tmp_path):
+    jobs = UploadBenchmark(total_expenses=5).make_jobs(upload_expense_class)
+    upload_expense_class.upload_batch(jobs)
+    expense_store = ExpenseStore(tmp_path / "expenses.sqlite")
+    expense_store.open()
+    assert expense_store.updated_after is None
+    assert (
+        expense_store.sync(upload_expense_class.get_expenses, page_size=2) == 5
+    )
+    assert expense_store.count() == 5
+    assert expense_store.sync(upload_expense_class.get_expenses) == 0
+
+    upload_expense_class.upload_batch(jobs[:1])
+    assert expense_store.sync(upload_expense_class.get_expenses) == 1
+    assert expense_store.count() == 6
+    expense_store.close()
+
+    # The cursor is kept between runs.
+    expense_store.open()
+    assert expense_store.sync(upload_expense_class.get_expenses) == 0
+    expense_store.close()
+
+
+@pytest.mark.parametrize("mode", ["sequential", "threaded", "async"])
+def test_write_through(upload_expense_class, mode):
+    assert upload_expense_class.load_expense_store() == 0
+    jobs = UploadBenchmark(total_expenses=4).make_jobs(upload_expense_class)
+    assert upload_expense_class.upload_batch(jobs, mode, workers=2) == []
+    expense_store = upload_expense_class.expense_store
+    assert expense_store.count() == 4
+
+    # Expenses written through are fetched again, unchanged, by the sync.
+    assert expense_store.sync(upload_expense_class.get_expenses) == 4
+    assert expense_store.count() == 4
+
+
+@pytest.mark.parametrize(
+    "query, expected_result",
+    [
+        ({"date": "01/12/2022"}, [4, 3, 2, 1]),
+        ({"cost": 5.0}, [2]),
+        ({"description": "benchmark EXPENSE 3"}, [3]),
+        ({"date": "2022-12-01", "cost": 12.34}, [1]),
+        ({"date": "2022-12-02"}, []),
+    ],
+)
+def test_find(upload_expense_class, query, expected_result):
+    upload_expense_class.load_expense_store()
+    jobs = UploadBenchmark(total_expenses=4).make_jobs(upload_expense_class)
+    upload_expense_class.upload_batch(jobs)
+    rows = upload_expense_class.expense_store.find(**query)
+    assert [row["id"] for row in rows] == expected_result
+
+
+def test_cost_cents_are_integers(upload_expense_class):
+    upload_expense_class.load_expense_store()
+    jobs = UploadBenchmark(total_expenses=4).make_jobs(upload_expense_class)
+    upload_expense_class.upload_batch(jobs)
+    expense_store = upload_expense_class.expense_store
+    # numpy integers would be stored as blobs, which sum to 0.
+    with expense_store.lock:
+        rows = expense_store.connection.execute(
+            "SELECT DISTINCT typeof(cost_cents) FROM expenses"
+        ).fetchall()
+        total = expense_store.connection.execute(
+            "SELECT SUM(cost_cents) FROM expenses"
+        ).fetchone()[0]
+    assert [row[0] for row in rows] == ["integer"]
+    assert total == 1234 + 500 + 10001 + 3333
+
+
+def test_blob_costs_are_fixed(tmp_path):
+    store_path = tmp_path / "expenses.sqlite"
+    expense_store = ExpenseStore(store_path)
+    expense_store.open()
+    expense_store.close()
+    connection = sqlite3.connect(store_path)
+    with connection:
+        connection.execute(
+            "INSERT INTO expenses VALUES (1, 0, '2022-12-01', ?, 'EUR', "
+            "'Colruyt', NULL, NULL, '[]')",
+            (np.int64(1234),),
+        )
+    connection.close()
+
+    expense_store.open()
+    assert [row["id"] for row in expense_store.find(cost=12.34)] == [1]
+    expense_store.close()
@@ -0,0 +1,273 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from splitwise import Splitwise
+from splitwise.exception import SplitwiseException
+
+from src.main.benchmark import UploadBenchmark
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.learn_expenses import ExpenseIndex
+from src.main.records import Decision
+from src.main.upload_expenses import UploadExpense
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Returns a running fake Splitwise server used by every Splitwise client.
+    """
+    # The fake server accepts any credentials.
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+    with FakeSplitwiseServer() as server:
+        yield server
+
+
+@pytest.fixture
+def upload_expense_class(fake_server):
+    """
+    Returns a UploadExpense class instance with the metadata of the fake
+    Splitwise account.
+    """
+    upload_expense = UploadExpense(
+        "src/tests/data/clean/test_data_raw_clean.csv"
+    )
+    (
+        upload_expense.user_id,
+        upload_expense.user_friends,
+        upload_expense.user_groups,
+        upload_expense.user_groups_members,
+    ) = upload_expense.get_user_info()
+    (
+        upload_expense.categories,
+        upload_expense.all_sub_categories,
+    ) = upload_expense.get_categories_and_sub_categories()
+    return upload_expense
+
+
+def test_get_user_info(upload_expense_class):
+    assert upload_expense_class.user_id == 23450949
+    assert upload_expense_class.user_friends == {
+        82514972: "Tom",
+        25087341: "Linda",
+        39083412: "George",
+    }
+    assert upload_expense_class.user_groups_members[20340193] == [
+        23450949,
+        82514972,
+        25087341,
+    ]
+    assert sorted(upload_expense_class.all_sub_categories["Utilities"]) == [
+        "Electricity",
+        "Heat/gas",
+    ]
+
+
+def test_patch_is_restored():
+    with FakeSplitwiseServer() as server:
+        assert Splitwise.GET_GROUPS_URL.startswith(server.base_url)
+    assert Splitwise.GET_GROUPS_URL.startswith(Splitwise.SPLITWISE_BASE_URL)
+
+
+@pytest.mark.parametrize("mode", ["sequential", "threaded", "async"])
+def test_upload_batch(fake_server, upload_expense_class, mode):
+    jobs = UploadBenchmark(total_expenses=6).make_jobs(upload_expense_class)
+    failed_jobs = upload_expense_class.upload_batch(jobs, mode, workers=3)
+    assert failed_jobs == []
+    assert sorted(
+        expense["description"] for expense in fake_server.expenses
+    ) == [f"Benchmark expense {count}" for count in range(1, 7)]
+    shared_expense = [
+        expense
+        for expense in fake_server.expenses
+        if expense["description"] == "Benchmark expense 2"
+    ][0]
+    assert [user["owed_share"] for user in shared_expense["users"]] == [
+        "1.66",
+        "1.67",
+        "1.67",
+    ]
+
+
+def test_upload_batch_invalid_expense(fake_server, upload_expense_class):
+    expense, expense_info, total_expense = UploadBenchmark(
+        total_expenses=2
+    ).make_jobs(upload_expense_class)[1]
+    job = (
+        expense,
+        expense_info._replace(user_shares=("1.0", "1.0", "1.0")),
+        total_expense,
+    )
+    assert upload_expense_class.upload_batch([job]) == [job]
+    assert fake_server.expenses == []
+
+
+def test_upload_batch_unknown_mode(upload_expense_class):
+    with pytest.raises(ValueError):
+        upload_expense_class.upload_batch([], "parallel")
+
+
+@pytest.mark.parametrize(
+    "server_options, max_retries, expected_status",
+    [
+        # Server errors of createExpense are never retried.
+        ({"error_rate": 1.0}, 3, "create_expense 500"),
+        ({"rate_limit": 0}, 0, "create_expense 429"),
+    ],
+)
+def test_injected_faults(
+    fake_server,
+    upload_expense_class,
+    server_options,
+    max_retries,
+    expected_status,
+):
+    for option, value in server_options.items():
+        setattr(fake_server, option, value)
+    upload_expense_class.max_retries = max_retries
+    jobs = UploadBenchmark(total_expenses=2).make_jobs(upload_expense_class)
+    assert upload_expense_class.upload_batch(jobs) == jobs
+    assert fake_server.stats[expected_status] == 2
+    assert upload_expense_class.get_user_info()[0] == 23450949
+
+
+def test_retry_read_calls(fake_server, upload_expense_class):
+    fake_server.error_rate = 1.0
+    fake_server.fault_endpoints = ("get_categories",)
+    upload_expense_class.max_retries = 2
+    upload_expense_class.retry_delay = 0.0
+    with pytest.raises(SplitwiseException):
+        upload_expense_class.get_categories_and_sub_categories()
+    assert fake_server.stats["get_categories 500"] == 3
+    assert upload_expense_class.metrics.errors[("getCategories", 500)] == 3
+    assert upload_expense_class.metrics.retries["getCategories"] == 2
+
+
+def test_retry_rate_limited_calls(fake_server, upload_expense_class):
+    fake_server.rate_limit = 1
+    upload_expense_class.max_retries = 1
+    upload_expense_class.retry_delay = 0.0
+    jobs = UploadBenchmark(total_expenses=2).make_jobs(upload_expense_class)
+    assert upload_expense_class.upload_batch(jobs) == []
+    assert len(fake_server.expenses) == 2
+    assert upload_expense_class.metrics.retries["createExpense"] == 1
+    summary = upload_expense_class.metrics.summary()
+    assert summary["api"]["createExpense"]["count"] == 3
+    assert summary["api"]["createExpense"]["errors"] == {"429": 1}
+
+
+def test_get_expenses_sync(fake_server, upload_expense_class, tmp_path):
+    jobs = UploadBenchmark(total_expenses=5).make_jobs(upload_expense_class)
+    upload_expense_class.upload_batch(jobs)
+    expense_index = ExpenseIndex(tmp_path / "expense_index.json")
+    assert (
+        expense_index.sync(
+            upload_expense_class.get_expenses, 23450949, page_size=2
+        )
+        == 5
+    )
+    assert len(expense_index.documents) == 5
+    assert expense_index.sync(upload_expense_class.get_expenses, 23450949) == 0
+
+
+def test_get_expenses_sync_metrics(
+    fake_server, upload_expense_class, tmp_path
+):
+    jobs = UploadBenchmark(total_expenses=3).make_jobs(upload_expense_class)
+    upload_expense_class.upload_batch(jobs)
+    fake_server.error_rate = 0.5
+    fake_server.fault_endpoints = ("get_expenses",)
+    upload_expense_class.max_retries = 10
+    upload_expense_class.retry_delay = 0.0
+    expense_index = ExpenseIndex(tmp_path / "expense_index.json")
+    assert (
+        expense_index.sync(
+            upload_expense_class.get_expenses, 23450949, page_size=1
+        )
+        == 3
+    )
+    # Every page and every retry of the sync is measured.
+    server_errors = fake_server.stats["get_expenses 500"]
+    assert server_errors > 0
+    summary = upload_expense_class.metrics.summary()
+    assert summary["api"]["getExpenses"]["count"] == 4 + server_errors
+    assert summary["api"]["getExpenses"]["errors"] == {"500": server_errors}
+    assert upload_expense_class.metrics.retries["getExpenses"] == (
+        server_errors
+    )
+    textfile_path = tmp_path / "upload.prom"
+    upload_expense_class.metrics.save_prometheus(textfile_path)
+    assert 'call="getExpenses"' in textfile_path.read_text()
+
+
+@pytest.mark.parametrize("error_rate, expected_result", [(0, 5), (1, 0)])
+def test_upload_marked_expenses(
+    fake_server, upload_expense_class, error_rate, expected_result
+):
+    upload_expense_class.file_path = "tests/data/clean/test_data_raw_clean.csv"
+    groceries = upload_expense_class.all_sub_categories["Food and drink"][
+        "Groceries"
+    ]
+    personal_expenses = {
+        row_number: Decision("Groceries", groceries, "Personal", 12035391)
+        for row_number in [3, 5, 6, 7, 10]
+    }
+    fake_server.error_rate = error_rate
+    upload_expense_class.upload_marked_expenses(personal_expenses, 3)
+    assert len(personal_expenses) == expected_result
+    assert len(fake_server.expenses) == expected_result
+    assert (
+        sorted(expense["cost"] for expense in fake_server.expenses)
+        == [
+            "12.04",
+            "12.54",
+            "22.04",
+            "222.04",
+            "32.04",
+        ][: len(fake_server.expenses)]
+    )
+
+
+def test_run_pipeline(fake_server, tmp_path, monkeypatch):
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv",
+        metrics_path=tmp_path / "upload_metrics.json",
+    )
+    inputs = iter(["", "3", "n", "n"] + ["n"] * 10)
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    upload_expense.run_pipeline()
+    assert sorted(upload_expense.categories) == [
+        "Entertainment",
+        "Food and drink",
+        "Uncategorized",
+        "Utilities",
+    ]
+    assert next(inputs, None) is None
+    assert (tmp_path / "upload_metrics.json").exists()
+
+
+def test_pipelined_uploads(fake_server, upload_expense_class, monkeypatch):
+    jobs = UploadBenchmark(total_expenses=4).make_jobs(upload_expense_class)
+    fake_server.error_rate = 1.0
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        pending_uploads = [
+            (
+                row_number,
+                job,
+                uploader.submit(
+                    upload_expense_class.upload_expense, job, True
+                ),
+            )
+            for row_number, job in enumerate(jobs, start=1)
+        ]
+        failed_uploads = upload_expense_class.collect_pending_uploads(
+            pending_uploads, wait=True
+        )
+    assert pending_uploads == []
+    assert [row_number for row_number, _ in failed_uploads] == [1, 2, 3, 4]
+
+    fake_server.error_rate = 0.0
+    inputs = iter([""])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    assert upload_expense_class.retry_failed_uploads(failed_uploads) == []
+    assert len(fake_server.expenses) == 4
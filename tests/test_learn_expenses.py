@@ -0,0 +1,123 @@
+import pytest
+from splitwise.category import Category
+from splitwise.expense import Expense, ExpenseUser
+
+from src.main.learn_expenses import ExpenseIndex
+
+
+def make_expense(description, cost, users, group_id=34894512):
+    """
+    Returns a Splitwise expense paid by the first user in users.
+    """
+    expense = Expense()
+    expense.setId(len(description))
+    expense.setDescription(description)
+    expense.setCost(cost)
+    expense.setGroupId(group_id)
+    expense.setCategory(Category({"id": 12, "name": "Groceries"}))
+    for user_id, paid_share, owed_share in users:
+        expense_user = ExpenseUser()
+        expense_user.setId(user_id)
+        expense_user.setPaidShare(paid_share)
+        expense_user.setOwedShare(owed_share)
+        expense.addUser(expense_user)
+    return expense
+
+
+@pytest.fixture
+def expense_index(tmp_path):
+    """
+    Returns an ExpenseIndex with a few past expenses.
+    """
+    index = ExpenseIndex(tmp_path / "expense_index.json")
+    documents = {
+        "1": ("Colruyt Laeken", 12, 34894512, [82514972], [0.5]),
+        "2": ("COLRUYT 1020", 12, 34894512, [82514972], [0.5]),
+        "3": ("Colruyt", 12, 34894512, [82514972], [0.5]),
+        "4": ("La Piola Pizza", 13, 20340193, [25087341], [0.3]),
+        "5": ("Pizza Hut", 13, 12035391, [], []),
+    }
+    for expense_id, document in documents.items():
+        index.add_document(
+            expense_id,
+            dict(
+                zip(
+                    [
+                        "description",
+                        "sub_category_id",
+                        "group_id",
+                        "friend_ids",
+                        "friend_shares",
+                    ],
+                    document,
+                )
+            ),
+        )
+    return index
+
+
+def test_predict(expense_index):
+    label, confidence = expense_index.predict("Colruyt Anderlecht")
+    assert label == (12, 34894512, (82514972,), (0.5,))
+    assert confidence == 1.0
+
+
+def test_predict_splits_votes(expense_index):
+    label, confidence = expense_index.predict("Pizza")
+    assert label in [
+        (13, 20340193, (25087341,), (0.3,)),
+        (13, 12035391, (), ()),
+    ]
+    assert confidence < 0.8
+
+
+@pytest.mark.parametrize("description", ["Netflix", "1234", "", None])
+def test_predict_no_match(expense_index, description):
+    assert expense_index.predict(description) is None
+
+
+def test_save_and_load(expense_index):
+    expense_index.updated_after = "2022-12-20T10:00:00Z"
+    expense_index.save()
+    loaded_index = ExpenseIndex(expense_index.index_path)
+    loaded_index.load()
+    assert loaded_index.updated_after == "2022-12-20T10:00:00Z"
+    assert loaded_index.documents == expense_index.documents
+    assert loaded_index.postings == expense_index.postings
+
+
+def test_remove_document(expense_index):
+    expense_index.remove_document("4")
+    assert "piola" not in expense_index.postings
+    assert expense_index.postings["pizza"] == {"5"}
+
+
+@pytest.mark.parametrize(
+    "users, expected_result",
+    [
+        (
+            [(23450949, "20.00", "10.00"), (82514972, "0.00", "10.00")],
+            ([82514972], [0.5]),
+        ),
+        ([(23450949, "20.00", "20.00")], ([], [])),
+        ([(23450949, "0.00", "10.00"), (82514972, "20.00", "10.00")], None),
+        (
+            [
+                (23450949, "20.00", "10.00"),
+                (82514972, "0.00", "5.00"),
+                (25087341, "0.00", "5.00"),
+            ],
+            ([82514972, 25087341], [0.25, 0.25]),
+        ),
+    ],
+)
+def test_document_from_expense(expense_index, users, expected_result):
+    document = expense_index.document_from_expense(
+        make_expense("Colruyt", "20.00", users), 23450949
+    )
+    if expected_result is None:
+        assert document is None
+    else:
+        assert (document["friend_ids"], document["friend_shares"]) == (
+            expected_result
+        )
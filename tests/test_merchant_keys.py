@@ -0,0 +1,57 @@
+import pytest
+
+from src.main.merchant_keys import (
+    DEFAULT_MERCHANT_PATTERNS,
+    compile_merchant_patterns,
+    merchant_key,
+    merchant_keys,
+)
+
+
+@pytest.fixture
+def compiled_patterns():
+    """
+    Returns the default merchant patterns, compiled.
+    """
+    return compile_merchant_patterns(DEFAULT_MERCHANT_PATTERNS)
+
+
+@pytest.mark.parametrize(
+    "description, expected_result",
+    [
+        ("COLRUYT 1020 20/12 CARD XXXX1234", "colruyt"),
+        ("Colruyt", "colruyt"),
+        ("CARTE 4871 04XX XXXX 1234 DELHAIZE", "delhaize"),
+        ("PAYPAL *NETFLIX 4029357733", "paypal netflix"),
+        ("Carrefour Express TID: 0042 13:45", "carrefour express"),
+        ("SHELL 12345 20.12.2022", "shell"),
+        ("REF A12B STARBUCKS #334", "starbucks"),
+        ("Card xenia shop", "xenia shop"),
+        ("H&M 0123", "h&m"),
+        ("McDonald's", "mcdonald's"),
+        ("Money Transfer", "money transfer"),
+        ("2022/0014/0037", ""),
+    ],
+)
+def test_merchant_key(compiled_patterns, description, expected_result):
+    assert merchant_key(description, compiled_patterns) == expected_result
+
+
+def test_compile_merchant_patterns():
+    compiled_patterns = compile_merchant_patterns(
+        [[r"\d+", " "], [r"-", " "], [r" bruxelles$", ""]]
+    )
+    # The first two patterns are merged.
+    assert [replacement for _, replacement in compiled_patterns] == [" ", ""]
+    assert (
+        merchant_key("DELHAIZE-1020 BRUXELLES", compiled_patterns)
+        == "delhaize"
+    )
+
+
+def test_merchant_keys(compiled_patterns):
+    assert merchant_keys(
+        ["COLRUYT 1020", "Colruyt", "COLRUYT 1020", "PARIS"],
+        compiled_patterns,
+    ) == ["colruyt", "colruyt", "colruyt", "paris"]
+    assert merchant_keys([], compiled_patterns) == []
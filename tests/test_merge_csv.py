@@ -0,0 +1,160 @@
+import pytest
+
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.merge_csv import (
+    date_key,
+    merge_clean_csvs,
+    read_chronological,
+    read_clean_csv,
+    write_clean_csv,
+)
+from src.main.records import Transaction
+from src.main.upload_expenses import UploadExpense
+
+HEADER = "date;amount;description;currency;merchant\n"
+
+
+@pytest.fixture
+def credentials(monkeypatch):
+    """
+    Sets Splitwise credentials, which the fake server accepts whatever they
+    are.
+    """
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+
+
+@pytest.fixture
+def clean_paths(tmp_path):
+    """
+    Returns the paths to two clean csv files: November, latest expense
+    first, and an overlapping December.
+    """
+    november_path = tmp_path / "november_clean.csv"
+    november_path.write_text(
+        HEADER + "30/11/2022;12.04;Colruyt;EUR;colruyt\n"
+        "30/11/2022;12.04;Colruyt;EUR;colruyt\n"
+        "29/11/2022;19.50;La Piola Pizza;EUR;la piola pizza\n"
+        "01/11/2022;5.00;Bakery;EUR;bakery\n"
+    )
+    december_path = tmp_path / "december_clean.csv"
+    december_path.write_text(
+        HEADER + "30/11/2022;12.04;Colruyt;EUR;colruyt\n"
+        "01/12/2022;22.00;PARIS;EUR;paris\n"
+        "2022-12-20;110.00;Money Transfer;EUR;money transfer\n"
+    )
+    return [november_path, december_path]
+
+
+@pytest.mark.parametrize(
+    "raw_date, expected_result",
+    [
+        ("20/12/2022", "2022-12-20"),
+        ("2022-12-20", "2022-12-20"),
+        ("", ""),
+    ],
+)
+def test_date_key(raw_date, expected_result):
+    assert date_key(Transaction(raw_date, "1", "a", "EUR")) == expected_result
+
+
+def test_read_chronological(clean_paths):
+    november_path, december_path = clean_paths
+    assert [expense.date for expense in read_chronological(november_path)] == [
+        "01/11/2022",
+        "29/11/2022",
+        "30/11/2022",
+        "30/11/2022",
+    ]
+    assert list(read_chronological(december_path)) == list(
+        read_clean_csv(december_path)
+    )
+
+
+@pytest.mark.parametrize(
+    "drop_duplicates, expected_result",
+    [
+        (
+            False,
+            ["Bakery", "La Piola Pizza"]
+            + ["Colruyt"] * 3
+            + ["PARIS", "Money Transfer"],
+        ),
+        # Both Colruyt expenses of November are kept.
+        (
+            True,
+            ["Bakery", "La Piola Pizza"]
+            + ["Colruyt"] * 2
+            + ["PARIS", "Money Transfer"],
+        ),
+    ],
+)
+def test_merge_clean_csvs(clean_paths, drop_duplicates, expected_result):
+    merged = merge_clean_csvs(clean_paths, drop_duplicates)
+    assert [expense.description for expense in merged] == expected_result
+
+
+def test_merge_drops_copies_of_other_files(tmp_path):
+    paths = list()
+    for count in [1, 3, 2]:
+        path = tmp_path / f"{count}_clean.csv"
+        path.write_text(HEADER + "30/11/2022;12.04;Colruyt;EUR;\n" * count)
+        paths.append(path)
+    # The most copies found in one file.
+    assert len(list(merge_clean_csvs(paths, drop_duplicates=True))) == 3
+
+
+def test_write_clean_csv(clean_paths, tmp_path):
+    output_path = tmp_path / "merged" / "merged_clean.csv"
+    assert write_clean_csv(merge_clean_csvs(clean_paths), output_path) == 7
+    assert list(read_clean_csv(output_path)) == list(
+        merge_clean_csvs(clean_paths)
+    )
+
+
+def test_upload_merged_files(credentials, clean_paths, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;pattern;group;friend;category;sub_category;split\n"
+        ";.;Personal;;Food and drink;Groceries;\n"
+    )
+    upload_expense = UploadExpense(
+        clean_paths, state_path=tmp_path / "state.sqlite", drop_duplicates=True
+    )
+    with FakeSplitwiseServer() as fake_server:
+        with pytest.raises(ValueError):
+            upload_expense.run_headless()
+        upload_expense.run_headless(decisions_path)
+        assert [expense["date"] for expense in fake_server.expenses] == [
+            "01/11/2022",
+            "29/11/2022",
+            "30/11/2022",
+            "30/11/2022",
+            "01/12/2022",
+            "2022-12-20",
+        ]
+    assert upload_expense.batch.endswith("drop_duplicates")
+    assert (
+        upload_expense.state_store.counts(upload_expense.batch)["uploaded"]
+        == 6
+    )
+
+
+def test_merchant_column(tmp_path):
+    # A clean csv file written before the merchant column.
+    old_path = tmp_path / "old_clean.csv"
+    old_path.write_text(
+        "date;amount;description;currency\n30/11/2022;1.00;COLRUYT 1020;EUR\n"
+    )
+    (expense,) = read_clean_csv(old_path)
+    assert expense.merchant == ""
+    assert expense.merchant_key == "colruyt"
+
+    output_path = tmp_path / "merged_clean.csv"
+    write_clean_csv(read_clean_csv(old_path), output_path)
+    assert list(read_clean_csv(output_path)) == [
+        expense._replace(merchant="colruyt")
+    ]
+
+    # The same expense in a file with a merchant column is a duplicate.
+    assert len(list(merge_clean_csvs([old_path, output_path], True))) == 1
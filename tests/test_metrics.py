@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from src.main.metrics import Histogram, Metrics, Progress, format_duration
+
+
+@pytest.fixture
+def metrics():
+    """
+    Returns a Metrics instance with a few recorded calls and prompts.
+    """
+    metrics = Metrics()
+    for seconds in [0.004, 0.02, 0.03, 0.2, 3.0]:
+        metrics.observe("api", "createExpense", seconds)
+    metrics.observe("api", "getFriends", 0.07)
+    metrics.observe("prompt", "category", 12.5)
+    metrics.count_error("createExpense", 429)
+    metrics.count_retry("createExpense")
+    return metrics
+
+
+@pytest.mark.parametrize(
+    "q, expected_result", [(0.2, 0.005), (0.6, 0.05), (0.8, 0.25), (1, 3.0)]
+)
+def test_histogram_quantile(q, expected_result):
+    histogram = Histogram()
+    for seconds in [0.004, 0.02, 0.03, 0.2, 3.0]:
+        histogram.observe(seconds)
+    assert histogram.quantile(q) == expected_result
+
+
+def test_time():
+    metrics = Metrics()
+    with pytest.raises(KeyError):
+        with metrics.time("api", "getGroup"):
+            raise KeyError
+    assert metrics.histograms[("api", "getGroup")].count == 1
+
+
+def test_summary(metrics):
+    summary = metrics.summary()
+    assert summary["api_seconds"] == pytest.approx(3.324)
+    assert summary["prompt_seconds"] == 12.5
+    assert summary["api"]["createExpense"]["count"] == 5
+    assert summary["api"]["createExpense"]["p50_seconds"] == 0.05
+    assert summary["api"]["createExpense"]["errors"] == {"429": 1}
+    assert summary["api"]["createExpense"]["retries"] == 1
+    assert summary["prompt"]["category"]["max_seconds"] == 12.5
+
+
+def test_save_json(metrics, tmp_path):
+    json_path = tmp_path / "metrics" / "upload_metrics.json"
+    metrics.save_json(json_path)
+    with open(json_path) as json_file:
+        assert json.load(json_file)["api"]["getFriends"]["count"] == 1
+
+
+def test_save_prometheus(metrics, tmp_path):
+    textfile_path = tmp_path / "upload.prom"
+    metrics.save_prometheus(textfile_path)
+    lines = textfile_path.read_text().splitlines()
+    metric = "splitwise_api_request_seconds"
+    assert f'{metric}_bucket{{call="createExpense",le="0.05"}} 3' in lines
+    assert f'{metric}_bucket{{call="createExpense",le="+Inf"}} 5' in lines
+    assert f'{metric}_count{{call="getFriends"}} 1' in lines
+    assert 'upload_prompt_seconds_count{stage="category"} 1' in lines
+    assert (
+        'splitwise_api_errors_total{call="createExpense",status="429"} 1'
+        in lines
+    )
+    assert 'splitwise_api_retries_total{call="createExpense"} 1' in lines
+
+
+@pytest.mark.parametrize(
+    "seconds, expected_result",
+    [(0, "0:00"), (59.6, "1:00"), (754, "12:34"), (3725, "1:02:05")],
+)
+def test_format_duration(seconds, expected_result):
+    assert format_duration(seconds) == expected_result
+
+
+def test_progress(monkeypatch):
+    progress = Progress(10)
+    monkeypatch.setattr(
+        "src.main.metrics.time.monotonic", lambda: progress.started + 20
+    )
+    assert progress.line(0) == "[0/10 done, 0%, elapsed 0:20, ETA unknown]"
+    assert progress.line(4) == "[4/10 done, 40%, elapsed 0:20, ETA 0:30]"
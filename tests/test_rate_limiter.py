@@ -0,0 +1,166 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.main.benchmark import UploadBenchmark
+from src.main.expense_store import ExpenseStore
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.rate_limiter import RateLimiter, account_key
+from src.main.upload_expenses import UploadExpense
+
+
+@pytest.fixture
+def credentials(monkeypatch):
+    """
+    Sets Splitwise credentials, which the fake server accepts whatever they
+    are.
+    """
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+
+
+@pytest.fixture
+def limiter_path(tmp_path):
+    """
+    Returns the path to the rate limit file.
+    """
+    return tmp_path / "rate_limit.json"
+
+
+def test_account_key():
+    assert account_key("secret") == account_key("secret")
+    assert account_key("secret") != account_key("other secret")
+    assert "secret" not in account_key("secret")
+
+
+def test_burst_then_rate(limiter_path):
+    rate_limiter = RateLimiter(limiter_path, "account", rate=20.0, burst=5)
+    delays = [rate_limiter.reserve() for _ in range(8)]
+    assert delays[:5] == [0.0] * 5
+    # Then one request every 50 ms.
+    for count, delay in enumerate(delays[5:], start=1):
+        assert delay == pytest.approx(count * 0.05, abs=0.01)
+
+
+def test_shared_by_processes(limiter_path):
+    # Every limiter opens and locks the file itself, like another process.
+    rate_limiters = [
+        RateLimiter(limiter_path, "account", rate=50.0, burst=1)
+        for _ in range(4)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(
+            executor.map(
+                lambda rate_limiter: [
+                    rate_limiter.acquire() for _ in range(5)
+                ],
+                rate_limiters,
+            )
+        )
+    # 20 requests at 50 per second, the first one right away.
+    assert time.perf_counter() - start >= 19 / 50
+
+
+def test_accounts_are_independent(limiter_path):
+    first = RateLimiter(limiter_path, "first", rate=1.0)
+    second = RateLimiter(limiter_path, "second", rate=1.0)
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    assert first.reserve() > 0.5
+
+
+def test_throttle(limiter_path):
+    rate_limiter = RateLimiter(
+        limiter_path, "account", rate=8.0, recovery=0.25
+    )
+    # 429s of requests sent together only halve the rate once.
+    for _ in range(3):
+        rate_limiter.throttle(retry_after=0.2)
+    assert rate_limiter.current_rate() == 4.0
+    assert rate_limiter.reserve() == pytest.approx(0.2, abs=0.02)
+
+    # The rate grows back once Splitwise accepts requests again.
+    time.sleep(0.25)
+    rate_limiter.reserve()
+    assert rate_limiter.current_rate() == 6.0
+    for _ in range(4):
+        rate_limiter.reserve()
+    assert rate_limiter.current_rate() == 8.0
+
+    rate_limiter.throttle()
+    rate_limiter.throttle()
+    assert rate_limiter.current_rate() == 4.0
+
+
+def test_upload_without_429(credentials, limiter_path):
+    with FakeSplitwiseServer(rate_limit=20) as fake_server:
+        upload_expense = UploadExpense(
+            None, rate_limit_path=limiter_path, rate_limit=8.0
+        )
+        (
+            upload_expense.user_id,
+            upload_expense.user_friends,
+            upload_expense.user_groups,
+            upload_expense.user_groups_members,
+        ) = upload_expense.get_user_info()
+        (
+            upload_expense.categories,
+            upload_expense.all_sub_categories,
+        ) = upload_expense.get_categories_and_sub_categories()
+        jobs = UploadBenchmark(total_expenses=12).make_jobs(upload_expense)
+        assert upload_expense.upload_batch(jobs, "threaded", 8) == []
+        assert fake_server.stats["create_expense 429"] == 0
+        assert len(fake_server.expenses) == 12
+
+
+def test_sync_without_429(credentials, limiter_path, tmp_path):
+    with FakeSplitwiseServer(
+        rate_limit=3, fault_endpoints=("get_expenses",)
+    ) as fake_server:
+        upload_expense = UploadExpense(
+            None,
+            store_path=tmp_path / "expenses.sqlite",
+            rate_limit_path=limiter_path,
+        )
+        (
+            upload_expense.user_id,
+            upload_expense.user_friends,
+            upload_expense.user_groups,
+            upload_expense.user_groups_members,
+        ) = upload_expense.get_user_info()
+        (
+            upload_expense.categories,
+            upload_expense.all_sub_categories,
+        ) = upload_expense.get_categories_and_sub_categories()
+        jobs = UploadBenchmark(total_expenses=4).make_jobs(upload_expense)
+        assert upload_expense.upload_batch(jobs) == []
+        # Every page of the sync waits for a token of the account. Without a
+        # burst, no second holds more than the 3 requests the server takes.
+        upload_expense.rate_limiter = RateLimiter(
+            limiter_path, "sync", rate=2.0, burst=1
+        )
+        expense_store = ExpenseStore(tmp_path / "expenses.sqlite")
+        expense_store.open()
+        assert (
+            expense_store.sync(upload_expense.get_expenses, page_size=1) == 4
+        )
+        expense_store.close()
+        assert fake_server.stats["get_expenses 429"] == 0
+        assert fake_server.stats["get_expenses 200"] == 5
+
+
+def test_dry_run_first_call_limited(credentials, limiter_path, tmp_path):
+    with FakeSplitwiseServer():
+        upload_expense = UploadExpense(
+            None,
+            dry_run_path=tmp_path / "dry_run.json",
+            rate_limit_path=limiter_path,
+        )
+        # The first read call builds the client inside the dry run.
+        upload_expense.get_user_info()
+    assert upload_expense.rate_limiter is not None
+    with open(limiter_path) as limiter_file:
+        assert account_key("test") in json.load(limiter_file)
@@ -0,0 +1,60 @@
+import pytest
+
+from src.main.select_menu import RecentChoices, SelectMenu
+
+
+@pytest.fixture
+def category_menu():
+    """
+    Returns a SelectMenu of categories with a recent choice.
+    """
+    return SelectMenu(
+        {
+            0: "Utilities",
+            1: "Uncategorized",
+            2: "Entertainment",
+            3: "Food and drink",
+            4: "Transportation",
+        },
+        ["Transportation"],
+    )
+
+
+@pytest.mark.parametrize(
+    "text, expected_result",
+    [
+        ("food and drink", [3]),
+        ("ent", [2]),
+        ("U", [0, 1]),
+        ("un", [1]),
+        ("drink", [3]),
+        ("dk", [3]),
+        ("t", [4]),
+        ("a", []),
+        ("tn", [4, 2]),
+        ("zz", []),
+        ("  ", []),
+    ],
+)
+def test_search(category_menu, text, expected_result):
+    assert category_menu.search(text) == expected_result
+
+
+def test_ordered(category_menu):
+    assert category_menu.ordered() == [4, 0, 1, 2, 3]
+
+
+def test_recent_choices(tmp_path):
+    recent_path = tmp_path / "recent_choices.json"
+    recent_choices = RecentChoices(recent_path, size=2)
+    recent_choices.add("category", "Utilities")
+    recent_choices.add("category", "Entertainment")
+    recent_choices.add("category", "Utilities")
+    recent_choices.add("group", "Home")
+    recent_choices.add("category", "Food and drink")
+
+    loaded_choices = RecentChoices(recent_path)
+    loaded_choices.load()
+    assert loaded_choices.get("category") == ["Food and drink", "Utilities"]
+    assert loaded_choices.get("group") == ["Home"]
+    assert loaded_choices.get("friend:20340193") == []
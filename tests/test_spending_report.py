@@ -0,0 +1,120 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.main.spending_report import (
+    month_values,
+    spending_report,
+    write_report,
+)
+
+HEADER = "date;amount;description;currency;sign;merchant\n"
+
+
+@pytest.fixture
+def clean_path(tmp_path):
+    """
+    Returns the path to a clean csv file of two months.
+    """
+    clean_path = tmp_path / "test_data_clean.csv"
+    clean_path.write_text(
+        HEADER + "30/11/2022;12.04;COLRUYT 1020;EUR;debit;colruyt\n"
+        "29/11/2022;0.1;Colruyt;EUR;debit;colruyt\n"
+        "29/11/2022;0.2;Colruyt;EUR;debit;colruyt\n"
+        "01/12/2022;22.00;PARIS;EUR;debit;paris\n"
+        "2022-12-20;110.00;Money Transfer;EUR;credit;money transfer\n"
+        "2022-12-21;8.50;COLRUYT 1020;USD;debit;colruyt\n"
+    )
+    return clean_path
+
+
+def test_month_values():
+    assert list(
+        month_values(pd.Series(["20/12/2022", "2022-11-01", None]))
+    ) == ["2022-12", "2022-11", ""]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1_000_000])
+def test_spending_report(clean_path, chunk_size):
+    report = spending_report([clean_path], chunk_size=chunk_size)
+    assert report.to_dict("records") == [
+        {
+            "merchant": "colruyt",
+            "month": "2022-11",
+            "currency": "EUR",
+            "sign": "debit",
+            "count": 3,
+            # Summed in cents, so 0.1 + 0.2 doesn't drift.
+            "total": 12.34,
+            "mean": 4.11,
+            "min": 0.1,
+            "max": 12.04,
+        },
+        {
+            "merchant": "colruyt",
+            "month": "2022-12",
+            "currency": "USD",
+            "sign": "debit",
+            "count": 1,
+            "total": 8.5,
+            "mean": 8.5,
+            "min": 8.5,
+            "max": 8.5,
+        },
+        {
+            "merchant": "money transfer",
+            "month": "2022-12",
+            "currency": "EUR",
+            "sign": "credit",
+            "count": 1,
+            "total": 110.0,
+            "mean": 110.0,
+            "min": 110.0,
+            "max": 110.0,
+        },
+        {
+            "merchant": "paris",
+            "month": "2022-12",
+            "currency": "EUR",
+            "sign": "debit",
+            "count": 1,
+            "total": 22.0,
+            "mean": 22.0,
+            "min": 22.0,
+            "max": 22.0,
+        },
+    ]
+
+
+def test_group_by_month_across_files(clean_path, tmp_path):
+    # A clean csv file written before the merchant and sign columns.
+    old_path = tmp_path / "old_clean.csv"
+    old_path.write_text(
+        "date;amount;description;currency\n01/12/2022;3.00;Bakery;EUR\n"
+    )
+    report = spending_report(
+        [clean_path, old_path], group_by=["month", "currency"], chunk_size=2
+    )
+    assert report[["month", "currency", "count", "total"]].to_dict(
+        "records"
+    ) == [
+        {"month": "2022-11", "currency": "EUR", "count": 3, "total": 12.34},
+        {"month": "2022-12", "currency": "EUR", "count": 3, "total": 135.0},
+        {"month": "2022-12", "currency": "USD", "count": 1, "total": 8.5},
+    ]
+    assert spending_report([old_path], ["sign"])["sign"].tolist() == [
+        "unsigned"
+    ]
+    with pytest.raises(ValueError):
+        spending_report([clean_path], group_by=["category"])
+
+
+def test_write_report(clean_path, tmp_path):
+    report = spending_report([clean_path], group_by=["month"])
+    json_path = write_report(report, tmp_path / "reports" / "report.json")
+    with open(json_path) as json_file:
+        assert [group["count"] for group in json.load(json_file)] == [3, 3]
+    csv_path = write_report(report, tmp_path / "reports" / "report.csv")
+    with open(csv_path) as csv_file:
+        assert csv_file.readline() == "month;count;total;mean;min;max\n"
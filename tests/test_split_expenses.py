@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.main.split_expenses import allocate_cents, format_cents, to_cents
+
+
+@pytest.mark.parametrize(
+    "amounts, expected_result",
+    [([22.00, 33.33, 0.1], [2200, 3333, 10]), ([15.555], [1556])],
+)
+def test_to_cents(amounts, expected_result):
+    assert to_cents(amounts).tolist() == expected_result
+
+
+@pytest.mark.parametrize(
+    "costs_cents, weights, expected_result",
+    [
+        ([3333], [[1, 1]], [[1666, 1667]]),
+        ([1000], [[1, 1, 1]], [[333, 333, 334]]),
+        ([2], [[1, 1, 1]], [[0, 1, 1]]),
+        ([5000], [[79.46, 20.54]], [[3973, 1027]]),
+        ([1555], [[505, 1050]], [[505, 1050]]),
+        (
+            [3333, 1000],
+            [[1, 1, 0], [1, 1, 1]],
+            [[1666, 1667, 0], [333, 333, 334]],
+        ),
+        ([100], [[1, 2, 0, 0]], [[33, 67, 0, 0]]),
+    ],
+)
+def test_allocate_cents(costs_cents, weights, expected_result):
+    assert allocate_cents(costs_cents, weights).tolist() == expected_result
+
+
+def test_allocate_cents_sums_to_cost():
+    rng = np.random.default_rng(0)
+    costs_cents = rng.integers(1, 1_000_000, size=10_000)
+    weights = rng.random((10_000, 5))
+    shares = allocate_cents(costs_cents, weights)
+    assert (shares.sum(axis=1) == costs_cents).all()
+    assert (shares >= 0).all()
+
+
+def test_format_cents():
+    assert format_cents(np.array([[1100, 1100], [505, 1050]])) == [
+        ["11.0", "11.0"],
+        ["5.05", "10.5"],
+    ]
@@ -0,0 +1,270 @@
+import threading
+
+import pytest
+from splitwise.category import Category
+
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.records import Decision, Transaction
+from src.main.transaction_store import (
+    TransactionStore,
+    decision_from_json,
+    decision_to_json,
+)
+from src.main.upload_expenses import UploadExpense
+
+TRANSACTIONS = [
+    Transaction("20/12/2022", "22.00", "PARIS", "EUR"),
+    Transaction("13/12/2022", "110.00", "Money Transfer", "EUR"),
+    Transaction("01/12/2022", "12.04", "Colruyt", "EUR"),
+]
+
+GROCERIES = Decision(
+    "Groceries",
+    Category({"id": 12, "name": "Groceries"}),
+    "Home",
+    20340193,
+    ("Tom",),
+    (82514972,),
+    ("11.00", "11.00"),
+)
+
+
+@pytest.fixture
+def state_store(tmp_path):
+    """
+    Returns an open transaction store with three pending rows.
+    """
+    state_store = TransactionStore(tmp_path / "state.sqlite")
+    state_store.open()
+    state_store.add_transactions("statement", TRANSACTIONS)
+    yield state_store
+    state_store.close()
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Returns a running fake Splitwise server used by every Splitwise client.
+    """
+    # The fake server accepts any credentials.
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+    with FakeSplitwiseServer() as server:
+        yield server
+
+
+@pytest.fixture
+def decisions_path(tmp_path):
+    """
+    Returns the path to a decisions file marking every expense as personal.
+    """
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;pattern;group;friend;category;sub_category;split\n"
+        ";.;Personal;;Food and drink;Groceries;\n"
+    )
+    return decisions_path
+
+
+def test_decision_json():
+    decision = decision_from_json(decision_to_json(GROCERIES))
+    assert decision._replace(sub_category_obj=None) == GROCERIES._replace(
+        sub_category_obj=None
+    )
+    assert decision.sub_category_obj.getId() == 12
+    assert decision.sub_category_obj.getName() == "Groceries"
+
+
+def test_add_transactions(state_store):
+    assert state_store.counts("statement") == {
+        "pending": 3,
+        "claimed": 0,
+        "uploaded": 0,
+        "failed": 0,
+        "interrupted": 0,
+    }
+    state_store.record_decisions("statement", {1: GROCERIES})
+    # Cleaning the file again replaces the rows without a decision.
+    state_store.add_transactions(
+        "statement", [row._replace(amount="1.00") for row in TRANSACTIONS]
+    )
+    amounts = [
+        row["amount"]
+        for row in state_store.connection.execute(
+            "SELECT amount FROM transactions ORDER BY row_number"
+        )
+    ]
+    assert amounts == ["22.00", "1.00", "1.00"]
+
+
+def test_claim(state_store):
+    assert state_store.claim("statement", "worker") == []
+    state_store.record_decisions("statement", {2: GROCERIES, 3: GROCERIES})
+    ((row_number, transaction, decision),) = state_store.claim(
+        "statement", "worker"
+    )
+    assert row_number == 2
+    assert transaction == TRANSACTIONS[1]
+    assert decision.group_id == 20340193
+    assert state_store.claim("statement", "worker", row_number=2) == []
+    assert [row[0] for row in state_store.claim("statement", "worker")] == [3]
+
+    state_store.mark_uploaded("statement", 2, 1)
+    state_store.mark_failed("statement", 3, "Invalid cost")
+    assert state_store.row_numbers("statement", "uploaded") == {2}
+    # A failed row is retried once it has a decision again, an uploaded
+    # row never is.
+    state_store.record_decisions("statement", {2: GROCERIES, 3: GROCERIES})
+    assert [row[0] for row in state_store.claim("statement", "worker")] == [3]
+
+
+def test_concurrent_claims(state_store, tmp_path):
+    state_store.add_transactions("statement", TRANSACTIONS * 20)
+    state_store.record_decisions(
+        "statement", {row_number: GROCERIES for row_number in range(1, 61)}
+    )
+    claimed = list()
+
+    def drain():
+        # Each worker has its own connection, like another process.
+        worker_store = TransactionStore(tmp_path / "state.sqlite")
+        worker_store.open()
+        while True:
+            rows = worker_store.claim("statement", "worker", limit=2)
+            if not rows:
+                break
+            claimed.extend(row[0] for row in rows)
+        worker_store.close()
+
+    threads = [threading.Thread(target=drain) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(1, 61))
+
+
+@pytest.mark.parametrize("mode", ["sequential", "threaded", "async"])
+def test_run_headless(fake_server, decisions_path, tmp_path, mode):
+    for _ in range(2):
+        upload_expense = UploadExpense(
+            "tests/data/clean/test_data_raw_clean.csv",
+            state_path=tmp_path / "state.sqlite",
+        )
+        upload_expense.run_headless(decisions_path, mode, workers=3)
+    # Rows uploaded by the first run are skipped by the second.
+    assert len(fake_server.expenses) == 10
+    assert (
+        upload_expense.state_store.counts(upload_expense.batch)["uploaded"]
+        == 10
+    )
+
+
+def test_run_headless_concurrent_workers(
+    fake_server, decisions_path, tmp_path
+):
+    upload_expenses = [
+        UploadExpense(
+            "tests/data/clean/test_data_raw_clean.csv",
+            state_path=tmp_path / "state.sqlite",
+        )
+        for _ in range(3)
+    ]
+    threads = [
+        threading.Thread(
+            target=upload_expense.run_headless,
+            args=(decisions_path, "threaded", 2),
+        )
+        for upload_expense in upload_expenses
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(fake_server.expenses) == 10
+
+
+def test_run_headless_failed_rows(fake_server, decisions_path, tmp_path):
+    state_path = tmp_path / "state.sqlite"
+    fake_server.error_rate = 1.0
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv", state_path=state_path
+    )
+    upload_expense.run_headless(decisions_path)
+    assert (
+        upload_expense.state_store.counts(upload_expense.batch)["failed"] == 10
+    )
+
+    fake_server.error_rate = 0.0
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv", state_path=state_path
+    )
+    upload_expense.run_headless(decisions_path)
+    assert len(fake_server.expenses) == 10
+
+
+def test_interrupt_stale_claims(state_store):
+    state_store.record_decisions("statement", {2: GROCERIES, 3: GROCERIES})
+    state_store.claim("statement", "crashed worker", row_number=2)
+    # The worker crashed an hour ago.
+    with state_store.connection:
+        state_store.connection.execute(
+            "UPDATE transactions SET updated_at = updated_at - 3600"
+        )
+    state_store.claim("statement", "running worker", row_number=3)
+    assert state_store.interrupt_stale_claims("statement") == 1
+    assert state_store.row_numbers("statement", "claimed") == {3}
+    assert state_store.row_numbers("statement", "interrupted") == {2}
+    # The crashed worker may have added the expense to Splitwise.
+    assert state_store.claim("statement", "worker") == []
+
+    assert state_store.retry_interrupted("statement") == 1
+    assert [row[0] for row in state_store.claim("statement", "worker")] == [2]
+
+
+def test_run_headless_after_crashed_worker(
+    fake_server, decisions_path, tmp_path
+):
+    state_path = tmp_path / "state.sqlite"
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv", state_path=state_path
+    )
+    upload_expense.load_state_store()
+    state_store = upload_expense.state_store
+    state_store.record_decisions(
+        upload_expense.batch, {1: GROCERIES, 2: GROCERIES}
+    )
+    # A worker claimed two rows and was killed before uploading them.
+    state_store.claim(upload_expense.batch, "killed worker", limit=2)
+    with state_store.connection:
+        state_store.connection.execute(
+            "UPDATE transactions SET updated_at = updated_at - 3600"
+        )
+    state_store.close()
+
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv", state_path=state_path
+    )
+    upload_expense.run_headless(decisions_path)
+    # The killed worker may have added its rows, they wait for the user.
+    assert len(fake_server.expenses) == 8
+    assert upload_expense.state_store.row_numbers(
+        upload_expense.batch, "interrupted"
+    ) == {1, 2}
+    upload_expense.state_store.close()
+
+    upload_expense = UploadExpense(
+        "tests/data/clean/test_data_raw_clean.csv",
+        state_path=state_path,
+        retry_interrupted=True,
+    )
+    upload_expense.run_headless(decisions_path)
+    assert len(fake_server.expenses) == 10
+    rows = upload_expense.state_store.connection.execute(
+        "SELECT status, expense_id FROM transactions"
+    ).fetchall()
+    assert {row["status"] for row in rows} == {"uploaded"}
+    # Each row points to the expense created for it.
+    assert sorted(row["expense_id"] for row in rows) == sorted(
+        expense["id"] for expense in fake_server.expenses
+    )
@@ -0,0 +1,118 @@
+import pytest
+
+from src.main.benchmark import UploadBenchmark
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.undo_session import UndoSession
+from src.main.upload_expenses import UploadExpense
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Returns a running fake Splitwise server used by every Splitwise client.
+    """
+    # The fake server accepts any credentials.
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+    with FakeSplitwiseServer() as server:
+        yield server
+
+
+@pytest.fixture
+def upload_expense_class(fake_server, tmp_path):
+    """
+    Returns a UploadExpense class instance that has uploaded 4 expenses,
+    every other one split equally in the Home group, in one session.
+    """
+    upload_expense = UploadExpense(
+        None, sessions_path=tmp_path / "upload_sessions.sqlite"
+    )
+    upload_expense.retry_delay = 0.0
+    (
+        upload_expense.user_id,
+        upload_expense.user_friends,
+        upload_expense.user_groups,
+        upload_expense.user_groups_members,
+    ) = upload_expense.get_user_info()
+    (
+        upload_expense.categories,
+        upload_expense.all_sub_categories,
+    ) = upload_expense.get_categories_and_sub_categories()
+    upload_expense.start_session()
+    jobs = UploadBenchmark(total_expenses=4).make_jobs(upload_expense)
+    assert upload_expense.upload_batch(jobs) == []
+    return upload_expense
+
+
+@pytest.fixture
+def undo_session(upload_expense_class):
+    """
+    Returns an UndoSession of the uploaded session.
+    """
+    return UndoSession(
+        upload_expense_class,
+        upload_expense_class.upload_sessions,
+        upload_expense_class.session_id,
+        workers=2,
+    )
+
+
+def test_sessions(upload_expense_class):
+    upload_expense_class.start_session()
+    sessions = upload_expense_class.upload_sessions.sessions()
+    assert [session["expenses"]["created"] for session in sessions] == [0, 4]
+
+
+def test_delete(fake_server, undo_session):
+    assert sorted(undo_session.expense_ids()) == [1, 2, 3, 4]
+    assert undo_session.run() == {}
+    assert all(expense["deleted_at"] for expense in fake_server.expenses)
+    assert undo_session.expense_ids() == []
+    statuses = {
+        row["status"]
+        for row in undo_session.upload_sessions.expenses(
+            undo_session.session_id
+        )
+    }
+    assert statuses == {"deleted"}
+
+
+def test_delete_with_errors(fake_server, undo_session):
+    fake_server.fault_endpoints = ("delete_expense",)
+    fake_server.error_rate = 1.0
+    undo_session.upload_expense.max_retries = 0
+    errors = undo_session.run()
+    assert sorted(errors) == [1, 2, 3, 4]
+    assert not any(expense["deleted_at"] for expense in fake_server.expenses)
+
+    # Server errors of deletes are retried, a rerun undoes the rest.
+    fake_server.error_rate = 0.5
+    undo_session.upload_expense.max_retries = 3
+    assert undo_session.run() == {}
+    assert all(expense["deleted_at"] for expense in fake_server.expenses)
+
+
+def test_delete_already_deleted(fake_server, undo_session):
+    undo_session.upload_expense.splitwise_obj.deleteExpense(2)
+    assert undo_session.run() == {}
+    assert fake_server.stats["delete_expense 404"] == 1
+
+
+@pytest.mark.parametrize(
+    "group_id, expected_result",
+    [(20340193, []), (12035391, [2, 4])],
+)
+def test_update(
+    fake_server, upload_expense_class, undo_session, group_id, expected_result
+):
+    dining_out = upload_expense_class.all_sub_categories["Food and drink"][
+        "Dining out"
+    ]
+    errors = undo_session.run(group_id, dining_out)
+    # Split expenses can't be moved to the personal group.
+    assert sorted(errors) == expected_result
+    for expense in fake_server.expenses:
+        if expense["id"] not in expected_result:
+            assert expense["group_id"] == group_id
+            assert expense["category"]["name"] == "Dining out"
+    assert sorted(undo_session.expense_ids()) == [1, 2, 3, 4]
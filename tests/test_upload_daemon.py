@@ -0,0 +1,132 @@
+import json
+from urllib.request import urlopen
+
+import pytest
+
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.upload_daemon import UploadDaemon, submit_job
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Returns a running fake Splitwise server used by every Splitwise client.
+    """
+    # The fake server accepts any credentials.
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+    with FakeSplitwiseServer() as server:
+        yield server
+
+
+@pytest.fixture
+def upload_daemon(fake_server):
+    """
+    Returns a running upload daemon on a free port.
+    """
+    with UploadDaemon(port=0) as daemon:
+        yield daemon
+
+
+@pytest.fixture
+def decisions_path(tmp_path):
+    """
+    Returns the path to a decisions file marking every expense as personal.
+    """
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;pattern;group;friend;category;sub_category;split\n"
+        ";.;Personal;;Food and drink;Groceries;\n"
+    )
+    return decisions_path
+
+
+def test_submit_job(fake_server, upload_daemon, decisions_path):
+    for _ in range(2):
+        status, result = submit_job(
+            upload_daemon.base_url,
+            "tests/data/clean/test_data_raw_clean.csv",
+            decisions_path,
+        )
+        assert status == 200
+        assert result["uploaded"] == 10
+        assert result["failed"] == []
+        assert result["errors"] == []
+    assert len(fake_server.expenses) == 20
+    # The metadata is fetched once for both jobs.
+    assert fake_server.stats["get_current_user 200"] == 1
+    assert fake_server.stats["get_categories 200"] == 1
+
+
+def test_submit_job_invalid_decisions(fake_server, upload_daemon, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;pattern;group;friend;category;sub_category;split\n"
+        ";.;Flat;;Food and drink;Groceries;\n"
+    )
+    status, result = submit_job(
+        upload_daemon.base_url,
+        "tests/data/clean/test_data_raw_clean.csv",
+        decisions_path,
+    )
+    assert status == 200
+    assert result["uploaded"] == 0
+    assert len(result["errors"]) == 10
+    assert fake_server.expenses == []
+
+
+@pytest.mark.parametrize(
+    "file_path, mode",
+    [
+        ("tests/data/clean/missing_clean.csv", None),
+        ("tests/data/clean/test_data_raw_clean.csv", "parallel"),
+    ],
+)
+def test_submit_job_bad_request(
+    upload_daemon, decisions_path, file_path, mode
+):
+    status, result = submit_job(
+        upload_daemon.base_url, file_path, decisions_path, mode
+    )
+    assert status == 400
+    assert "error" in result
+
+
+def test_submit_job_unreadable_decisions(fake_server, upload_daemon, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    # Not utf-8.
+    decisions_path.write_bytes(b"row;pattern\n;\xff\xfe\n")
+    status, result = submit_job(
+        upload_daemon.base_url,
+        "tests/data/clean/test_data_raw_clean.csv",
+        decisions_path,
+    )
+    assert status == 400
+    assert "decode" in result["error"]
+    assert fake_server.expenses == []
+
+
+def test_submit_job_server_error(fake_server, decisions_path, tmp_path):
+    # A directory can't be opened as the sessions file.
+    with UploadDaemon(port=0, sessions_path=tmp_path) as upload_daemon:
+        status, result = submit_job(
+            upload_daemon.base_url,
+            "tests/data/clean/test_data_raw_clean.csv",
+            decisions_path,
+        )
+    assert status == 500
+    assert "unable to open" in result["error"]
+    assert fake_server.expenses == []
+
+
+def test_status(upload_daemon, decisions_path):
+    submit_job(
+        upload_daemon.base_url,
+        "tests/data/clean/test_data_raw_clean.csv",
+        decisions_path,
+    )
+    with urlopen(upload_daemon.base_url + "status") as response:
+        status = json.load(response)
+    assert status["jobs_done"] == 1
+    assert status["metadata_age_seconds"] >= 0
+    assert status["metrics"]["api"]["createExpense"]["count"] == 10
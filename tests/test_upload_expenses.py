@@ -1,5 +1,7 @@
 import pytest
 
+from src.main.categorize_expenses import CategorizeExpense
+from src.main.records import Decision, Transaction
 from src.main.upload_expenses import UploadExpense
 
 
@@ -158,6 +160,8 @@ def test_choose_personal_expense_group_no_group(
         (["6", "4"], 12035391, ("Personal", 12035391)),
         (["4", "2"], None, ("Home", 20340193)),
         (["0", "-2", "2"], None, ("Home", 20340193)),
+        (["rest"], None, ("Restaurant", 34894512)),
+        (["e", "ho"], None, ("Home", 20340193)),
     ],
 )
 def test_choose_group(
@@ -181,12 +185,18 @@ def test_choose_group(
 @pytest.mark.parametrize(
     "group_id, user_input_friends, expected_result",
     [
-        (20340193, ["1"], ("Tom", 82514972)),
-        (20340193, ["0", "2"], ("Linda", 25087341)),
-        (12349123, ["0", "-1", "2"], ("George", 39083412)),
+        (34894512, ["1"], (["Tom"], [82514972])),
+        (20340193, ["1"], (["Tom"], [82514972])),
+        (20340193, ["0", "2"], (["Linda"], [25087341])),
+        (12349123, ["0", "-1", "2"], (["George"], [39083412])),
+        (12349123, ["geo"], (["George"], [39083412])),
+        (20340193, ["1,2"], (["Tom", "Linda"], [82514972, 25087341])),
+        (20340193, ["0,1", "2, 1"], (["Linda", "Tom"], [25087341, 82514972])),
+        (12349123, ["1,1", "a", "3", "2"], (["George"], [39083412])),
+        (20340193, ["linda, t"], (["Linda", "Tom"], [25087341, 82514972])),
     ],
 )
-def test_choose_friend(
+def test_choose_friends(
     upload_expense_class,
     user_groups_members,
     user_id,
@@ -198,7 +208,7 @@ def test_choose_friend(
 ):
     iter_values(user_input_friends, monkeypatch)
     assert (
-        upload_expense_class.choose_friend(
+        upload_expense_class.choose_friends(
             group_id, user_groups_members, user_id, user_friends
         )
         == expected_result
@@ -243,6 +253,8 @@ def test_choose_sub_category(
         (["0"], "Utilities"),
         (["5", "2"], "Entertainment"),
         (["a", "2"], "Entertainment"),
+        (["", "ent"], "Entertainment"),
+        (["dri"], "Food and drink"),
     ],
 )
 def test_choose_category(
@@ -274,6 +286,22 @@ def test_split_equally(upload_expense_class, total_expense, expected_result):
     assert upload_expense_class.split_equally(total_expense) == expected_result
 
 
+@pytest.mark.parametrize(
+    "total_expense, participants, expected_result",
+    [
+        (10.00, 3, ("3.33", "3.33", "3.34")),
+        (0.02, 3, ("0.0", "0.01", "0.01")),
+    ],
+)
+def test_split_equally_between_several_friends(
+    upload_expense_class, total_expense, participants, expected_result
+):
+    assert (
+        upload_expense_class.split_equally(total_expense, participants)
+        == expected_result
+    )
+
+
 @pytest.mark.parametrize(
     "total_expense, user_input_amount, expected_result",
     [
@@ -298,6 +326,29 @@ def test_split_by_exact_amount(
     )
 
 
+@pytest.mark.parametrize(
+    "total_expense, user_input_amount, expected_result",
+    [
+        (20, ["9", "5"], ("6.0", "9.0", "5.0")),
+        (10, ["10", "9.5", "0.5"], ("0.0", "9.5", "0.5")),
+    ],
+)
+def test_split_by_exact_amount_between_several_friends(
+    upload_expense_class,
+    total_expense,
+    user_input_amount,
+    expected_result,
+    monkeypatch,
+):
+    iter_values(user_input_amount, monkeypatch)
+    assert (
+        upload_expense_class.split_by_exact_amount(
+            total_expense, ["Tom", "Linda"]
+        )
+        == expected_result
+    )
+
+
 @pytest.mark.parametrize(
     "total_expense, user_input_percent, expected_result",
     [
@@ -317,3 +368,196 @@ def test_split_by_percentage(
         upload_expense_class.split_by_percentage(total_expense)
         == expected_result
     )
+
+
+@pytest.mark.parametrize(
+    "total_expense, user_input_percent, expected_result",
+    [
+        (100, ["40", "70", "60"], ("0.0", "40.0", "60.0")),
+        (10, ["33.33", "33.33"], ("3.34", "3.33", "3.33")),
+    ],
+)
+def test_split_by_percentage_between_several_friends(
+    upload_expense_class,
+    total_expense,
+    user_input_percent,
+    expected_result,
+    monkeypatch,
+):
+    iter_values(user_input_percent, monkeypatch)
+    assert (
+        upload_expense_class.split_by_percentage(
+            total_expense, ["Tom", "Linda"]
+        )
+        == expected_result
+    )
+
+
+def test_get_csv_file_contents():
+    upload_expense = UploadExpense("tests/data/clean/test_data_raw_clean.csv")
+    expenses = upload_expense.get_csv_file_contents()
+    assert not isinstance(expenses, list)
+    assert next(expenses) == Transaction(
+        date="20/12/2022", amount="22.00", description="PARIS", currency="EUR"
+    )
+    assert len(list(expenses)) == 9
+
+
+def test_get_csv_file_contents_missing_column(tmp_path):
+    csv_path = tmp_path / "expenses_clean.csv"
+    csv_path.write_text("date;amount;description\n20/12/2022;22.00;PARIS\n")
+    with pytest.raises(ValueError):
+        next(UploadExpense(csv_path).get_csv_file_contents())
+
+
+def test_mark_personal_expenses(categories, sub_categories, monkeypatch):
+    upload_expense = UploadExpense("tests/data/clean/test_data_raw_clean.csv")
+    upload_expense.user_groups = {12035391: "Personal"}
+    upload_expense.categories = categories
+    upload_expense.all_sub_categories = sub_categories
+    upload_expense.categorizer = CategorizeExpense(
+        "tests/data/rules/test_merchant_rules.csv"
+    )
+    upload_expense.categorizer.compile_rules(sub_categories)
+    iter_values(
+        [
+            "x",
+            "r",
+            "",
+            "a",
+            "abc",
+            "25-20",
+            "Uncategorized",
+            "General",
+            "n",
+            "d",
+            "^money",
+            "Entertainment",
+            "Games",
+            "",
+            "",
+        ],
+        monkeypatch,
+    )
+    personal_expenses = upload_expense.mark_personal_expenses(12035391)
+    assert {
+        row_number: decision.sub_category_name
+        for row_number, decision in personal_expenses.items()
+    } == {
+        2: "Games",
+        3: "Groceries",
+        4: "Dining out",
+        5: "Cleaning",
+        6: "Groceries",
+        7: "Groceries",
+        10: "Games",
+    }
+    assert personal_expenses[2].group_id == 12035391
+    assert personal_expenses[2].friend_ids == ()
+
+
+def test_choose_bulk_filter_without_rules(monkeypatch):
+    upload_expense = UploadExpense("tests/data/clean/test_data_raw_clean.csv")
+    iter_values(["r", "a", "10 - 12.5"], monkeypatch)
+    filter_type, bulk_filter = upload_expense.choose_bulk_filter()
+    assert filter_type == "a"
+    assert bulk_filter(Transaction("30/11/2022", "12.04", "Colruyt", "EUR"))
+    assert not bulk_filter(Transaction("30/11/2022", "12.6", "Colruyt", "EUR"))
+    assert not bulk_filter(Transaction("30/11/2022", "1,2", "Colruyt", "EUR"))
+
+
+@pytest.mark.parametrize(
+    "friend_ids, user_shares, expected_result",
+    [
+        ((), (), [(), (), ()]),
+        (
+            (82514972,),
+            ("6.02", "6.02"),
+            [("6.02", "6.02"), ("11.02", "11.02"), ("111.02", "111.02")],
+        ),
+        (
+            (82514972, 25087341),
+            ("0.0", "6.02", "6.02"),
+            [
+                ("0.0", "6.02", "6.02"),
+                ("0.0", "11.02", "11.02"),
+                ("0.0", "111.02", "111.02"),
+            ],
+        ),
+        (
+            (82514972,),
+            ("3.0", "9.04"),
+            [("3.0", "9.04"), ("5.49", "16.55"), ("55.33", "166.71")],
+        ),
+    ],
+)
+def test_fan_out_expense_info(
+    upload_expense_class, friend_ids, user_shares, expected_result
+):
+    members = [(3, 12.04), (6, 22.04), (7, 222.04)]
+    expense_info = Decision(
+        "Groceries",
+        "groceries",
+        "Home",
+        20340193,
+        ("Tom", "Linda")[: len(friend_ids)],
+        friend_ids,
+        user_shares,
+    )
+    fanned_out = upload_expense_class.fan_out_expense_info(
+        expense_info, members
+    )
+    assert list(fanned_out) == [3, 6, 7]
+    assert [
+        decision.user_shares for decision in fanned_out.values()
+    ] == expected_result
+    assert {decision.friend_ids for decision in fanned_out.values()} == {
+        friend_ids
+    }
+
+
+def test_answer_clusters(monkeypatch):
+    upload_expense = UploadExpense("tests/data/clean/test_data_raw_clean.csv")
+    expense_info = Decision("Groceries", "groceries", "Personal", 12035391)
+    asked = list()
+    monkeypatch.setattr(
+        upload_expense,
+        "ask_expense_info",
+        lambda expense, group_id: asked.append(expense.description)
+        or expense_info,
+    )
+    iter_values(["", "x"], monkeypatch)
+    assert upload_expense.answer_clusters(12035391, {3: expense_info}) == {
+        6: expense_info,
+        7: expense_info,
+    }
+    assert asked == ["Colruyt"]
+
+
+def test_answer_clusters_with_friends(monkeypatch):
+    upload_expense = UploadExpense("tests/data/clean/test_data_raw_clean.csv")
+    expense_info = Decision(
+        "Groceries",
+        "groceries",
+        "Home",
+        20340193,
+        ("Tom",),
+        (82514972,),
+        ("1", "1"),
+    )
+    monkeypatch.setattr(
+        upload_expense,
+        "ask_expense_info",
+        lambda expense, group_id: expense_info,
+    )
+    iter_values([""], monkeypatch)
+    merchant_expenses = upload_expense.answer_clusters(None, dict())
+    # The shares are scaled to the amount of every row, read again.
+    assert {
+        row_number: decision.user_shares
+        for row_number, decision in merchant_expenses.items()
+    } == {
+        3: ("6.02", "6.02"),
+        6: ("11.02", "11.02"),
+        7: ("111.02", "111.02"),
+    }
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+
+from src.main.fake_splitwise import FakeSplitwiseServer
+from src.main.records import Transaction
+from src.main.upload_expenses import UploadExpense
+from src.main.validate_expenses import (
+    parse_amounts,
+    valid_dates,
+    validate_chunks,
+    validate_transactions,
+)
+
+INVALID_CSV = (
+    "date;amount;description;currency\n"
+    "20/12/2022;22.00;PARIS;EUR\n"
+    "31/02/2022;abc;;XYZ\n"
+    "01/12/2022;12.04;Colruyt;EUR\n"
+)
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Returns a running fake Splitwise server used by every Splitwise client.
+    """
+    # The fake server accepts any credentials.
+    for key in ["CONSUMER_KEY", "CONSUMER_SECRET", "API_KEY"]:
+        monkeypatch.setenv(key, "test")
+    with FakeSplitwiseServer() as server:
+        yield server
+
+
+@pytest.fixture
+def invalid_csv_path(tmp_path):
+    """
+    Returns the path to a clean csv file whose second expense is invalid.
+    """
+    csv_path = tmp_path / "invalid_clean.csv"
+    csv_path.write_text(INVALID_CSV)
+    return csv_path
+
+
+@pytest.mark.parametrize(
+    "raw_date, expected_result",
+    [
+        ("20/12/2022", True),
+        ("2022-12-20", True),
+        ("29/02/2024", True),
+        ("29/02/2023", False),
+        ("29/02/1900", False),
+        ("29/02/2000", True),
+        ("31/04/2022", False),
+        ("00/12/2022", False),
+        ("20/13/2022", False),
+        ("2022/12/20", False),
+        ("20-12-2022", False),
+        ("1/12/2022", False),
+        ("20/12/2022 ", False),
+        ("", False),
+    ],
+)
+def test_valid_dates(raw_date, expected_result):
+    assert valid_dates([raw_date, "20/12/2022"]).tolist() == [
+        expected_result,
+        True,
+    ]
+
+
+@pytest.mark.parametrize(
+    "amounts, expected_result",
+    [
+        (["22.00", " 5 ", "1e2"], [22.0, 5.0, 100.0]),
+        (["22.00", "22,00", ""], [22.0, np.nan, np.nan]),
+    ],
+)
+def test_parse_amounts(amounts, expected_result):
+    np.testing.assert_array_equal(parse_amounts(amounts), expected_result)
+
+
+def test_validate_transactions():
+    transactions = [
+        Transaction("20/12/2022", "22.00", "PARIS", "EUR"),
+        Transaction("31/02/2022", "abc", " ", "XYZ"),
+        Transaction("2022-12-01", "0.001", "Colruyt", "USD"),
+        Transaction("01/12/2022", "-5", "Refund", "EUR"),
+    ]
+    assert validate_transactions(transactions, {"EUR", "USD"}) == {
+        2: [
+            "amount 'abc' is not a positive number",
+            "date '31/02/2022' is not a valid DD/MM/YYYY or YYYY-MM-DD date",
+            "description is empty",
+            "currency 'XYZ' is not supported by Splitwise",
+        ],
+        3: ["amount '0.001' is not a positive number"],
+        4: ["amount '-5' is not a positive number"],
+    }
+    # Currencies aren't checked without the currencies of Splitwise.
+    assert validate_transactions(transactions[1:2], set())[1] == [
+        "amount 'abc' is not a positive number",
+        "date '31/02/2022' is not a valid DD/MM/YYYY or YYYY-MM-DD date",
+        "description is empty",
+    ]
+    assert validate_transactions([], {"EUR"}) == {}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 10_000])
+def test_validate_chunks(chunk_size):
+    transactions = [
+        Transaction("20/12/2022", "22.00", "PARIS", "EUR"),
+        Transaction("31/02/2022", "12.04", "Colruyt", "EUR"),
+        Transaction("2022-12-01", "5.00", "Bakery", "EUR"),
+        Transaction("01/12/2022", "-5", "Refund", "EUR"),
+    ]
+    # Row numbers count from the start of the file, not of the chunk.
+    total_expenses, problems = validate_chunks(
+        iter(transactions), {"EUR"}, chunk_size
+    )
+    assert total_expenses == 4
+    assert problems == validate_transactions(transactions, {"EUR"})
+    assert list(problems) == [2, 4]
+    assert validate_chunks(iter([]), {"EUR"}) == (0, {})
+
+
+def test_validate_clean_csv_file():
+    upload_expense = UploadExpense("tests/data/clean/test_data_raw_clean.csv")
+    upload_expense.currency_codes = {"EUR"}
+    assert upload_expense.preflight() == 10
+    assert upload_expense.invalid_expenses == {}
+
+
+def test_run_headless(fake_server, invalid_csv_path, tmp_path):
+    decisions_path = tmp_path / "decisions.csv"
+    decisions_path.write_text(
+        "row;pattern;group;friend;category;sub_category;split\n"
+        ";.;Personal;;Food and drink;Groceries;\n"
+    )
+    upload_expense = UploadExpense(invalid_csv_path)
+    upload_expense.run_headless(decisions_path)
+    assert list(upload_expense.invalid_expenses) == [2]
+    assert fake_server.stats["create_expense 200"] == 0
+    assert fake_server.stats["get_currencies 200"] == 1
+
+
+def test_run_pipeline(fake_server, invalid_csv_path, monkeypatch):
+    upload_expense = UploadExpense(invalid_csv_path)
+    # The invalid expense is never shown.
+    inputs = iter(["", "3", "n", "n", "n", "n"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    upload_expense.run_pipeline()
+    assert next(inputs, None) is None
+    assert list(upload_expense.invalid_expenses) == [2]
@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from src.main.watch_folder import InboxWatcher
+
+
+@pytest.fixture
+def inbox_dir(tmp_path):
+    """
+    Returns an empty inbox directory.
+    """
+    inbox_dir = tmp_path / "raw"
+    inbox_dir.mkdir()
+    return inbox_dir
+
+
+def copy_clean(file_path):
+    """
+    Stands in for the cleaning of a statement: copies it next to the inbox.
+    """
+    clean_path = (
+        f"{os.path.dirname(file_path)}/../{os.path.basename(file_path)}"
+    )
+    shutil.copyfile(file_path, clean_path)
+    return clean_path
+
+
+def test_ready_files(inbox_dir):
+    watcher = InboxWatcher(inbox_dir, copy_clean, debounce=2.0)
+    (inbox_dir / "statement.csv").write_text("date;amount\n")
+    (inbox_dir / ".statement.csv").write_text("date;amount\n")
+    (inbox_dir / "notes.txt").write_text("notes")
+    (inbox_dir / "notes.txt.gz").write_bytes(b"")
+    for name in ["archive.csv.gz", "archive.csv.XZ", "archive.zip"]:
+        (inbox_dir / name).write_bytes(b"")
+    assert watcher.ready_files(0.0) == []
+    assert watcher.ready_files(1.0) == []
+    ready = watcher.ready_files(2.5)
+    assert sorted(os.path.basename(path) for path, _ in ready) == [
+        "archive.csv.XZ",
+        "archive.csv.gz",
+        "archive.zip",
+        "statement.csv",
+    ]
+    assert watcher.ready_files(5.0) == []
+
+
+def test_ready_files_debounce_changed_file(inbox_dir):
+    watcher = InboxWatcher(inbox_dir, copy_clean, debounce=2.0)
+    statement_path = inbox_dir / "statement.csv"
+    statement_path.write_text("date;amount\n")
+    assert watcher.ready_files(0.0) == []
+    with open(statement_path, "a") as statement_file:
+        statement_file.write("20/12/2022;22.00\n")
+    assert watcher.ready_files(3.0) == []
+    assert len(watcher.ready_files(5.0)) == 1
+
+
+@pytest.mark.parametrize(
+    "upload_result, expected_status, expected_uploads",
+    [(True, "uploaded", 1), (False, "failed", 1), (None, "cleaned", 0)],
+)
+def test_process(
+    inbox_dir, tmp_path, upload_result, expected_status, expected_uploads
+):
+    state_path = tmp_path / "watch_state.json"
+    uploaded = list()
+
+    def upload(clean_path):
+        uploaded.append(clean_path)
+        return upload_result
+
+    watcher = InboxWatcher(
+        inbox_dir,
+        copy_clean,
+        None if upload_result is None else upload,
+        state_path=state_path,
+        debounce=0.0,
+    )
+    (inbox_dir / "statement.csv").write_text("date;amount\n")
+    watcher.ready_files(0.0)
+    ((file_path, key),) = watcher.ready_files(0.0)
+    watcher.process(file_path, key)
+    assert watcher.state[key]["status"] == expected_status
+    assert len(uploaded) == expected_uploads
+
+    # The file isn't processed again after a restart.
+    restarted_watcher = InboxWatcher(
+        inbox_dir, copy_clean, upload, state_path=state_path, debounce=0.0
+    )
+    restarted_watcher.load_state()
+    restarted_watcher.ready_files(0.0)
+    assert restarted_watcher.ready_files(0.0) == []
+
+
+def test_process_without_profile(inbox_dir, tmp_path, capsys):
+    state_path = tmp_path / "watch_state.json"
+    profiles = dict()
+    watcher = InboxWatcher(
+        inbox_dir,
+        lambda file_path: profiles.get("statement") and copy_clean(file_path),
+        state_path=state_path,
+        debounce=0.0,
+    )
+    (inbox_dir / "statement.csv").write_text("date;amount\n")
+    for _ in range(2):
+        watcher.ready_files(0.0)
+        ((file_path, key),) = watcher.ready_files(0.0)
+        watcher.process(file_path, key)
+        assert key not in watcher.state
+    assert capsys.readouterr().out.count("No answers are stored") == 1
+
+    # Once answers are stored for its bank, the file is cleaned.
+    profiles["statement"] = {"delimiter": ";"}
+    watcher.ready_files(0.0)
+    ((file_path, key),) = watcher.ready_files(0.0)
+    watcher.process(file_path, key)
+    assert watcher.state[key]["status"] == "cleaned"
+
+
+def test_resume(inbox_dir, tmp_path):
+    state_path = tmp_path / "watch_state.json"
+    state_path.write_text(
+        json.dumps(
+            {
+                "a.csv:12:1": {"status": "uploading", "clean_path": "a.csv"},
+                "b.csv:12:1": {"status": "to_upload", "clean_path": "b.csv"},
+                "c.csv:12:1": {"status": "uploaded", "clean_path": "c.csv"},
+            }
+        )
+    )
+    watcher = InboxWatcher(
+        inbox_dir, copy_clean, lambda _: True, state_path=state_path
+    )
+    watcher.load_state()
+    assert watcher.resume() == [("b.csv:12:1", "b.csv")]
+    assert watcher.state["a.csv:12:1"]["status"] == "interrupted"
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_run(inbox_dir, tmp_path, use_inotify):
+    uploaded = list()
+    watcher = InboxWatcher(
+        inbox_dir,
+        copy_clean,
+        lambda clean_path: uploaded.append(clean_path) or True,
+        state_path=tmp_path / "watch_state.json",
+        debounce=0.05,
+        poll_interval=0.05,
+        use_inotify=use_inotify,
+    )
+    stop_event = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop_event,))
+    thread.start()
+    try:
+        (inbox_dir / "statement.csv").write_text("date;amount\n")
+        deadline = time.monotonic() + 5
+        while not uploaded and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop_event.set()
+        thread.join()
+    assert [os.path.basename(path) for path in uploaded] == ["statement.csv"]